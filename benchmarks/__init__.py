@@ -0,0 +1,9 @@
+""" file:   __init__.py (benchmarks)
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Performance benchmarks for earthchem. These aren't part of
+        the installed package - run them from the repository root, e.g.
+
+            python -m benchmarks.cold_start --output cold_start.json
+"""
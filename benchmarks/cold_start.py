@@ -0,0 +1,182 @@
+""" file:   cold_start.py (benchmarks)
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Import-time and cold-start benchmarks
+
+    Each scenario runs in a fresh interpreter (with `-X importtime` so we
+    can record what got imported) with network access stubbed out, to make
+    sure nothing sneaks a request into the import path. Run from the
+    repository root:
+
+        python -m benchmarks.cold_start --output cold_start.json
+        python -m benchmarks.cold_start --baseline cold_start.json
+"""
+
+from .common import ROOT, write_results, read_results, compare, \
+                    report_regressions
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import textwrap
+import time
+
+# Name, setup code and the statement we actually time
+SCENARIOS = (
+    ('import_earthchem', '', 'import earthchem'),
+    ('import_query', '', 'from earthchem import Query'),
+    ('first_query', 'from earthchem import Query', "Query(author='barnes')"),
+    ('first_element_validator',
+     'from earthchem.validation import ElementValidator',
+     "ElementValidator('Reference')"),
+    ('import_transform', 'import numpy',
+     'from earthchem.transform.isometric import IsometricLogTransform'),
+    ('first_transform',
+     'import numpy\n'
+     'from earthchem.transform.isometric import IsometricLogTransform\n'
+     'X = numpy.random.uniform(0.1, 1, size=(100, 5))',
+     'IsometricLogTransform().transform(X)'),
+)
+
+# Any connection attempt fails straight away
+NETWORK_STUB = """
+import socket
+def _offline(*args, **kwargs):
+    raise OSError('network access is stubbed out for benchmarking')
+socket.create_connection = socket.getaddrinfo = _offline
+"""
+
+# Markers let us pick out the imports triggered by the timed statement
+MARKER = '--- earthchem benchmark marker ---'
+TEMPLATE = """
+{stub}
+import sys, time
+{setup}
+sys.stderr.write({marker!r} + '\\n'); sys.stderr.flush()
+_start = time.perf_counter()
+{statement}
+_elapsed = time.perf_counter() - _start
+sys.stderr.write({marker!r} + '\\n'); sys.stderr.flush()
+print(_elapsed)
+"""
+
+IMPORTTIME = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S.*)$')
+
+# Metrics to check against a baseline, and which direction is better
+METRICS = {
+    'wall_time_min': 'lower',
+    'n_modules': 'lower'
+}
+
+# Ignore timing changes smaller than this (seconds) - they're just noise
+FLOORS = {
+    'wall_time_min': 0.005
+}
+
+def parse_import_tree(stderr):
+    """ Pull out the imports between our markers from -X importtime output
+
+        Returns:
+            a list of dicts with module, self and cumulative times (in
+            seconds) and depth in the import tree, in import order
+    """
+    imports, recording = [], False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            recording = not recording
+            continue
+        match = IMPORTTIME.match(line)
+        if recording and match:
+            self_us, cumulative_us, indent, module = match.groups()
+            imports.append({
+                'module': module.strip(),
+                'self': int(self_us) / 1e6,
+                'cumulative': int(cumulative_us) / 1e6,
+                'depth': len(indent) // 2
+            })
+    return imports
+
+def run_scenario(setup, statement):
+    """ Run a single scenario in a fresh interpreter
+
+        Returns:
+            a tuple of (statement wall time, process wall time, import tree)
+    """
+    script = TEMPLATE.format(stub=NETWORK_STUB, setup=setup, marker=MARKER,
+                             statement=statement)
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [ROOT, env.get('PYTHONPATH')]))
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', textwrap.dedent(script)],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    process_time = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError('Scenario failed:\n{0}\n{1}'.format(
+            statement, proc.stderr[-2000:]))
+    return float(proc.stdout.strip().splitlines()[-1]), process_time, \
+        parse_import_tree(proc.stderr)
+
+def benchmark(repeat=5, scenarios=SCENARIOS):
+    """ Run all the cold-start scenarios
+
+        Parameters:
+            repeat - the number of fresh interpreters to run each scenario in
+            scenarios - a sequence of (name, setup, statement) tuples
+
+        Returns:
+            a dictionary of results for each scenario
+    """
+    results = {}
+    for name, setup, statement in scenarios:
+        walls, processes, tree = [], [], None
+        for _ in range(repeat):
+            wall, process, tree = run_scenario(setup, statement)
+            walls.append(wall)
+            processes.append(process)
+        top_level = [imp for imp in tree if imp['depth'] == 0]
+        results[name] = {
+            'statement': statement,
+            'repeat': repeat,
+            'wall_time_min': min(walls),
+            'wall_time_median': statistics.median(walls),
+            'wall_time_max': max(walls),
+            'process_time_median': statistics.median(processes),
+            'n_modules': len(tree),
+            'import_time': sum(imp['cumulative'] for imp in top_level),
+            'import_tree': tree
+        }
+        print('{0:>25}: {1:8.1f} ms, {2:4d} modules imported'.format(
+            name, 1000 * results[name]['wall_time_median'], len(tree)))
+    return results
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[4])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='fresh interpreters per scenario (default 5)')
+    parser.add_argument('--output', default='cold_start.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--baseline', default=None,
+                        help='results file to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fractional slowdown allowed (default 0.2)')
+    args = parser.parse_args(args)
+
+    # Read the baseline first in case we're about to overwrite it
+    baseline = read_results(args.baseline) if args.baseline else None
+    results = benchmark(repeat=args.repeat)
+    write_results(results, args.output)
+    print('Wrote results to {0}'.format(args.output))
+    if baseline is not None:
+        return report_regressions(
+            compare(results, baseline, METRICS, args.tolerance, FLOORS))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+""" file:   common.py (benchmarks)
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Shared bits for recording and comparing benchmark results
+"""
+
+import datetime
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def git_revision():
+    "Get the current git revision of the repository, or None"
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+            stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def machine_info():
+    "Describe the machine and environment the benchmarks ran on"
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'executable': sys.executable
+    }
+
+def percentiles(samples, points=(50, 90, 99)):
+    """ Get percentiles of a list of samples without needing numpy
+
+        Parameters:
+            samples - a list of numbers
+            points - the percentiles to calculate
+
+        Returns:
+            a dictionary like {'p50': ..., 'p90': ...}
+    """
+    ordered = sorted(samples)
+    result = {}
+    for point in points:
+        if not ordered:
+            result['p{0}'.format(point)] = None
+            continue
+        # Linear interpolation between closest ranks
+        rank = (len(ordered) - 1) * point / 100.
+        lower = int(rank)
+        upper = min(lower + 1, len(ordered) - 1)
+        weight = rank - lower
+        result['p{0}'.format(point)] = \
+            ordered[lower] * (1 - weight) + ordered[upper] * weight
+    return result
+
+def measure(func, *args, repeat=3, **kwargs):
+    """ Time a function call and measure its peak memory use
+
+        Memory is measured with tracemalloc (which sees numpy's array
+        allocations) on a separate call so that tracing doesn't slow down
+        the timed calls.
+
+        Parameters:
+            func - the function to call
+            *args, **kwargs - arguments to pass to func
+            repeat - the number of timed calls to make
+
+        Returns:
+            a tuple of (best time in seconds, peak memory allocated during
+            the call in bytes, the result of the last call)
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(times), peak, result
+
+def write_results(results, path):
+    """ Write benchmark results to a JSON file, along with machine info
+
+        Parameters:
+            results - a dictionary mapping benchmark names to a dictionary
+                of metrics
+            path - the file to write to
+    """
+    document = {
+        'machine': machine_info(),
+        'benchmarks': results
+    }
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    with open(path, 'w') as sink:
+        json.dump(document, sink, indent=2, sort_keys=True)
+    return document
+
+def read_results(path):
+    "Read benchmark results written by write_results"
+    with open(path, 'r') as src:
+        return json.load(src)['benchmarks']
+
+def compare(results, baseline, metrics, tolerance=0.2, floors=None):
+    """ Compare benchmark results against a baseline
+
+        Parameters:
+            results - the new results, as passed to write_results
+            baseline - the baseline results, as returned by read_results
+            metrics - a dictionary mapping metric names to 'lower' or
+                'higher', depending on which direction is better
+            tolerance - the fractional change we put up with before calling
+                something a regression (defaults to 20%)
+            floors - optional dictionary mapping metric names to the
+                smallest absolute change worth reporting, so that timer
+                noise on very fast benchmarks isn't flagged
+
+        Returns:
+            a list of (benchmark, metric, baseline value, new value) tuples
+            for each regression
+    """
+    floors = floors or {}
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for metric, better in sorted(metrics.items()):
+            new, old = result.get(metric), baseline[name].get(metric)
+            if new is None or old is None \
+                    or abs(new - old) <= floors.get(metric, 0):
+                continue
+            if better == 'lower':
+                regressed = new > old * (1 + tolerance)
+            else:
+                regressed = new < old * (1 - tolerance)
+            if regressed:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+def report_regressions(regressions):
+    """ Print out regressions from compare, returning an exit code for
+        scripts (1 if there were any regressions, 0 otherwise)
+    """
+    for name, metric, old, new in regressions:
+        print('REGRESSION {0}.{1}: {2:0.4g} -> {3:0.4g}'.format(
+            name, metric, old, new))
+    if not regressions:
+        print('No regressions against baseline')
+    return 1 if regressions else 0
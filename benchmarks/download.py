@@ -0,0 +1,183 @@
+""" file:   download.py (benchmarks)
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Download throughput benchmarks for Query.dataframe
+
+    Serves synthetic data from the local stand-in server in this process, and
+    downloads it with Query.dataframe in a fresh child process for each case
+    so that peak RSS is measured per case. Run from the repository root:
+
+        python -m benchmarks.download --output download.json
+        python -m benchmarks.download --baseline download.json
+
+    The full grid (up to 1M rows with 100 ms latency) takes a long time -
+    use --sizes and --latencies to pick out the cases you care about.
+"""
+
+from .common import ROOT, write_results, read_results, compare, \
+                    report_regressions, percentiles
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SIZES = (1000, 100000, 1000000)
+LATENCIES = (0, 0.01, 0.1)  # seconds
+
+# Metrics to check against a baseline, and which direction is better
+METRICS = {
+    'rows_per_second': 'higher',
+    'requests_per_second': 'higher',
+    'peak_rss': 'lower',
+    'page_latency_p50': 'lower',
+    'page_latency_p99': 'lower'
+}
+
+# Ignore changes smaller than these - they're just noise
+FLOORS = {
+    'page_latency_p50': 0.002,
+    'page_latency_p99': 0.005,
+    'peak_rss': 10 * 2 ** 20
+}
+
+def peak_rss():
+    "Get the peak resident set size of this process in bytes"
+    import resource
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+def download(url):
+    """ Download everything from a server with Query.dataframe, timing each
+        request as we go
+
+        Parameters:
+            url - the REST search URL to query
+
+        Returns:
+            a dictionary of metrics
+    """
+    from earthchem import query as query_module
+
+    # Wrap requests.get so we can time each page
+    page_times, count_times = [], []
+    _get = query_module.requests.get
+    def timed_get(url, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return _get(url, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            if 'searchtype=count' in url:
+                count_times.append(elapsed)
+            else:
+                page_times.append(elapsed)
+    query_module.requests.get = timed_get
+
+    query = query_module.Query()
+    query.search_url = url
+    start = time.perf_counter()
+    df = query.dataframe()
+    elapsed = time.perf_counter() - start
+
+    n_rows = 0 if df is None else len(df)
+    n_requests = len(page_times) + len(count_times)
+    result = {
+        'rows': n_rows,
+        'requests': n_requests,
+        'elapsed': elapsed,
+        'rows_per_second': n_rows / elapsed,
+        'requests_per_second': n_requests / elapsed,
+        'peak_rss': peak_rss()
+    }
+    for key, value in percentiles(page_times).items():
+        result['page_latency_' + key] = value
+    return result
+
+def run_case(n_rows, latency, seed=0):
+    """ Benchmark downloading a dataset of a given size and latency
+
+        The stand-in server runs in this process and the download runs in
+        a child process.
+    """
+    from earthchem.testing import LocalEarthChemServer
+
+    with LocalEarthChemServer(n_rows=n_rows, latency=latency,
+                              seed=seed) as server:
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            filter(None, [ROOT, env.get('PYTHONPATH')]))
+        proc = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.download', '--child',
+             server.url],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL, universal_newlines=True)
+        if proc.returncode != 0:
+            raise RuntimeError('Download benchmark failed for {0} rows, '
+                               '{1} s latency'.format(n_rows, latency))
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update(dataset_rows=n_rows, latency=latency)
+    return result
+
+def case_name(n_rows, latency):
+    return 'rows={0},latency={1:g}ms'.format(n_rows, 1000 * latency)
+
+def benchmark(sizes=SIZES, latencies=LATENCIES):
+    """ Run the download benchmarks over a grid of sizes and latencies
+
+        Returns:
+            a dictionary of results for each case
+    """
+    results = {}
+    for n_rows in sizes:
+        for latency in latencies:
+            name = case_name(n_rows, latency)
+            results[name] = result = run_case(n_rows, latency)
+            print('{0:>30}: {1:10.0f} rows/s, {2:8.1f} req/s, '
+                  'p50 {3:6.1f} ms, p99 {4:6.1f} ms, {5:6.0f} MB peak'.format(
+                      name, result['rows_per_second'],
+                      result['requests_per_second'],
+                      1000 * result['page_latency_p50'],
+                      1000 * result['page_latency_p99'],
+                      result['peak_rss'] / 2 ** 20))
+    return results
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[4])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='dataset sizes in rows (default 1k, 100k, 1M)')
+    parser.add_argument('--latencies', type=float, nargs='+',
+                        default=[1000 * l for l in LATENCIES],
+                        help='simulated latencies in ms (default 0, 10, 100)')
+    parser.add_argument('--output', default='download.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--baseline', default=None,
+                        help='results file to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fractional slowdown allowed (default 0.2)')
+    parser.add_argument('--child', default=None, metavar='URL',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args(args)
+
+    # We're the downloading end of a case
+    if args.child:
+        print(json.dumps(download(args.child)))
+        return 0
+
+    # Read the baseline first in case we're about to overwrite it
+    baseline = read_results(args.baseline) if args.baseline else None
+    results = benchmark(sizes=args.sizes,
+                        latencies=[l / 1000. for l in args.latencies])
+    write_results(results, args.output)
+    print('Wrote results to {0}'.format(args.output))
+    if baseline is not None:
+        return report_regressions(
+            compare(results, baseline, METRICS, args.tolerance, FLOORS))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
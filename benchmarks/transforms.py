@@ -0,0 +1,388 @@
+""" file:   transforms.py (benchmarks)
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Benchmarks for earthchem.transform
+
+    Compares transforms against their old implementations for speed, peak
+    memory and accuracy on trace-element style compositions (lots of small
+    parts). Run from the repository root:
+
+        python -m benchmarks.transforms --rows 1000000 --parts 50
+        python -m benchmarks.transforms alr_pandas --rows 1000000
+        python -m benchmarks.transforms fused --rows 10000000 --parts 10
+        python -m benchmarks.transforms stats --rows 500000 --parts 40
+        python -m benchmarks.transforms pipeline --rows 100000 --parts 3
+        python -m benchmarks.transforms --grid --max-gb 2
+
+    The pipeline benchmark times every array transform forward and inverse.
+    The error for an inverse is against the closed input, so it's the
+    round-trip error. --grid runs it over GRID_ROWS x GRID_PARTS x
+    GRID_DTYPES, skipping inputs bigger than --max-gb.
+"""
+
+from .common import write_results, read_results, compare, \
+                    report_regressions, measure
+
+import argparse
+import itertools
+import sys
+
+import numpy as np
+import pandas as pd
+
+from earthchem.transform.additive import AdditiveLogTransform, \
+                                       AdditiveLogTransformPandas
+from earthchem.transform.barycentric import BarycentricTransform
+from earthchem.transform.centered import CenteredLogTransform, \
+                                        CenteredLogTransformPandas
+from earthchem.transform.fused import ClosedCenteredLogTransform, \
+                                     ClosedIsometricLogTransform
+from earthchem.transform.isometric import IsometricLogTransform
+from earthchem.transform.stats import variation_matrix
+from earthchem.transform.utilities import basis_matrix, closure, \
+                                         pd_closure, _basis_matrix
+
+# Metrics to check against a baseline, and which direction is better
+METRICS = {
+    'time': 'lower',
+    'peak_memory': 'lower',
+    'max_error': 'lower'
+}
+FLOORS = {
+    'time': 0.01,
+    'peak_memory': 2 ** 20,
+    'max_error': 1e-12
+}
+
+# Number of rows to check against the extended precision reference
+N_REFERENCE_ROWS = 10000
+
+# Sizes and types for the pipeline benchmark grid
+GRID_ROWS = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+GRID_PARTS = (3, 10, 30, 60)
+GRID_DTYPES = ('float32', 'float64')
+
+def trace_compositions(n_rows, n_parts, seed=42):
+    """ Make some trace-element style compositions - parts range from 0.01
+        to 100 ppm (as mass fractions), so products over rows underflow
+    """
+    rng = np.random.RandomState(seed)
+    return 10 ** rng.uniform(-8, -4, size=(n_rows, n_parts))
+
+def legacy_clr(X):
+    "The old geometric mean CLR implementation, for comparison"
+    X = np.asarray(X)
+    geometric_mean = \
+        np.prod(X, axis=1)[:, np.newaxis] ** (1. / float(X.shape[1]))
+    return np.log(X / geometric_mean)
+
+def reference_clr(X):
+    "CLR in extended precision, to check accuracy against"
+    logX = np.log(np.asarray(X, dtype=np.longdouble))
+    return logX - logX.mean(axis=1, keepdims=True)
+
+def accuracy(result, reference):
+    """ Compare some results against a reference
+
+        Returns:
+            a dictionary with the maximum absolute error over finite values
+            and the fraction of values which aren't finite
+    """
+    result = result[:len(reference)]
+    finite = np.isfinite(result)
+    error = np.abs(result[finite] - reference[finite]) if finite.any() \
+            else np.array([np.inf])
+    return {
+        'max_error': float(error.max()) if finite.all() else float('inf'),
+        'max_finite_error': float(error.max()),
+        'nonfinite_fraction': float(1 - finite.mean())
+    }
+
+def run_cases(cases, reference, n_rows, n_parts, repeat=3):
+    """ Time each case and check its accuracy against a reference
+
+        Parameters:
+            cases - a sequence of (name, function, data, kwargs) tuples
+            reference - the expected result for the first rows of the data
+            n_rows, n_parts - the size of the data, for labelling
+            repeat - the number of timed calls for each case
+
+        Returns:
+            a dictionary of results for each case
+    """
+    results = {}
+    for name, func, data, kwargs in cases:
+        with np.errstate(all='ignore'):
+            elapsed, peak, result = measure(func, data, repeat=repeat,
+                                            **kwargs)
+        result = np.asarray(result)
+        key = '{0}[{1}x{2}]'.format(name, n_rows, n_parts)
+        results[key] = dict(time=elapsed, peak_memory=peak,
+                            rows=n_rows, parts=n_parts,
+                            **accuracy(result, reference))
+        print('{0:>40}: {1:8.3f} s, {2:8.1f} MB peak, max error {3:0.2g}, '
+              '{4:0.1%} non-finite'.format(
+                  key, elapsed, peak / 2 ** 20, results[key]['max_error'],
+                  results[key]['nonfinite_fraction']))
+    return results
+
+def benchmark_clr(n_rows, n_parts, repeat=3):
+    """ Benchmark the CLR implementations on an (n_rows, n_parts) array
+
+        Returns:
+            a dictionary of results for each implementation
+    """
+    X = trace_compositions(n_rows, n_parts)
+    reference = reference_clr(X[:N_REFERENCE_ROWS])
+    clr, clr_pandas = CenteredLogTransform(), CenteredLogTransformPandas()
+    out = np.empty_like(X)
+    cases = (
+        ('clr_legacy', legacy_clr, X, {}),
+        ('clr', clr.transform, X, {}),
+        ('clr_out', clr.transform, X, {'out': out}),
+        ('clr_pandas', clr_pandas.transform, pd.DataFrame(X), {})
+    )
+    return run_cases(cases, reference, n_rows, n_parts, repeat)
+
+def legacy_alr_pandas(df, base_key='rock_unmeasured'):
+    "The old per-column pandas ALR implementation, for comparison"
+    others = sorted(k for k in df.keys() if k != base_key)
+    return df[others].apply(lambda x: np.log(x / df[base_key]))
+
+def legacy_alr_pandas_inverse(df, base_key='rock_unmeasured', constant=1):
+    "The old pandas inverse ALR implementation, for comparison"
+    output = df.apply(np.exp)
+    output[base_key] = np.ones((df.shape[0], 1))
+    return output.apply(lambda x: constant * x / output.sum(axis=1))
+
+def alr_frame(n_rows, n_parts):
+    "Make a dataframe of compositions with an unmeasured base column"
+    X = trace_compositions(n_rows, n_parts)
+    columns = ['c{0:02d}'.format(i) for i in range(n_parts - 1)]
+    return pd.DataFrame(X, columns=columns + ['rock_unmeasured'])
+
+def benchmark_alr_pandas(n_rows, n_parts, repeat=3):
+    """ Benchmark the pandas ALR implementations (forward and inverse) on
+        an (n_rows, n_parts) frame
+
+        Returns:
+            a dictionary of results for each implementation
+    """
+    df = alr_frame(n_rows, n_parts)
+    values = df.to_numpy()[:N_REFERENCE_ROWS].astype(np.longdouble)
+    reference = np.log(values[:, :-1] / values[:, -1:])
+    alr = AdditiveLogTransformPandas()
+    results = run_cases((
+        ('alr_pandas_legacy', legacy_alr_pandas, df, {}),
+        ('alr_pandas', alr.transform, df, {})
+    ), reference, n_rows, n_parts, repeat)
+
+    # Inverse should get back to the closed composition
+    L = alr.transform(df)
+    reference = values / values.sum(axis=1, keepdims=True)
+    results.update(run_cases((
+        ('alr_pandas_inverse_legacy', legacy_alr_pandas_inverse, L, {}),
+        ('alr_pandas_inverse', alr.inverse_transform, L, {})
+    ), reference, n_rows, n_parts, repeat))
+    return results
+
+def legacy_closure(X):
+    "The old transposing closure implementation, for comparison"
+    X = np.asarray(X)
+    return (X.T / X.sum(axis=1)).T
+
+def benchmark_fused(n_rows, n_parts, repeat=3):
+    """ Benchmark closing and then taking the CLR/ILR against taking them
+        directly on an (n_rows, n_parts) array. The direct transforms skip
+        the closure and work a block of rows at a time, so their peak
+        memory should be just the output.
+
+        Returns:
+            a dictionary of results for each implementation
+    """
+    X = trace_compositions(n_rows, n_parts)
+    clr, ilr = CenteredLogTransform(), IsometricLogTransform()
+    reference = reference_clr(X[:N_REFERENCE_ROWS])
+    results = run_cases((
+        ('closed_clr_legacy', lambda X: legacy_clr(legacy_closure(X)), X, {}),
+        ('closed_clr_chained', lambda X: clr.transform(closure(X)), X, {}),
+        ('closed_clr_direct', ClosedCenteredLogTransform().transform, X, {})
+    ), reference, n_rows, n_parts, repeat)
+
+    reference = np.dot(reference, basis_matrix(n_parts).T)
+    results.update(run_cases((
+        ('closed_ilr_chained', lambda X: ilr.transform(closure(X)), X, {}),
+        ('closed_ilr_direct', ClosedIsometricLogTransform().transform, X, {})
+    ), reference, n_rows, n_parts, repeat))
+    return results
+
+def legacy_variation_matrix(df):
+    "The old nested-loop pandas variation matrix, for comparison"
+    keys = list(df.keys())
+    result = pd.DataFrame(index=keys, columns=keys, dtype=float)
+    for key_i in keys:
+        for key_j in keys:
+            result.loc[key_i, key_j] = np.log(df[key_i] / df[key_j]).var()
+    return result.to_numpy()
+
+def benchmark_stats(n_rows, n_parts, repeat=3):
+    """ Benchmark the variation matrix on an (n_rows, n_parts) frame
+
+        Returns:
+            a dictionary of results for each implementation
+    """
+    df = pd.DataFrame(trace_compositions(n_rows, n_parts))
+    logX = np.log(df.to_numpy().astype(np.longdouble))
+    var = logX.var(axis=0, ddof=1)
+    centred = logX - logX.mean(axis=0)
+    cov = np.dot(centred.T, centred) / (n_rows - 1)
+    reference = var[:, np.newaxis] + var[np.newaxis, :] - 2 * cov
+    results = run_cases((
+        ('variation_legacy', legacy_variation_matrix, df, {}),
+        ('variation', variation_matrix, df.to_numpy(), {})
+    ), reference, n_rows, n_parts, repeat)
+
+    # EarthChem trace elements are sparse, so check against the pairwise
+    # pandas definition with parts missing too
+    rng = np.random.RandomState(42)
+    sparse = df.mask(rng.uniform(size=df.shape) < 0.3)
+    results.update(run_cases((
+        ('variation_sparse', variation_matrix, sparse.to_numpy(), {}),
+    ), legacy_variation_matrix(sparse), n_rows, n_parts, repeat))
+    return results
+
+def basis_gram(n_parts, dtype):
+    """ Build a basis matrix from scratch (skipping the cache) and return
+        psi psi^T, which should be the identity
+    """
+    _basis_matrix.cache_clear()
+    psi = basis_matrix(n_parts, dtype)
+    return np.dot(psi, psi.T)
+
+def benchmark_pipeline(n_rows, n_parts, repeat=3, dtype='float64'):
+    """ Benchmark each array transform forward and inverse on an
+        (n_rows, n_parts) array of the given type
+
+        Inverses are run on the output of the forward transform and checked
+        against the closed input, so their error is the round-trip error.
+        The barycentric transform only runs for three parts.
+
+        Returns:
+            a dictionary of results for each transform
+    """
+    dtype = np.dtype(dtype)
+    X = trace_compositions(n_rows, n_parts).astype(dtype)
+    values = X[:N_REFERENCE_ROWS].astype(np.longdouble)
+    closed = values / values.sum(axis=1, keepdims=True)
+    clr_reference = reference_clr(values)
+    suffix = '_' + dtype.name
+
+    # Closure and the basis matrix
+    results = run_cases((
+        ('closure' + suffix, closure, X, {}),
+        ('pd_closure' + suffix, pd_closure, pd.DataFrame(X), {})
+    ), closed, n_rows, n_parts, repeat)
+    results.update(run_cases((
+        ('basis_matrix' + suffix, basis_gram, n_parts, {'dtype': dtype}),
+    ), np.eye(n_parts - 1), n_rows, n_parts, repeat))
+    psi = basis_matrix(n_parts).astype(np.longdouble)
+
+    # Log-ratio transforms, there and back again
+    cases = [
+        ('clr', CenteredLogTransform(), clr_reference),
+        ('ilr', IsometricLogTransform(), np.dot(clr_reference, psi.T)),
+        ('alr', AdditiveLogTransform(base_feature_index=-1),
+         np.log(values[:, :-1] / values[:, -1:]))
+    ]
+    if n_parts == 3:
+        x0, x1, x2 = closed.T
+        cases.append(('barycentric', BarycentricTransform(),
+                      np.column_stack([x1 + x2 / 2, np.sqrt(3) * x2 / 2])))
+    for name, transform, reference in cases:
+        results.update(run_cases((
+            (name + suffix, transform.transform, X, {}),
+        ), reference, n_rows, n_parts, repeat))
+        L = transform.transform(X)
+        results.update(run_cases((
+            (name + '_inverse' + suffix, transform.inverse_transform, L, {}),
+        ), closed, n_rows, n_parts, repeat))
+        del L
+    return results
+
+def benchmark_grid(rows=GRID_ROWS, parts=GRID_PARTS, dtypes=GRID_DTYPES,
+                   repeat=3, max_bytes=2 ** 30):
+    """ Run the pipeline benchmark over a grid of sizes and types
+
+        Parameters:
+            rows, parts, dtypes - the grid to run over
+            repeat - the number of timed calls for each case
+            max_bytes - skip inputs bigger than this
+
+        Returns:
+            a dictionary of results for each case
+    """
+    results = {}
+    for n_rows, n_parts, dtype in itertools.product(rows, parts, dtypes):
+        nbytes = n_rows * n_parts * np.dtype(dtype).itemsize
+        if nbytes > max_bytes:
+            print('Skipping {0}x{1} {2} ({3:0.0f} MB input)'.format(
+                n_rows, n_parts, dtype, nbytes / 2 ** 20))
+            continue
+        results.update(benchmark_pipeline(n_rows, n_parts, repeat, dtype))
+    return results
+
+# Benchmarks we know how to run
+BENCHMARKS = {
+    'clr': benchmark_clr,
+    'alr_pandas': benchmark_alr_pandas,
+    'fused': benchmark_fused,
+    'stats': benchmark_stats,
+    'pipeline': benchmark_pipeline
+}
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[4])
+    parser.add_argument('benchmarks', nargs='*',
+                        help='which benchmarks to run, from {0} (default '
+                             'all)'.format(', '.join(sorted(BENCHMARKS))))
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--parts', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--grid', action='store_true',
+                        help='run the pipeline benchmark over the size grid '
+                             'instead')
+    parser.add_argument('--dtypes', nargs='+', default=GRID_DTYPES,
+                        help='types for the grid (default float32 float64)')
+    parser.add_argument('--max-gb', type=float, default=1.,
+                        help='skip grid inputs bigger than this (default 1)')
+    parser.add_argument('--output', default='transforms.json',
+                        help='where to write the JSON results')
+    parser.add_argument('--baseline', default=None,
+                        help='results file to check for regressions against')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='fractional slowdown allowed (default 0.2)')
+    args = parser.parse_args(args)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error('unknown benchmarks {0}'.format(', '.join(unknown)))
+
+    baseline = read_results(args.baseline) if args.baseline else None
+    results = {}
+    if args.grid:
+        results.update(benchmark_grid(dtypes=args.dtypes, repeat=args.repeat,
+                                      max_bytes=args.max_gb * 2 ** 30))
+    else:
+        for name in args.benchmarks or sorted(BENCHMARKS):
+            results.update(BENCHMARKS[name](args.rows, args.parts,
+                                            repeat=args.repeat))
+    write_results(results, args.output)
+    print('Wrote results to {0}'.format(args.output))
+    if baseline is not None:
+        return report_regressions(
+            compare(results, baseline, METRICS, args.tolerance, FLOORS))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,6 +1,37 @@
-from . import documentation, query, validation, transform, geochem, plot
+""" file:   __init__.py (earthchem)
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
 
-from .query import Query
+    description: Package setup. Submodules are loaded the first time they're
+        used so that `import earthchem` doesn't pull in matplotlib,
+        scikit-learn and friends if you only want to download data.
+"""
+
+import importlib
+
+# Submodules and the module each top-level name lives in
+_SUBMODULES = (
+    'documentation', 'query', 'validation', 'transform', 'geochem', 'plot',
+    'pagination', 'testing'
+)
+_ATTRIBUTES = {
+    'Query': 'query'
+}
+
+def __getattr__(name):
+    "Import submodules and top-level names on first access"
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    elif name in _ATTRIBUTES:
+        module = importlib.import_module('.' + _ATTRIBUTES[name], __name__)
+        value = globals()[name] = getattr(module, name)
+        return value
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_SUBMODULES)
+                  + list(_ATTRIBUTES.keys()))
 
 # Versioneer imports
 from ._version import get_versions
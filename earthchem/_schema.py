@@ -0,0 +1,1553 @@
+""" file:   _schema.py
+    description: Key and type tables for the EarthChem SOAP search schema
+
+    DO NOT EDIT - this file is generated from
+    earthchem/resources/soap_search_schema.xsd by earthchem/codegen.py.
+    Run `python setup.py build_schema` to regenerate it.
+"""
+
+# Simple type of each schema element
+ELEMENT_TYPES = {
+    'EarthChemQuery': 'complex',
+    'QueryParameters': 'complex',
+    'Reference': 'complex',
+    'Keyword': 'string',
+    'SampleID': 'string',
+    'CruiseID': 'string',
+    'Location': 'complex',
+    'SampleType': 'complex',
+    'Age': 'complex',
+    'Material': 'simple',
+    'OutputParameters': 'complex',
+    'OutputType': 'simple',
+    'OutputLevel': 'simple',
+    'OutputRows': 'complex',
+    'OutputItems': 'complex',
+    'StandardItems': 'simple',
+    'Item': 'complex'
+}
+
+# Allowed attributes (and their types) for each complex element
+ELEMENT_ATTRIBUTES = {
+    'Reference': {
+        'author': 'string',
+        'title': 'string',
+        'journal': 'string',
+        'doi': 'string',
+        'minpubyear': 'string',
+        'maxpubyear': 'string',
+        'exactpubyear': 'string'
+    },
+    'Location': {
+        'polygon': 'string',
+        'north': 'string',
+        'east': 'string',
+        'south': 'string',
+        'west': 'string'
+    },
+    'SampleType': {
+        'level1': 'simple',
+        'level2': 'simple',
+        'level3': 'simple',
+        'level4': 'simple'
+    },
+    'Age': {
+        'minage': 'string',
+        'maxage': 'string',
+        'exactage': 'string',
+        'geologicalage': 'simple'
+    },
+    'OutputRows': {
+        'start': 'integer',
+        'end': 'integer'
+    },
+    'Item': {
+        'name': 'simple'
+    }
+}
+
+# Allowed values for restricted simple elements
+ELEMENT_ENUMERATIONS = {
+    'Material': (
+        '',
+        'bulk',
+        'whole rock',
+        'glass',
+        'inclusion',
+    ),
+    'OutputType': (
+        'count',
+        'html',
+        'csv',
+        'xml',
+        'staticmap',
+    ),
+    'OutputLevel': (
+        'sample',
+        'method',
+    ),
+    'StandardItems': (
+        'yes',
+        'no',
+    )
+}
+
+# Allowed values for restricted attributes, keyed by (element, attribute)
+ATTRIBUTE_ENUMERATIONS = {
+    ('SampleType', 'level1'): (
+        '',
+        'alteration',
+        'igneous',
+        'metamorphic',
+        'notfound',
+        'ore',
+        'sedimentary',
+        'vein',
+        'xenolith',
+    ),
+    ('SampleType', 'level2'): (
+        '',
+        'plutonic',
+        'volcanic',
+    ),
+    ('SampleType', 'level3'): (
+        '',
+        'exotic',
+        'felsic',
+        'intermediate',
+        'mafic',
+        'ultramafic',
+    ),
+    ('SampleType', 'level4'): (
+        '',
+        'absarokite',
+        'adakite',
+        'adamellite',
+        'agglomerate',
+        'alaskite',
+        'albitite',
+        'alkali basalt',
+        'allivalite',
+        'alluvium',
+        'alvikite',
+        'amphibolite',
+        'andesite',
+        'anhydrite',
+        'ankaramite',
+        'anorthosite',
+        'aplite',
+        'arenite',
+        'argillite',
+        'argillitic',
+        'arkose',
+        'ash',
+        'augengneiss',
+        'augitite',
+        'basalt',
+        'basaltic-andesite',
+        'basanite',
+        'benmoreite',
+        'bergalite',
+        'biogenic',
+        'black-shale',
+        'blueschist',
+        'boninite',
+        'breccia',
+        'calcarenite',
+        'calcite',
+        'calcrete',
+        'calcsilicate',
+        'carbonate',
+        'carbonatite',
+        'chalk',
+        'charnockite',
+        'chemical sediments',
+        'chert',
+        'chert-jasperoid',
+        'chromitite',
+        'clastic',
+        'clay',
+        'claystone',
+        'clinopyroxenite',
+        'coal',
+        'comendite',
+        'concretion',
+        'conglomerate',
+        'coquina',
+        'cortlandite',
+        'crinanite',
+        'dacite',
+        'dellenite',
+        'diabase',
+        'diatomite',
+        'diorite',
+        'disseminated',
+        'dolerite',
+        'dolomite',
+        'domite',
+        'dunite',
+        'eclogite',
+        'enderbite',
+        'epidotite',
+        'epigenetic',
+        'essexite',
+        'etindite',
+        'eucrite',
+        'eutaxite',
+        'evaporites',
+        'exhalite',
+        'fault',
+        'feldspathic',
+        'felsite',
+        'fenite',
+        'fergusite',
+        'flysch',
+        'foidite',
+        'foyaite',
+        'gabbro',
+        'garnetite',
+        'gauteite',
+        'glass',
+        'glauconite',
+        'glenmuirite',
+        'glimmerite',
+        'gneiss',
+        'gossan',
+        'gouge',
+        'granite',
+        'granodiorite',
+        'granofels',
+        'granophyre',
+        'granulite',
+        'gravel',
+        'gravel and sand',
+        'graywacke',
+        'grazinite',
+        'greenschist',
+        'greenstone',
+        'greisen',
+        'greywacke',
+        'gypsum',
+        'harzburgite',
+        'hauynophyre',
+        'hawaiite',
+        'hornblendite',
+        'hornfels',
+        'hot springs',
+        'icelandite',
+        'ignimbrite',
+        'iron',
+        'iron formation',
+        'iron/manganese',
+        'ironstone',
+        'katungite',
+        'keratophyre',
+        'kimberlite',
+        'lamproite',
+        'lamprophyre',
+        'latite',
+        'leucitite',
+        'leucophyre',
+        'lherzolite',
+        'limburgite',
+        'limestone',
+        'madupite',
+        'magmatic segregation',
+        'magnesite',
+        'magnetite',
+        'malignite',
+        'marble',
+        'marl',
+        'marlstone',
+        'massive sulfide',
+        'megacryst',
+        'melange',
+        'meta-adamellite',
+        'meta-andesite',
+        'meta-aplite',
+        'meta-arenite',
+        'meta-argillite',
+        'meta-arkose',
+        'meta-basalt',
+        'meta-basite',
+        'meta-breccia',
+        'meta-carbonatite',
+        'meta-chert',
+        'meta-claystone',
+        'meta-conglomerate',
+        'meta-diorite',
+        'meta-dunite',
+        'meta-exhalite',
+        'meta-felsite',
+        'meta-gabbro',
+        'meta-grabbro',
+        'meta-granite',
+        'meta-granodiorite',
+        'meta-graywacke',
+        'meta-hornblendite',
+        'meta-igneous',
+        'meta-keratophyre',
+        'meta-latite',
+        'metaliferous',
+        'meta-mafite',
+        'meta-monzodiorite',
+        'meta-monzonite',
+        'meta-norite',
+        'meta-pegmatite',
+        'meta-pelite',
+        'meta-peridotite',
+        'meta-porphyry',
+        'meta-pyroxenite',
+        'meta-quartzite',
+        'meta-rhyodacite',
+        'meta-rhyoite',
+        'meta-sandstone',
+        'meta-sediment',
+        'meta-seyenite',
+        'meta-shale',
+        'meta-spilite',
+        'meta-syenite',
+        'meta-tactite',
+        'meta-tonalite',
+        'meta-trachyte',
+        'meta-trondhjemite',
+        'meta-tuff',
+        'meta-volcaniclastic',
+        'migmatite',
+        'minette',
+        'monchiquite',
+        'monzodiorite',
+        'monzogabbro',
+        'monzogranite',
+        'monzonite',
+        'monzosyenite',
+        'mud',
+        'mudstone',
+        'mugearite',
+        'mylonite',
+        'nephelin-basalt',
+        'nephelin-gabbro',
+        'nephelinite',
+        'norite',
+        'not-given',
+        'novaculite',
+        'oil shale',
+        'opal',
+        'orendite',
+        'orthogneiss',
+        'orthopyroxenite',
+        'pantellerite',
+        'paragneiss',
+        'pegmatite',
+        'pelite',
+        'peridotite',
+        'phillipsite',
+        'phonolite',
+        'phosphate',
+        'phosphorite',
+        'phyllite',
+        'picrite',
+        'placer',
+        'plutonic',
+        'porcellanite',
+        'porphyry-stockwork',
+        'propylitic',
+        'pumice',
+        'pyrite',
+        'pyroclastic-fall',
+        'pyroclastic-flow',
+        'pyroxenite',
+        'pyrrhotite',
+        'quartz',
+        'quartz arenite',
+        'quartzite',
+        'quartz vein',
+        'replacement',
+        'replacement-massive sulfide',
+        'residual',
+        'rhyodacite',
+        'rhyolite',
+        'rodingite',
+        'sand',
+        'sandstone',
+        'sanidinite',
+        'sannaite',
+        'santorinite',
+        'sanukite',
+        'schist',
+        'scoria',
+        'sericitic',
+        'serpentinite',
+        'shonkinite',
+        'shoshonite',
+        'siderite',
+        'siliceous',
+        'siliciclastic',
+        'silt',
+        'siltstone',
+        'sinter',
+        'skarn',
+        'slate',
+        'soapstone',
+        'sovite',
+        'spessartite',
+        'spiculite',
+        'spilite',
+        'stratiform',
+        'sulfate deposit',
+        'syenite',
+        'tachylyte',
+        'taconite',
+        'tactite',
+        'tahitite',
+        'talc',
+        'tannbuschite',
+        'tephrite',
+        'teschenite',
+        'theralite',
+        'tholeiite',
+        'till',
+        'tinguaite',
+        'tonalite',
+        'tonstein',
+        'tourmalinite',
+        'trachyandesite',
+        'trachybasalt',
+        'trachydacite',
+        'trachydolerite',
+        'trachyte',
+        'travertine',
+        'tristanite',
+        'troctolite',
+        'trondhjemite',
+        'tufa',
+        'tuff',
+        'turbidite',
+        'vitrophere',
+        'vitrophyre',
+        'vogesite',
+        'volcaniclastic',
+        'volcaniclastics',
+        'wacke',
+        'water-laid tuff',
+        'websterite',
+        'wehrlite',
+        'wyomingite',
+    ),
+    ('Age', 'geologicalage'): (
+        '',
+        'cenozoic',
+        'quaternary',
+        'holocene',
+        'pleistocene',
+        'calabrian',
+        'gelasian',
+        'tertiary',
+        'neogene',
+        'pliocene',
+        'piacenzian',
+        'zanclean',
+        'miocene',
+        'messinian',
+        'tortonian',
+        'serravallian',
+        'langhian',
+        'burdigalian',
+        'aquitanian',
+        'oligocene',
+        'chattian',
+        'rupelian',
+        'eocene',
+        'priabonian',
+        'bartonian',
+        'lutetian',
+        'ypresian',
+        'paleocene',
+        'thanetian',
+        'selandian',
+        'danian',
+        'mesozoic',
+        'cretaceous',
+        'late cretaceous',
+        'maastrichtian',
+        'campanian',
+        'santonian',
+        'coniacian',
+        'turonian',
+        'cenomanian',
+        'early cretacious',
+        'albian',
+        'aptian',
+        'barremian',
+        'hauterivian',
+        'valanginian',
+        'berriasian',
+        'jurassic',
+        'late jurassic',
+        'tithonian',
+        'kimmeridgian',
+        'oxfordian',
+        'middle jurassic',
+        'callovian',
+        'bathonian',
+        'bajocian',
+        'aalenian',
+        'early jurassic',
+        'toarcian',
+        'pliensbachian',
+        'sinemurian',
+        'hettangian',
+        'triassic',
+        'late triassic',
+        'rhaetian',
+        'norian',
+        'carnian',
+        'middle triassic',
+        'ladinian',
+        'anisian',
+        'early triassic',
+        'olenekian',
+        'induan',
+        'paleozoic',
+        'permian',
+        'late permian',
+        'changhsingian',
+        'wuchiapingian',
+        'midle permian',
+        'capitanian',
+        'wordian',
+        'roadian',
+        'early permian',
+        'kungurian',
+        'artinskian',
+        'sakmarian',
+        'asselian',
+        'carboniferous',
+        'pennsylvanian',
+        'gzelian',
+        'kasimovian',
+        'moscovian',
+        'bashkirian',
+        'mississippian',
+        'serpukhovian',
+        'visean',
+        'tournaisian',
+        'devonian',
+        'late devonian',
+        'famennian',
+        'frasnian',
+        'middle devonian',
+        'givetian',
+        'eifelian',
+        'early devonian',
+        'emsian',
+        'praghian',
+        'lockhovian',
+        'silurian',
+        'late silurian',
+        'pridolian',
+        'ludfordian',
+        'gorstian',
+        'middle silurian',
+        'homerian',
+        'sheinwoodian',
+        'early silurian',
+        'telychian',
+        'aeronian',
+        'rhuddanian',
+        'ordovician',
+        'late ordovician',
+        'hirnantian',
+        'katian',
+        'sandbian',
+        'middle ordovician',
+        'darriwilian',
+        'dapingian',
+        'early ordovician',
+        'floian',
+        'tremadocian',
+        'cambrian',
+        'furongian',
+        'stage 10',
+        'stage 9',
+        'paibian',
+        'series 3',
+        'guzhangian',
+        'drumian',
+        'stage 5',
+        'series 2',
+        'stage 4',
+        'stage 3',
+        'terreveuvian',
+        'stage 2',
+        'fortunian',
+        'precambrian',
+        'proterozoic',
+        'neoproterozoic',
+        'ediacaran',
+        'cryogenian',
+        'tonian',
+        'meseoproterozoic',
+        'stenian',
+        'ectasian',
+        'calymmian',
+        'paleoproterozoic',
+        'statherian',
+        'orosirian',
+        'rhyacian',
+        'siderian',
+        'archean',
+        'neoarchean',
+        'mesoarchean',
+        'paleoarchean',
+        'eoarchean',
+        'hadean',
+    ),
+    ('Item', 'name'): (
+        'sample_id',
+        'source',
+        'url',
+        'title',
+        'journal',
+        'author',
+        'longitude',
+        'latitude',
+        'method',
+        'material',
+        'type',
+        'composition',
+        'rock_name',
+        'sio2',
+        'tio2',
+        'al2o3',
+        'fe2o3',
+        'fe2o3t',
+        'feo',
+        'feot',
+        'mgo',
+        'cao',
+        'na2o',
+        'k2o',
+        'p2o5',
+        'mno',
+        'loi',
+        'h2o_plus',
+        'h2o_minus',
+        'h2o',
+        'h2o_total',
+        'cr2o3',
+        'la',
+        'nio',
+        'ce',
+        'pr',
+        'nd',
+        'sm',
+        'eu',
+        'gd',
+        'tb',
+        'dy',
+        'ho',
+        'er',
+        'tm',
+        'yb',
+        'lu',
+        'li',
+        'be',
+        'b',
+        'c',
+        'co2',
+        'f',
+        'cl',
+        'k',
+        'ca',
+        'mg',
+        'sc',
+        'ti',
+        'v',
+        'fe',
+        'cr',
+        'mn',
+        'co',
+        'ni',
+        'cu',
+        'zn',
+        'ga',
+        'zr',
+        'ag',
+        'al',
+        'ar36_ar39',
+        'ar37_ar39',
+        'ar37_ar40',
+        'ar38_ar36',
+        'ar39_ar36',
+        'ar40_ar36',
+        'ar40_ar39',
+        'ar40_k40',
+        'arsenic',
+        'au',
+        'ba',
+        'be10_be',
+        'be10_be9',
+        'bi',
+        'cd',
+        'cl36_cl',
+        'cs',
+        'd18o',
+        'h',
+        'he3_he4',
+        'he4_he3',
+        'he4_ne20',
+        'hf',
+        'hf176_hf177',
+        'hg',
+        'i',
+        'ir',
+        'k40_ar36',
+        'kr78_kr84',
+        'kr80_kr84',
+        'kr82_kr84',
+        'kr83_kr84',
+        'kr86_kr84',
+        'lu176_hf177',
+        'mo',
+        'nb',
+        'nd143_nd144',
+        'ne20_ne22',
+        'ne21_ne20',
+        'ne21_ne22',
+        'ne22_ne20',
+        'os',
+        'os184_os188',
+        'os186_os188',
+        'os187_os186',
+        'os187_os188',
+        'p',
+        'pb',
+        'pb206_pb204',
+        'pb206_pb207',
+        'pb206_pb208',
+        'pb207_pb204',
+        'pb208_pb204',
+        'pb208_pb206',
+        'pb210_ra226',
+        'pb210_u238',
+        'pd',
+        'po210_rn222',
+        'po210_th230',
+        'pt',
+        'ra226_th228',
+        'ra226_th230',
+        'rb',
+        're',
+        's',
+        'sb',
+        'se',
+        'sn',
+        'sr',
+        'sr87_sr86',
+        'ta',
+        'te',
+        'th',
+        'th230_ra232',
+        'th230_u238',
+        'th232_th230',
+        'tl',
+        'u',
+        'u234_u238',
+        'w',
+        'xe124_xe130',
+        'xe124_xe132',
+        'xe126_xe130',
+        'xe126_xe132',
+        'xe128_xe130',
+        'xe128_xe132',
+        'xe129_xe130',
+        'xe129_xe132',
+        'xe130_xe132',
+        'xe131_xe130',
+        'xe131_xe132',
+        'xe132_xe130',
+        'xe134_xe130',
+        'xe134_xe132',
+        'xe136_xe130',
+        'xe136_xe132',
+        'y',
+        'acmite',
+        'albite',
+        'anorthite',
+        'apatite',
+        'calcite',
+        'calciumorthosilicate',
+        'chromite',
+        'corundum',
+        'diopside',
+        'enstatite',
+        'fayalite',
+        'ferrosilite',
+        'fluorite',
+        'forsterite',
+        'halite',
+        'hedenbergite',
+        'hematite',
+        'hypersthene',
+        'ilmenite',
+        'kaliophilite',
+        'leucite',
+        'magnetite',
+        'nepheline',
+        'olivine',
+        'orthoclase',
+        'perofskite',
+        'potassiummetasilicate',
+        'pyrite',
+        'quartz',
+        'rutile',
+        'sodiumcarbonate',
+        'sodiummetasilicate',
+        'thenardite',
+        'titanite',
+        'wollastonite',
+        'zircon',
+    )
+}
+
+# Allowed values keyed by the REST query key
+QUERY_ENUMERATIONS = {
+    'level1': (
+        '',
+        'alteration',
+        'igneous',
+        'metamorphic',
+        'notfound',
+        'ore',
+        'sedimentary',
+        'vein',
+        'xenolith',
+    ),
+    'level2': (
+        '',
+        'plutonic',
+        'volcanic',
+    ),
+    'level3': (
+        '',
+        'exotic',
+        'felsic',
+        'intermediate',
+        'mafic',
+        'ultramafic',
+    ),
+    'level4': (
+        '',
+        'absarokite',
+        'adakite',
+        'adamellite',
+        'agglomerate',
+        'alaskite',
+        'albitite',
+        'alkali basalt',
+        'allivalite',
+        'alluvium',
+        'alvikite',
+        'amphibolite',
+        'andesite',
+        'anhydrite',
+        'ankaramite',
+        'anorthosite',
+        'aplite',
+        'arenite',
+        'argillite',
+        'argillitic',
+        'arkose',
+        'ash',
+        'augengneiss',
+        'augitite',
+        'basalt',
+        'basaltic-andesite',
+        'basanite',
+        'benmoreite',
+        'bergalite',
+        'biogenic',
+        'black-shale',
+        'blueschist',
+        'boninite',
+        'breccia',
+        'calcarenite',
+        'calcite',
+        'calcrete',
+        'calcsilicate',
+        'carbonate',
+        'carbonatite',
+        'chalk',
+        'charnockite',
+        'chemical sediments',
+        'chert',
+        'chert-jasperoid',
+        'chromitite',
+        'clastic',
+        'clay',
+        'claystone',
+        'clinopyroxenite',
+        'coal',
+        'comendite',
+        'concretion',
+        'conglomerate',
+        'coquina',
+        'cortlandite',
+        'crinanite',
+        'dacite',
+        'dellenite',
+        'diabase',
+        'diatomite',
+        'diorite',
+        'disseminated',
+        'dolerite',
+        'dolomite',
+        'domite',
+        'dunite',
+        'eclogite',
+        'enderbite',
+        'epidotite',
+        'epigenetic',
+        'essexite',
+        'etindite',
+        'eucrite',
+        'eutaxite',
+        'evaporites',
+        'exhalite',
+        'fault',
+        'feldspathic',
+        'felsite',
+        'fenite',
+        'fergusite',
+        'flysch',
+        'foidite',
+        'foyaite',
+        'gabbro',
+        'garnetite',
+        'gauteite',
+        'glass',
+        'glauconite',
+        'glenmuirite',
+        'glimmerite',
+        'gneiss',
+        'gossan',
+        'gouge',
+        'granite',
+        'granodiorite',
+        'granofels',
+        'granophyre',
+        'granulite',
+        'gravel',
+        'gravel and sand',
+        'graywacke',
+        'grazinite',
+        'greenschist',
+        'greenstone',
+        'greisen',
+        'greywacke',
+        'gypsum',
+        'harzburgite',
+        'hauynophyre',
+        'hawaiite',
+        'hornblendite',
+        'hornfels',
+        'hot springs',
+        'icelandite',
+        'ignimbrite',
+        'iron',
+        'iron formation',
+        'iron/manganese',
+        'ironstone',
+        'katungite',
+        'keratophyre',
+        'kimberlite',
+        'lamproite',
+        'lamprophyre',
+        'latite',
+        'leucitite',
+        'leucophyre',
+        'lherzolite',
+        'limburgite',
+        'limestone',
+        'madupite',
+        'magmatic segregation',
+        'magnesite',
+        'magnetite',
+        'malignite',
+        'marble',
+        'marl',
+        'marlstone',
+        'massive sulfide',
+        'megacryst',
+        'melange',
+        'meta-adamellite',
+        'meta-andesite',
+        'meta-aplite',
+        'meta-arenite',
+        'meta-argillite',
+        'meta-arkose',
+        'meta-basalt',
+        'meta-basite',
+        'meta-breccia',
+        'meta-carbonatite',
+        'meta-chert',
+        'meta-claystone',
+        'meta-conglomerate',
+        'meta-diorite',
+        'meta-dunite',
+        'meta-exhalite',
+        'meta-felsite',
+        'meta-gabbro',
+        'meta-grabbro',
+        'meta-granite',
+        'meta-granodiorite',
+        'meta-graywacke',
+        'meta-hornblendite',
+        'meta-igneous',
+        'meta-keratophyre',
+        'meta-latite',
+        'metaliferous',
+        'meta-mafite',
+        'meta-monzodiorite',
+        'meta-monzonite',
+        'meta-norite',
+        'meta-pegmatite',
+        'meta-pelite',
+        'meta-peridotite',
+        'meta-porphyry',
+        'meta-pyroxenite',
+        'meta-quartzite',
+        'meta-rhyodacite',
+        'meta-rhyoite',
+        'meta-sandstone',
+        'meta-sediment',
+        'meta-seyenite',
+        'meta-shale',
+        'meta-spilite',
+        'meta-syenite',
+        'meta-tactite',
+        'meta-tonalite',
+        'meta-trachyte',
+        'meta-trondhjemite',
+        'meta-tuff',
+        'meta-volcaniclastic',
+        'migmatite',
+        'minette',
+        'monchiquite',
+        'monzodiorite',
+        'monzogabbro',
+        'monzogranite',
+        'monzonite',
+        'monzosyenite',
+        'mud',
+        'mudstone',
+        'mugearite',
+        'mylonite',
+        'nephelin-basalt',
+        'nephelin-gabbro',
+        'nephelinite',
+        'norite',
+        'not-given',
+        'novaculite',
+        'oil shale',
+        'opal',
+        'orendite',
+        'orthogneiss',
+        'orthopyroxenite',
+        'pantellerite',
+        'paragneiss',
+        'pegmatite',
+        'pelite',
+        'peridotite',
+        'phillipsite',
+        'phonolite',
+        'phosphate',
+        'phosphorite',
+        'phyllite',
+        'picrite',
+        'placer',
+        'plutonic',
+        'porcellanite',
+        'porphyry-stockwork',
+        'propylitic',
+        'pumice',
+        'pyrite',
+        'pyroclastic-fall',
+        'pyroclastic-flow',
+        'pyroxenite',
+        'pyrrhotite',
+        'quartz',
+        'quartz arenite',
+        'quartzite',
+        'quartz vein',
+        'replacement',
+        'replacement-massive sulfide',
+        'residual',
+        'rhyodacite',
+        'rhyolite',
+        'rodingite',
+        'sand',
+        'sandstone',
+        'sanidinite',
+        'sannaite',
+        'santorinite',
+        'sanukite',
+        'schist',
+        'scoria',
+        'sericitic',
+        'serpentinite',
+        'shonkinite',
+        'shoshonite',
+        'siderite',
+        'siliceous',
+        'siliciclastic',
+        'silt',
+        'siltstone',
+        'sinter',
+        'skarn',
+        'slate',
+        'soapstone',
+        'sovite',
+        'spessartite',
+        'spiculite',
+        'spilite',
+        'stratiform',
+        'sulfate deposit',
+        'syenite',
+        'tachylyte',
+        'taconite',
+        'tactite',
+        'tahitite',
+        'talc',
+        'tannbuschite',
+        'tephrite',
+        'teschenite',
+        'theralite',
+        'tholeiite',
+        'till',
+        'tinguaite',
+        'tonalite',
+        'tonstein',
+        'tourmalinite',
+        'trachyandesite',
+        'trachybasalt',
+        'trachydacite',
+        'trachydolerite',
+        'trachyte',
+        'travertine',
+        'tristanite',
+        'troctolite',
+        'trondhjemite',
+        'tufa',
+        'tuff',
+        'turbidite',
+        'vitrophere',
+        'vitrophyre',
+        'vogesite',
+        'volcaniclastic',
+        'volcaniclastics',
+        'wacke',
+        'water-laid tuff',
+        'websterite',
+        'wehrlite',
+        'wyomingite',
+    ),
+    'geologicalage': (
+        '',
+        'cenozoic',
+        'quaternary',
+        'holocene',
+        'pleistocene',
+        'calabrian',
+        'gelasian',
+        'tertiary',
+        'neogene',
+        'pliocene',
+        'piacenzian',
+        'zanclean',
+        'miocene',
+        'messinian',
+        'tortonian',
+        'serravallian',
+        'langhian',
+        'burdigalian',
+        'aquitanian',
+        'oligocene',
+        'chattian',
+        'rupelian',
+        'eocene',
+        'priabonian',
+        'bartonian',
+        'lutetian',
+        'ypresian',
+        'paleocene',
+        'thanetian',
+        'selandian',
+        'danian',
+        'mesozoic',
+        'cretaceous',
+        'late cretaceous',
+        'maastrichtian',
+        'campanian',
+        'santonian',
+        'coniacian',
+        'turonian',
+        'cenomanian',
+        'early cretacious',
+        'albian',
+        'aptian',
+        'barremian',
+        'hauterivian',
+        'valanginian',
+        'berriasian',
+        'jurassic',
+        'late jurassic',
+        'tithonian',
+        'kimmeridgian',
+        'oxfordian',
+        'middle jurassic',
+        'callovian',
+        'bathonian',
+        'bajocian',
+        'aalenian',
+        'early jurassic',
+        'toarcian',
+        'pliensbachian',
+        'sinemurian',
+        'hettangian',
+        'triassic',
+        'late triassic',
+        'rhaetian',
+        'norian',
+        'carnian',
+        'middle triassic',
+        'ladinian',
+        'anisian',
+        'early triassic',
+        'olenekian',
+        'induan',
+        'paleozoic',
+        'permian',
+        'late permian',
+        'changhsingian',
+        'wuchiapingian',
+        'midle permian',
+        'capitanian',
+        'wordian',
+        'roadian',
+        'early permian',
+        'kungurian',
+        'artinskian',
+        'sakmarian',
+        'asselian',
+        'carboniferous',
+        'pennsylvanian',
+        'gzelian',
+        'kasimovian',
+        'moscovian',
+        'bashkirian',
+        'mississippian',
+        'serpukhovian',
+        'visean',
+        'tournaisian',
+        'devonian',
+        'late devonian',
+        'famennian',
+        'frasnian',
+        'middle devonian',
+        'givetian',
+        'eifelian',
+        'early devonian',
+        'emsian',
+        'praghian',
+        'lockhovian',
+        'silurian',
+        'late silurian',
+        'pridolian',
+        'ludfordian',
+        'gorstian',
+        'middle silurian',
+        'homerian',
+        'sheinwoodian',
+        'early silurian',
+        'telychian',
+        'aeronian',
+        'rhuddanian',
+        'ordovician',
+        'late ordovician',
+        'hirnantian',
+        'katian',
+        'sandbian',
+        'middle ordovician',
+        'darriwilian',
+        'dapingian',
+        'early ordovician',
+        'floian',
+        'tremadocian',
+        'cambrian',
+        'furongian',
+        'stage 10',
+        'stage 9',
+        'paibian',
+        'series 3',
+        'guzhangian',
+        'drumian',
+        'stage 5',
+        'series 2',
+        'stage 4',
+        'stage 3',
+        'terreveuvian',
+        'stage 2',
+        'fortunian',
+        'precambrian',
+        'proterozoic',
+        'neoproterozoic',
+        'ediacaran',
+        'cryogenian',
+        'tonian',
+        'meseoproterozoic',
+        'stenian',
+        'ectasian',
+        'calymmian',
+        'paleoproterozoic',
+        'statherian',
+        'orosirian',
+        'rhyacian',
+        'siderian',
+        'archean',
+        'neoarchean',
+        'mesoarchean',
+        'paleoarchean',
+        'eoarchean',
+        'hadean',
+    ),
+    'material': (
+        '',
+        'bulk',
+        'whole rock',
+        'glass',
+        'inclusion',
+    ),
+    'outputtype': (
+        'count',
+        'html',
+        'csv',
+        'xml',
+        'staticmap',
+    ),
+    'outputlevel': (
+        'sample',
+        'method',
+    ),
+    'standarditems': (
+        'yes',
+        'no',
+    ),
+    'outputitems': (
+        'sample_id',
+        'source',
+        'url',
+        'title',
+        'journal',
+        'author',
+        'longitude',
+        'latitude',
+        'method',
+        'material',
+        'type',
+        'composition',
+        'rock_name',
+        'sio2',
+        'tio2',
+        'al2o3',
+        'fe2o3',
+        'fe2o3t',
+        'feo',
+        'feot',
+        'mgo',
+        'cao',
+        'na2o',
+        'k2o',
+        'p2o5',
+        'mno',
+        'loi',
+        'h2o_plus',
+        'h2o_minus',
+        'h2o',
+        'h2o_total',
+        'cr2o3',
+        'la',
+        'nio',
+        'ce',
+        'pr',
+        'nd',
+        'sm',
+        'eu',
+        'gd',
+        'tb',
+        'dy',
+        'ho',
+        'er',
+        'tm',
+        'yb',
+        'lu',
+        'li',
+        'be',
+        'b',
+        'c',
+        'co2',
+        'f',
+        'cl',
+        'k',
+        'ca',
+        'mg',
+        'sc',
+        'ti',
+        'v',
+        'fe',
+        'cr',
+        'mn',
+        'co',
+        'ni',
+        'cu',
+        'zn',
+        'ga',
+        'zr',
+        'ag',
+        'al',
+        'ar36_ar39',
+        'ar37_ar39',
+        'ar37_ar40',
+        'ar38_ar36',
+        'ar39_ar36',
+        'ar40_ar36',
+        'ar40_ar39',
+        'ar40_k40',
+        'arsenic',
+        'au',
+        'ba',
+        'be10_be',
+        'be10_be9',
+        'bi',
+        'cd',
+        'cl36_cl',
+        'cs',
+        'd18o',
+        'h',
+        'he3_he4',
+        'he4_he3',
+        'he4_ne20',
+        'hf',
+        'hf176_hf177',
+        'hg',
+        'i',
+        'ir',
+        'k40_ar36',
+        'kr78_kr84',
+        'kr80_kr84',
+        'kr82_kr84',
+        'kr83_kr84',
+        'kr86_kr84',
+        'lu176_hf177',
+        'mo',
+        'nb',
+        'nd143_nd144',
+        'ne20_ne22',
+        'ne21_ne20',
+        'ne21_ne22',
+        'ne22_ne20',
+        'os',
+        'os184_os188',
+        'os186_os188',
+        'os187_os186',
+        'os187_os188',
+        'p',
+        'pb',
+        'pb206_pb204',
+        'pb206_pb207',
+        'pb206_pb208',
+        'pb207_pb204',
+        'pb208_pb204',
+        'pb208_pb206',
+        'pb210_ra226',
+        'pb210_u238',
+        'pd',
+        'po210_rn222',
+        'po210_th230',
+        'pt',
+        'ra226_th228',
+        'ra226_th230',
+        'rb',
+        're',
+        's',
+        'sb',
+        'se',
+        'sn',
+        'sr',
+        'sr87_sr86',
+        'ta',
+        'te',
+        'th',
+        'th230_ra232',
+        'th230_u238',
+        'th232_th230',
+        'tl',
+        'u',
+        'u234_u238',
+        'w',
+        'xe124_xe130',
+        'xe124_xe132',
+        'xe126_xe130',
+        'xe126_xe132',
+        'xe128_xe130',
+        'xe128_xe132',
+        'xe129_xe130',
+        'xe129_xe132',
+        'xe130_xe132',
+        'xe131_xe130',
+        'xe131_xe132',
+        'xe132_xe130',
+        'xe134_xe130',
+        'xe134_xe132',
+        'xe136_xe130',
+        'xe136_xe132',
+        'y',
+        'acmite',
+        'albite',
+        'anorthite',
+        'apatite',
+        'calcite',
+        'calciumorthosilicate',
+        'chromite',
+        'corundum',
+        'diopside',
+        'enstatite',
+        'fayalite',
+        'ferrosilite',
+        'fluorite',
+        'forsterite',
+        'halite',
+        'hedenbergite',
+        'hematite',
+        'hypersthene',
+        'ilmenite',
+        'kaliophilite',
+        'leucite',
+        'magnetite',
+        'nepheline',
+        'olivine',
+        'orthoclase',
+        'perofskite',
+        'potassiummetasilicate',
+        'pyrite',
+        'quartz',
+        'rutile',
+        'sodiumcarbonate',
+        'sodiummetasilicate',
+        'thenardite',
+        'titanite',
+        'wollastonite',
+        'zircon',
+    )
+}
@@ -0,0 +1,178 @@
+""" file:   codegen.py
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Build-time generation of the schema tables in _schema.py
+
+    This is the only place that needs lxml to read the SOAP search schema - it
+    gets run by `python setup.py build_schema` and writes out a plain Python
+    module so that validation and querying don't need to parse XML at
+    runtime. Rerun it whenever soap_search_schema.xsd changes.
+"""
+
+from lxml import etree
+
+from collections import OrderedDict
+import os
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOAP_SCHEMA = os.path.join(HERE, 'resources', 'soap_search_schema.xsd')
+SCHEMA_MODULE = os.path.join(HERE, '_schema.py')
+
+# Mapping XML types to our simple types
+TYPE_MAPPING = {
+    '{http://www.w3.org/2001/XMLSchema}complexType': 'complex',
+    '{http://www.w3.org/2001/XMLSchema}simpleType': 'simple',
+    '{http://www.w3.org/2001/XMLSchema}string': 'string',
+    'xs:string': 'string',
+    'xs:integer': 'integer'
+}
+
+# Mapping for namespaces
+_NS = {"xs": "http://www.w3.org/2001/XMLSchema"}
+
+# REST query keys which don't share a name with their schema element/attribute
+REST_KEY_ALIASES = {
+    ('Item', 'name'): 'outputitems'
+}
+
+HEADER = '''\
+""" file:   _schema.py
+    description: Key and type tables for the EarthChem SOAP search schema
+
+    DO NOT EDIT - this file is generated from
+    earthchem/resources/soap_search_schema.xsd by earthchem/codegen.py.
+    Run `python setup.py build_schema` to regenerate it.
+"""
+'''
+
+def get_type(elem):
+    """ Get the data type for an XML element
+    """
+    # First check the attributes
+    attrtype = elem.get('type')
+    if attrtype is not None:
+        return TYPE_MAPPING[attrtype]
+
+    # Ok so there's probably some children to check then
+    # If we have children then we can have a complex type or a simple type
+    # If an xs:complexType we make a dict, if xs:simpleType we expect a string
+    for child in elem.getchildren():
+        try:
+            return TYPE_MAPPING[child.tag]
+        except KeyError:
+            continue
+
+    # If we're here we will just assume that the type is 'string'
+    return TYPE_MAPPING['xs:string']
+
+def get_enumeration(elem):
+    """ Get the enumerated values for an element with an xs:simpleType
+        restriction, or None if the values aren't restricted
+    """
+    values = elem.xpath(
+        './xs:simpleType/xs:restriction/xs:enumeration/@value',
+        namespaces=_NS)
+    return tuple(values) if values else None
+
+def parse_schema(schema=SOAP_SCHEMA):
+    """ Pull the key and type tables out of the SOAP search schema
+
+        Parameters:
+            schema - the path to the XSD file to parse
+
+        Returns:
+            an OrderedDict of table names to tables, ready to be rendered
+            into a Python module
+    """
+    with open(schema, 'r') as src:
+        tree = etree.parse(src)
+
+    element_types = OrderedDict()
+    element_attributes = OrderedDict()
+    element_enumerations = OrderedDict()
+    attribute_enumerations = OrderedDict()
+    query_enumerations = OrderedDict()
+    for elem in tree.xpath('//xs:element[@name]', namespaces=_NS):
+        name = elem.get('name')
+        element_types[name] = get_type(elem)
+
+        # Simple elements might have a fixed set of values
+        values = get_enumeration(elem)
+        if values is not None:
+            element_enumerations[name] = values
+            query_enumerations[name.lower()] = values
+
+        # Complex elements have attributes with their own types
+        attributes = elem.xpath('./xs:complexType/xs:attribute',
+                                namespaces=_NS)
+        if attributes:
+            element_attributes[name] = OrderedDict(
+                (attr.get('name'), get_type(attr)) for attr in attributes)
+        for attr in attributes:
+            values = get_enumeration(attr)
+            if values is not None:
+                attrname = attr.get('name')
+                attribute_enumerations[(name, attrname)] = values
+                key = REST_KEY_ALIASES.get((name, attrname), attrname)
+                query_enumerations[key] = values
+
+    return OrderedDict([
+        ('ELEMENT_TYPES', element_types),
+        ('ELEMENT_ATTRIBUTES', element_attributes),
+        ('ELEMENT_ENUMERATIONS', element_enumerations),
+        ('ATTRIBUTE_ENUMERATIONS', attribute_enumerations),
+        ('QUERY_ENUMERATIONS', query_enumerations)
+    ])
+
+def render_value(value, indent=0):
+    """ Render a (possibly nested) dict/tuple of strings as Python source
+    """
+    pad = ' ' * (indent + 4)
+    if isinstance(value, dict):
+        if not value:
+            return '{}'
+        items = ',\n'.join(
+            '{0}{1!r}: {2}'.format(pad, key, render_value(val, indent + 4))
+            for key, val in value.items())
+        return '{{\n{0}\n{1}}}'.format(items, ' ' * indent)
+    elif isinstance(value, tuple):
+        items = ''.join('{0}{1!r},\n'.format(pad, val) for val in value)
+        return '(\n{0}{1})'.format(items, ' ' * indent)
+    return repr(value)
+
+COMMENTS = {
+    'ELEMENT_TYPES': 'Simple type of each schema element',
+    'ELEMENT_ATTRIBUTES': 'Allowed attributes (and their types) for each '
+                          'complex element',
+    'ELEMENT_ENUMERATIONS': 'Allowed values for restricted simple elements',
+    'ATTRIBUTE_ENUMERATIONS': 'Allowed values for restricted attributes, '
+                              'keyed by (element, attribute)',
+    'QUERY_ENUMERATIONS': 'Allowed values keyed by the REST query key'
+}
+
+def render_schema_module(schema=SOAP_SCHEMA):
+    """ Render the generated _schema.py module as a string
+
+        Parameters:
+            schema - the path to the XSD file to parse
+    """
+    source = HEADER
+    for name, table in parse_schema(schema).items():
+        source += '\n# {0}\n{1} = {2}\n'.format(
+            COMMENTS[name], name, render_value(table))
+    return source
+
+def main(schema=SOAP_SCHEMA, output=SCHEMA_MODULE):
+    """ Regenerate _schema.py from the SOAP search schema
+
+        Parameters:
+            schema - the path to the XSD file to parse
+            output - the path to write the Python module to
+    """
+    with open(output, 'w') as sink:
+        sink.write(render_schema_module(schema))
+    print('Wrote schema tables from {0} to {1}'.format(schema, output))
+
+if __name__ == '__main__':
+    main()
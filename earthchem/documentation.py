@@ -6,12 +6,11 @@
 """
 
 import requests
-from bs4 import BeautifulSoup
 
 from collections import OrderedDict
-import pkg_resources
+from functools import lru_cache
+import os
 import re
-import textwrap
 
 def strip_whitespace(string):
     """ Strip newline, tab and multple whitespace from a string
@@ -20,14 +19,14 @@ def strip_whitespace(string):
                   string.replace('\n', ' ').replace('\t', ' ').strip())
 
 
-# Construct request from EarthChem rest documentation
+# The documentation is parsed from the copy bundled in earthchem.resources,
+# so importing earthchem never touches the network. Pass refresh=True to
+# get_documentation to fetch the live version instead
 REST_DOCO_URL = 'http://ecp.iedadata.org/rest_search_documentation/'
-if not requests.get(REST_DOCO_URL).ok:
-    # We can just use the cached version
-    CACHED_DOCO_FILE = pkg_resources.resource_stream(
-        "earthchem.resources",
-        "earthchem_rest_search_documentation.html")
-    REST_DOCO_URL = 'file://' + str(CACHED_DOCO_FILE)
+REST_DOCO_TIMEOUT = 10  # seconds
+CACHED_DOCO_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    'resources', 'earthchem_rest_search_documentation.html')
 
 # Keys to ignore when constructing the query class
 IGNORE_VALUES = (
@@ -35,19 +34,36 @@ IGNORE_VALUES = (
     re.compile('level[0-9]')
 )
 
-def get_documentation():
-    """ Get query items and documentaton by scraping the EarthChem rest
-        documentation
+def get_documentation_html(refresh=False):
+    """ Get the raw EarthChem rest documentation
+
+        Parameters:
+            refresh - if True, try to download the live documentation,
+                falling back to the bundled copy if the site isn't
+                available. Optional, defaults to False (just use the
+                bundled copy)
+    """
+    if refresh:
+        try:
+            response = requests.get(REST_DOCO_URL, timeout=REST_DOCO_TIMEOUT)
+            if response.ok:
+                return response.text
+        except requests.exceptions.RequestException:
+            pass
+
+    with open(CACHED_DOCO_FILE, 'r') as src:
+        return src.read()
+
+@lru_cache(maxsize=None)
+def _parse_documentation(refresh=False):
+    """ Scrape the documentation once per process - BeautifulSoup is imported
+        here so that it stays out of the import path until it's needed
     """
-    # Hit the endpoint
-    response = requests.get(REST_DOCO_URL)
-    if response.ok:
-        soup = BeautifulSoup(response.text, 'lxml')
-    else:
-        raise IOError("Can't find Earthchem REST documentation")
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(get_documentation_html(refresh), 'html.parser')
 
     # Parse me some documentation
-    docs = OrderedDict()
+    docs = []
     for item in soup.select('.itemtitle'):
         # Check that we actually want to keep this value
         itemname = strip_whitespace(item.contents[0])
@@ -57,6 +73,16 @@ def get_documentation():
 
         # Parse document string, add to dictionary
         itemdoc = strip_whitespace(item.contents[1].contents[0])
-        docs[itemname] = itemdoc
+        docs.append((itemname, itemdoc))
 
-    return docs
+    return tuple(docs)
+
+def get_documentation(refresh=False):
+    """ Get query items and documentaton by scraping the EarthChem rest
+        documentation
+
+        Parameters:
+            refresh - if True, scrape the live documentation rather than
+                the copy bundled with earthchem. Optional, defaults to False
+    """
+    return OrderedDict(_parse_documentation(refresh))
@@ -1,31 +1,135 @@
+import os
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
 import pandas as pd
 import periodictable as pt
 
+from .transform.utilities import missingness_groups, pd_closure
+
+
+@lru_cache(maxsize=None)
+def _common_elements(cutoff):
+    """
+    Elements up to a cutoff as tuples and frozensets of formulae and
+    strings, built once per cutoff.
+    """
+    formulae = tuple(el for el in pt.elements
+                     if not (el.__str__() == 'n' or el.number>cutoff))
+    strings = tuple(el.__str__() for el in formulae)
+    return {'formula': (formulae, frozenset(formulae)),
+            'string': (strings, frozenset(strings))}
+
 
-def common_elements(cutoff=92, output='formula'):
+def common_elements(cutoff=92, output='formula', as_set=False):
     """
-    Provides a list of elements up to a particular cutoff (default: including U)
+    Provides a tuple of elements up to a particular cutoff (default: including U)
     Output options are 'formula', or strings.
+    Pass as_set=True to get a frozenset instead, for fast membership tests.
+    The results are cached, so repeat calls don't rescan the periodic table.
     """
-    elements = [el for el in pt.elements
-                if not (el.__str__() == 'n' or el.number>cutoff)]
-    if not output == 'formula':
-        elements = [el.__str__() for el in elements]
-    return elements
+    output = 'formula' if output == 'formula' else 'string'
+    elements, element_set = _common_elements(cutoff)[output]
+    return element_set if as_set else elements
 
 
-def REE(output='formula', include_extras=False):
+@lru_cache(maxsize=None)
+def element_order(cutoff=92):
     """
-    Provides the list of Rare Earth Elements
+    Provides a read-only map from element strings to their position in
+    common_elements, for ordering columns.
+    """
+    return MappingProxyType({el: idx for idx, el in
+                             enumerate(common_elements(cutoff, 'string'))})
+
+
+def order_components(columns, cutoff=92):
+    """
+    Picks out the columns which are elements, in periodic table order.
+    Columns are matched to elements ignoring case, so EarthChem's
+    lowercase columns ('la', 'k') work. Labels which aren't strings (or
+    are empty) are never elements.
+    """
+    order = element_order(cutoff)
+    keys = {c: _element_formula(c) for c in columns
+            if isinstance(c, str) and c}
+    return tuple(sorted((c for c in keys if keys[c] in order),
+                        key=lambda c: order[keys[c]]))
+
+
+_REE = ('La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm', 'Eu', 'Gd',
+        'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu')
+
+
+@lru_cache(maxsize=None)
+def _REE_variants():
+    formulae = tuple(getattr(pt, el) for el in _REE)
+    return {'formula': (formulae, frozenset(formulae)),
+            'string': (_REE, frozenset(_REE))}
+
+
+def REE(output='formula', include_extras=False, as_set=False):
+    """
+    Provides the tuple of Rare Earth Elements
     Output options are 'formula', or strings.
+    Pass as_set=True to get a frozenset instead, for fast membership tests.
 
     Todo: add include extras such as Y.
     """
-    elements = ['La', 'Ce', 'Pr', 'Nd', 'Pm', 'Sm', 'Eu', 'Gd',
-            'Tb', 'Dy', 'Ho', 'Er', 'Tm', 'Yb', 'Lu']
-    if output == 'formula':
-        elements = [getattr(pt, el) for el in elements]
-    return elements
+    output = 'formula' if output == 'formula' else 'string'
+    elements, element_set = _REE_variants()[output]
+    return element_set if as_set else elements
+
+
+def renormalise(df: pd.DataFrame, scale=100.):
+    """
+    Renormalises compositional data so that each row sums to scale
+    (default: 100, i.e. percent). Missing values are left out of the totals.
+    """
+    return pd_closure(df, constant=scale)
+
+
+@lru_cache(maxsize=1)
+def _element_masses():
+    """
+    Masses of everything common_elements returns, looked up once per
+    process. Elements don't need formula parsing so this is cheap.
+    """
+    return {str(el): el.mass for el in common_elements()}
+
+
+@lru_cache(maxsize=None)
+def formula_mass(component: str):
+    """
+    Returns the molecular weight of an element or oxide (e.g. 'SiO2'),
+    memoized so each formula is only parsed once per process.
+    EarthChem's lowercase columns (e.g. 'sio2', 'feot', 'h2o', 'la') work
+    too.
+    """
+    formula = OXIDES.get(component, VOLATILES.get(component, component))
+    mass = _element_masses().get(formula)
+    if mass is None and formula.islower():
+        mass = _element_masses().get(_element_formula(formula))
+    if mass is None:
+        mass = pt.formula(formula).mass
+    return mass
+
+
+@lru_cache(maxsize=256)
+def _molecular_weights(components: tuple):
+    MWs = np.array([formula_mass(c) for c in components])
+    MWs.flags.writeable = False
+    return MWs
+
+
+def molecular_weights(components):
+    """
+    Returns a read-only array of the molecular weights of some components,
+    cached by column set so repeat conversions of similar frames skip the
+    lookups entirely.
+    """
+    return _molecular_weights(tuple(components))
 
 
 def to_molecular(df: pd.DataFrame, renorm=True):
@@ -35,11 +139,13 @@ def to_molecular(df: pd.DataFrame, renorm=True):
     mass% --> mol%
     mass-ppm --> mol-ppm
     """
-    MWs = [pt.formula(c).mass for c in df.columns]
+    MWs = molecular_weights(df.columns)
+    df = pd.DataFrame(df.to_numpy(dtype=float) / MWs,
+                      index=df.index, columns=df.columns)
     if renorm:
-         return renormalise(df.div(MWs))
+        return renormalise(df)
     else:
-        return df.div(MWs)
+        return df
 
 
 def to_weight(df: pd.DataFrame, renorm=True):
@@ -49,8 +155,331 @@ def to_weight(df: pd.DataFrame, renorm=True):
     mol% --> mass%
     mol-ppm --> mass-ppm
     """
-    MWs = [pt.formula(c).mass for c in df.columns]
+    MWs = molecular_weights(df.columns)
+    df = pd.DataFrame(df.to_numpy(dtype=float) * MWs,
+                      index=df.index, columns=df.columns)
     if renorm:
-        return renormalise(df.multiply(MWs))
+        return renormalise(df)
     else:
-        return df.multiply(MWs)
+        return df
+
+
+# EarthChem oxide columns and their formulae. Total iron columns (feot,
+# fe2o3t) are all the iron expressed as one oxide.
+OXIDES = MappingProxyType({
+    'sio2': 'SiO2', 'tio2': 'TiO2', 'al2o3': 'Al2O3', 'fe2o3': 'Fe2O3',
+    'fe2o3t': 'Fe2O3', 'feo': 'FeO', 'feot': 'FeO', 'mgo': 'MgO',
+    'cao': 'CaO', 'na2o': 'Na2O', 'k2o': 'K2O', 'p2o5': 'P2O5',
+    'mno': 'MnO', 'cr2o3': 'Cr2O3', 'nio': 'NiO'
+})
+
+# EarthChem volatile columns and their formulae. These have masses, but
+# aren't converted to elements.
+VOLATILES = MappingProxyType({
+    'h2o': 'H2O', 'h2o_plus': 'H2O', 'h2o_minus': 'H2O', 'h2o_total': 'H2O',
+    'co2': 'CO2'
+})
+
+# Interchangeable ways of giving the iron content, in order of preference
+IRON_SETS = (('feot',), ('fe2o3t',), ('feo', 'fe2o3'))
+OXIDES_OF_IRON = tuple(ox for fe in IRON_SETS for ox in fe)
+
+# Which oxide column to put each element back into
+ELEMENT_OXIDES = MappingProxyType({
+    'si': 'sio2', 'ti': 'tio2', 'al': 'al2o3', 'fe': 'feot', 'mg': 'mgo',
+    'ca': 'cao', 'na': 'na2o', 'k': 'k2o', 'p': 'p2o5', 'mn': 'mno',
+    'cr': 'cr2o3', 'ni': 'nio'
+})
+
+# ppm per wt%
+PPM_PER_PERCENT = 1e4
+
+
+def _cation(oxide: str):
+    """
+    Returns the cation symbol and the number of cations per formula unit
+    for an oxide column (e.g. 'al2o3' or 'Al2O3'), keeping the column's case.
+    """
+    formula = OXIDES.get(oxide, oxide)
+    atoms = {str(el): n for el, n in pt.formula(formula).atoms.items()}
+    cations = [el for el in atoms if el != 'O']
+    if 'O' not in atoms or len(cations) != 1:
+        raise ValueError('{} is not a simple oxide'.format(oxide))
+    symbol = cations[0]
+    if oxide == oxide.lower():
+        symbol = symbol.lower()
+    return symbol, atoms[cations[0]]
+
+
+def _element_formula(element: str):
+    return element[0].upper() + element[1:].lower()
+
+
+@lru_cache(maxsize=256)
+def conversion_matrix(oxides: tuple):
+    """
+    Returns the element columns and a read-only (oxides x elements) matrix
+    which converts oxide wt% to element ppm. Oxides of the same element
+    (e.g. feo and fe2o3) add into one element column. Cached by column set.
+    """
+    cations = [_cation(ox) for ox in oxides]
+    elements = tuple(dict.fromkeys(el for el, _ in cations))
+    matrix = np.zeros((len(oxides), len(elements)))
+    for row, (oxide, (element, n)) in enumerate(zip(oxides, cations)):
+        matrix[row, elements.index(element)] = \
+            PPM_PER_PERCENT * n * formula_mass(_element_formula(element)) \
+            / formula_mass(OXIDES.get(oxide, oxide))
+    matrix.flags.writeable = False
+    return elements, matrix
+
+
+def _convert(values, matrix):
+    """
+    Applies a conversion matrix to every row with one matrix multiply.
+    Outputs which depend on a missing input are missing.
+    """
+    missing = np.isnan(values)
+    if not missing.any():
+        return values @ matrix
+    result = np.where(missing, 0, values) @ matrix
+    result[(missing @ (matrix != 0)) > 0] = np.nan
+    return result
+
+
+def _iron_sets(oxides):
+    "Which of the interchangeable iron column sets are in oxides"
+    return [fe for fe in IRON_SETS if any(ox in oxides for ox in fe)]
+
+
+def to_element(df: pd.DataFrame, oxides=None):
+    """
+    Converts oxide wt% columns to element ppm.
+    E.g.:
+    sio2 (wt%) --> si (ppm)
+    feo, fe2o3 (wt%) --> fe (ppm)
+
+    Defaults to converting every column in OXIDES. Frames often have iron
+    as more than one of feot, fe2o3t and feo + fe2o3, so by default iron
+    comes from total_iron, which picks one of them for each row. An
+    explicit list of oxides can only have one set of iron columns.
+    """
+    if oxides is not None:
+        if len(_iron_sets(oxides)) > 1:
+            raise ValueError('Only pass one set of iron columns (feot, '
+                             'fe2o3t or feo + fe2o3), otherwise the iron '
+                             'gets counted more than once')
+        elements, matrix = conversion_matrix(tuple(oxides))
+        values = df[list(oxides)].to_numpy(dtype=float)
+        return pd.DataFrame(_convert(values, matrix), index=df.index,
+                            columns=list(elements))
+
+    oxides = [c for c in df.columns if c in OXIDES]
+    if not _iron_sets(oxides):
+        return to_element(df, oxides)
+
+    # Swap the iron columns for the total iron as feot
+    iron = [ox for ox in oxides if any(ox in fe for fe in IRON_SETS)]
+    position = oxides.index(iron[0])
+    oxides = [ox for ox in oxides if ox not in iron]
+    oxides.insert(position, 'feot')
+    values = df[[ox for ox in oxides if ox != 'feot']].assign(
+        feot=total_iron(df))
+    return to_element(values, oxides)
+
+
+def to_oxide(df: pd.DataFrame, elements=None, oxides=None):
+    """
+    Converts element ppm columns to oxide wt%.
+    E.g.:
+    si (ppm) --> sio2 (wt%)
+    fe (ppm) --> feot (wt%)
+
+    Elements go into the oxides in ELEMENT_OXIDES unless a list of oxides
+    (one per element) is given.
+    Defaults to converting every column in ELEMENT_OXIDES.
+    """
+    if elements is None:
+        elements = [c for c in df.columns if c in ELEMENT_OXIDES]
+    if oxides is None:
+        oxides = [ELEMENT_OXIDES[el] for el in elements]
+    _, matrix = conversion_matrix(tuple(oxides))
+    # Each oxide has one element so the inverse is just the reciprocal
+    inverse = np.divide(1, matrix.T, out=np.zeros(matrix.T.shape),
+                        where=matrix.T != 0)
+    values = df[list(elements)].to_numpy(dtype=float)
+    return pd.DataFrame(_convert(values, inverse), index=df.index,
+                        columns=list(oxides))
+
+
+def feo_per_fe2o3():
+    """
+    Returns the wt% of FeO with the same iron as 1 wt% Fe2O3.
+    """
+    return 2 * formula_mass('FeO') / formula_mass('Fe2O3')
+
+
+def total_iron(df: pd.DataFrame):
+    """
+    Returns the total iron as FeO wt% for each row, from whichever of feot,
+    fe2o3t or feo + fe2o3 the row has (in that order of preference).
+    """
+    columns = set(df.columns)
+    if not columns & set(OXIDES_OF_IRON):
+        raise KeyError('No iron columns (feot, fe2o3t, feo, fe2o3) in frame')
+    total = pd.Series(np.nan, index=df.index, name='feot')
+    if 'feot' in columns:
+        total = total.fillna(df['feot'])
+    if 'fe2o3t' in columns:
+        total = total.fillna(df['fe2o3t'] * feo_per_fe2o3())
+    species = [df[ox] * factor for ox, factor in
+               (('feo', 1), ('fe2o3', feo_per_fe2o3())) if ox in columns]
+    if species:
+        total = total.fillna(pd.concat(species, axis=1).sum(
+            axis=1, min_count=1))
+    return total
+
+
+def recalculate_iron(df: pd.DataFrame, fe3_fraction=0.15):
+    """
+    Recalculates FeO/Fe2O3 speciation for a given molar Fe3+/total Fe
+    ratio (a number, or one per row), and fills in feot and fe2o3t to match.
+    """
+    total = total_iron(df).to_numpy(dtype=float)
+    fe3_fraction = np.asarray(fe3_fraction, dtype=float)
+    df = df.copy()
+    df['feo'] = total * (1 - fe3_fraction)
+    df['fe2o3'] = total * fe3_fraction / feo_per_fe2o3()
+    df['feot'] = total
+    df['fe2o3t'] = total / feo_per_fe2o3()
+    return df
+
+
+REFERENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'resources', 'reference_compositions.csv')
+
+
+@lru_cache(maxsize=1)
+def _reference_table():
+    return pd.read_csv(REFERENCE_FILE, comment='#', index_col='element')
+
+
+def reference_compositions():
+    """
+    Returns the bundled reference compositions (ppm), one column per
+    reference (e.g. 'chondrite', 'primitive_mantle'), indexed by element.
+    """
+    return _reference_table().copy()
+
+
+@lru_cache(maxsize=256)
+def _reference_index(reference: str, columns: tuple, components):
+    """
+    Picks out the columns to normalise and the matching reference values,
+    cached by column set. Columns are matched to elements ignoring case.
+    """
+    table = _reference_table()
+    if reference not in table.columns:
+        raise KeyError('Unknown reference {}, try one of {}'.format(
+            reference, ', '.join(table.columns)))
+    values = table[reference].dropna()
+    lookup = {c.lower(): c for c in columns if isinstance(c, str) and c}
+    if components is None:
+        selected = [c for c in order_components(columns)
+                    if c.lower() in values.index]
+    else:
+        selected = [lookup[c.lower()] for c in components
+                    if isinstance(c, str) and c.lower() in lookup
+                    and c.lower() in values.index]
+    vector = values.loc[[c.lower() for c in selected]].to_numpy(dtype=float)
+    vector.flags.writeable = False
+    return tuple(selected), vector
+
+
+def normalize(df: pd.DataFrame, reference='chondrite', components=None):
+    """
+    Normalises trace element ppm columns to a reference composition
+    (see reference_compositions()).
+    Columns are matched to elements ignoring case, so 'la' and 'La' both
+    work. By default every column with a reference value is normalised,
+    in periodic table order (so the REE come out in REE() order); pass
+    components (e.g. REE(output='string')) to pick and order them yourself.
+    """
+    if components is not None:
+        components = tuple(components)
+    selected, vector = _reference_index(reference, tuple(df.columns),
+                                        components)
+    values = df[list(selected)].to_numpy(dtype=float)
+    return pd.DataFrame(values / vector, index=df.index,
+                        columns=list(selected))
+
+
+# Shannon (1976) ionic radii (angstroms) for the trivalent REE in 8-fold
+# coordination
+IONIC_RADII = MappingProxyType({
+    'La': 1.160, 'Ce': 1.143, 'Pr': 1.126, 'Nd': 1.109, 'Pm': 1.093,
+    'Sm': 1.079, 'Eu': 1.066, 'Gd': 1.053, 'Tb': 1.040, 'Dy': 1.027,
+    'Ho': 1.015, 'Er': 1.004, 'Tm': 0.994, 'Yb': 0.985, 'Lu': 0.977
+})
+
+
+@lru_cache(maxsize=None)
+def lambda_design_matrix(elements: tuple, degree=4):
+    """
+    Returns a read-only (elements x degree + 1) design matrix for fitting
+    REE patterns, after O'Neill (2016) J. Petrol. 57, 1463-1508.
+    Column k is a monic polynomial of degree k in the ionic radius, and the
+    columns are orthogonal over the given elements, so the coefficients
+    (lambdas) describe the average, slope, curvature etc. of the pattern
+    independently of each other.
+    """
+    radii = np.array([IONIC_RADII[el] for el in elements])
+    vander = np.vander(radii - radii.mean(), degree + 1, increasing=True)
+    Q, R = np.linalg.qr(vander)
+    design = Q * np.diag(R)
+    design.flags.writeable = False
+    return design
+
+
+@lru_cache(maxsize=1024)
+def _lambda_solver(elements: tuple, degree, pattern: bytes):
+    "Pseudoinverse of the design matrix for the observed elements"
+    observed = np.frombuffer(pattern, dtype=bool)
+    solver = np.linalg.pinv(lambda_design_matrix(elements, degree)[observed])
+    solver.flags.writeable = False
+    return solver
+
+
+def lambdas(df: pd.DataFrame, degree=4, reference='chondrite',
+            exclude=('Ce', 'Eu', 'Pm'), normalized=False):
+    """
+    Fits polynomial shape coefficients (lambdas) to the log of
+    reference-normalised REE patterns for every row at once.
+    Ce and Eu are excluded by default since they are often anomalous.
+    Pass normalized=True if df has already been through normalize().
+
+    Rows are grouped by which REE are present and each group is solved with
+    one multiply by a (cached) pseudoinverse. Missing, zero or negative
+    values are left out of the fit, and rows with too few REE for the
+    degree get NaN.
+    """
+    elements = tuple(el for el in REE(output='string') if el not in exclude)
+    values = df if normalized else normalize(df, reference,
+                                             components=elements)
+    lookup = {c.lower(): c for c in values.columns
+              if isinstance(c, str) and c}
+    present = [i for i, el in enumerate(elements) if el.lower() in lookup]
+    columns = [lookup[elements[i].lower()] for i in present]
+    logs = np.full((len(df), len(elements)), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        logs[:, present] = np.log(values[columns].to_numpy(dtype=float))
+    observed = np.isfinite(logs)
+
+    result = np.full((len(df), degree + 1), np.nan)
+    for pattern, rows in missingness_groups(observed):
+        if pattern.sum() <= degree:
+            continue
+        solver = _lambda_solver(elements, degree, pattern.tobytes())
+        result[rows] = logs[np.ix_(rows, pattern)] @ solver.T
+    return pd.DataFrame(result, index=df.index,
+                        columns=['lambda{}'.format(k)
+                                 for k in range(degree + 1)])
@@ -9,7 +9,7 @@ from matplotlib import pyplot as plt
 import pandas as pd
 import numpy as np
 import warnings
-from ..geochem import common_elements
+from ..geochem import order_components
 
 
 def spiderplot(df, ax=None, components:list=None, plot=True, fill=False, **kwargs):
@@ -47,8 +47,7 @@ def spiderplot(df, ax=None, components:list=None, plot=True, fill=False, **kwarg
     if sty['color'] is None:
         del sty['color']
 
-    components = components or [el for el in common_elements(output='str')
-                                if el in df.columns]
+    components = components or list(order_components(df.columns))
     assert len(components) != 0
     c_indexes = np.arange(len(components))
 
@@ -56,14 +55,14 @@ def spiderplot(df, ax=None, components:list=None, plot=True, fill=False, **kwarg
 
     if plot:
         ls = ax.plot(c_indexes,
-                     df[components].T.values.astype(np.float),
+                     df[components].T.values.astype(float),
                      **sty)
 
         sty['s'] = kwargs.get('markersize') or kwargs.get('s') or 5.
         if sty.get('color') is None:
             sty['color'] = ls[0].get_color()
         sc = ax.scatter(np.tile(c_indexes, (df[components].index.size,1)).T,
-                        df[components].T.values.astype(np.float), **sty)
+                        df[components].T.values.astype(float), **sty)
 
     for s_item in ['marker', 's']:
         if s_item in sty:
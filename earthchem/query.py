@@ -15,6 +15,15 @@ import pandas
 from io import StringIO
 import textwrap
 
+# Where to send REST search queries
+REST_SEARCH_URL = 'http://ecp.iedadata.org/restsearchservice'
+
+# Columns to keep as strings, everything else is numerical
+STRING_COLUMNS = {
+    'sample_id', 'source', 'url', 'title', 'author', 'journal', 'method',
+    'material', 'type', 'composition', 'rock_name'
+}
+
 def make_query_docstring():
     """ Constructs a docstring from the documentation dictionary
     """
@@ -40,6 +49,10 @@ class Query(dict):
     __doc__ = make_query_docstring()
     docdict = get_documentation()
 
+    # Override this on an instance to point it at another server (e.g. the
+    # stand-in in earthchem.testing)
+    search_url = REST_SEARCH_URL
+
     def __init__(self, **kwargs):
         super().__init__()
 
@@ -87,76 +100,87 @@ class Query(dict):
         else:
             raise IOError("Couldn't get data from network") 
 
-    def dataframe(self, max_rows=None, standarditems=True, drop_empty=True):
-        """ Get the actual data in a dataframe
+    def pages(self, max_rows=None, standarditems=True):
+        """ Download the data a page at a time
 
-            Note that this doesn't do pagination yet...
+            This is what dataframe uses under the hood - use it directly to
+            work through results which are too big to hold in memory at
+            once, e.g. with the streaming transforms' partial_fit.
 
             Parameters:
-                max_rows - the maximum number of rows to get. If None, 
+                max_rows - the maximum number of rows to get. If None,
                     defaults to Query.count() (i.e. give me everything)
-                standarditems - if True, returns the Earthchem 
+                standarditems - if True, returns the Earthchem
                     standard items in the table
-                drop_empty - if True, drops columns for which there 
-                    is no data
-        """
-        # Check that we actually have some data to fetch
-        if self.count() == 0:
-            print("Didn't find any records for this query, returning None")
-            return None
 
-        # Get the list of pages we're going to use, use to set up tqdm and query
+            Yields:
+                a DataFrame for each page, with numerical values converted
+        """
         if max_rows is None:
             max_rows = self.count()
+        if max_rows == 0:
+            return
+
+        # Get the list of pages we're going to use, use to set up tqdm
         pages = make_pages(max_rows - 1)
         tqdm_kwargs = {
             'desc': 'Downloading pages',
             'total': len(pages)
         }
-
-        # Accumulate pages as we go
-        accumulator = None
-        for page in tqdm.tqdm(pages, **tqdm_kwargs):
-            # Add the proper search type keys to the query
-            self.update(
-                searchtype='rowdata',
-                standarditems='yes' if standarditems else 'no',
-                startrow=page[0],
-                endrow=page[1]
-            )
-
-            # Get data
-            resp = requests.get(self.url)
-            if resp.ok:
+        try:
+            for page in tqdm.tqdm(pages, **tqdm_kwargs):
+                # Add the proper search type keys to the query
+                self.update(
+                    searchtype='rowdata',
+                    standarditems='yes' if standarditems else 'no',
+                    startrow=page[0],
+                    endrow=page[1]
+                )
+
+                # Get data
+                resp = requests.get(self.url)
+                if not resp.ok:
+                    continue
                 try:
-                    # Create a new dataframe to add to the old one
                     df = pandas.read_json(StringIO(resp.text))
-                    if accumulator is None:
-                        accumulator = df
-                    else:
-                        accumulator = pandas.concat([accumulator, df])
                 except ValueError:
                     if resp.text == 'no results found':
                         print("Didn't find any records, continuing")
                         continue
                     else:
                         raise IOError("Couldn't parse data in response")
-        
-        # We'll keep the accumulated data thank you
-        df = accumulator
 
-        # Reset the query
-        for key in ('searchtype', 'standarditems', 'startrow', 'endrow'):
-            self[key] = None
+                # Convert numerical values
+                for key in df.keys():
+                    if key not in STRING_COLUMNS:
+                        df[key] = pandas.to_numeric(df[key])
+                yield df
+        finally:
+            # Reset the query
+            for key in ('searchtype', 'standarditems', 'startrow', 'endrow'):
+                self[key] = None
 
-        # Convert numerical values
-        string_values = {  # things to keep as strings
-            'sample_id', 'source', 'url', 'title', 'author', 'journal',
-            'method', 'material', 'type', 'composition', 'rock_name'
-        }
-        for key in df.keys():
-            if key not in string_values:
-                df[key] = pandas.to_numeric(df[key])
+    def dataframe(self, max_rows=None, standarditems=True, drop_empty=True):
+        """ Get the actual data in a dataframe
+
+            Parameters:
+                max_rows - the maximum number of rows to get. If None, 
+                    defaults to Query.count() (i.e. give me everything)
+                standarditems - if True, returns the Earthchem 
+                    standard items in the table
+                drop_empty - if True, drops columns for which there 
+                    is no data
+        """
+        # Check that we actually have some data to fetch
+        if self.count() == 0:
+            print("Didn't find any records for this query, returning None")
+            return None
+
+        # Accumulate pages and stick them together in one go
+        frames = list(self.pages(max_rows, standarditems))
+        if not frames:
+            return None
+        df = pandas.concat(frames)
 
         # Drop empty columns
         if drop_empty:
@@ -167,8 +191,7 @@ class Query(dict):
 
     @property
     def url(self):
-        query_string = ('http://ecp.iedadata.org/restsearchservice?'
-                        'outputtype=json')
+        query_string = self.search_url + '?outputtype=json'
         for item in self.items():
             query_string += '&{0}={1}'.format(*item)
         return query_string
@@ -0,0 +1,290 @@
+""" file:   testing.py
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: A local stand-in for the EarthChem REST search service
+
+    Serves synthetic `searchtype=count` and `searchtype=rowdata` responses with
+    the same paging semantics as ecp.iedadata.org, so that tests and
+    benchmarks don't need the live service. Use it as a context manager:
+
+        >>> with LocalEarthChemServer(n_rows=1000, latency=0.01) as server:
+        ...     df = server.query(author='barnes').dataframe()
+
+    or run it standalone with `python -m earthchem.testing --help`.
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import argparse
+import json
+import random
+import threading
+import time
+
+# String-valued columns, in the order the service returns them
+STRING_COLUMNS = (
+    'sample_id', 'source', 'url', 'title', 'author', 'journal', 'method',
+    'material', 'type', 'composition', 'rock_name'
+)
+
+# Numeric standard items and the (low, high) range we draw them from. The
+# oxides are wt% and the trace elements are ppm
+LOCATION_COLUMNS = (
+    ('latitude', -90., 90.),
+    ('longitude', -180., 180.),
+)
+OXIDE_COLUMNS = (
+    ('sio2', 35., 75.), ('tio2', 0.1, 3.), ('al2o3', 5., 20.),
+    ('feot', 1., 15.), ('mgo', 0.1, 30.), ('cao', 0.5, 15.),
+    ('na2o', 0.5, 6.), ('k2o', 0.05, 6.), ('p2o5', 0.01, 1.),
+    ('mno', 0.01, 0.3)
+)
+TRACE_COLUMNS = (
+    ('cl', 10., 2000.), ('k', 100., 50000.), ('la', 0.5, 100.),
+    ('ce', 1., 200.), ('nd', 1., 100.), ('sm', 0.2, 20.), ('eu', 0.05, 5.),
+    ('yb', 0.1, 10.), ('lu', 0.01, 2.), ('rb', 1., 300.), ('sr', 10., 1500.),
+    ('zr', 10., 500.)
+)
+
+# Probability that a trace element is missing for a given sample - real
+# EarthChem rows are sparse
+TRACE_MISSING_FRACTION = 0.6
+
+# Pools of string values to draw from
+AUTHORS = ('barnes', 'smith', 'klump', 'robertson', 'jones')
+MATERIALS = ('bulk', 'whole rock', 'glass', 'inclusion')
+ROCK_NAMES = ('basalt', 'komatiite', 'andesite', 'dacite', 'rhyolite',
+              'gabbro', 'peridotite', 'granite')
+COMPOSITIONS = ('ultramafic', 'mafic', 'intermediate', 'felsic')
+SOURCES = ('PETDB', 'GEOROC', 'NAVDAT', 'USGS')
+
+NO_RESULTS = 'no results found'
+
+def synthetic_row(index, seed=0, standarditems=True):
+    """ Generate a synthetic EarthChem row
+
+        Rows are seeded by their index so that any page can be generated on
+        its own without building the whole dataset.
+
+        Parameters:
+            index - the row number
+            seed - the dataset seed
+            standarditems - whether to include the standard chemical items
+
+        Returns:
+            a dictionary mapping column names to values
+    """
+    rng = random.Random(seed * 1000003 + index)
+    author = rng.choice(AUTHORS)
+    row = {
+        'sample_id': 'SYN-{0:08d}'.format(index),
+        'source': rng.choice(SOURCES),
+        'url': 'http://localhost/sample/{0}'.format(index),
+        'title': 'Synthetic sample {0}'.format(index),
+        'author': author,
+        'journal': 'Journal of Synthetic Geochemistry',
+        'method': rng.choice(('XRF', 'ICPMS', 'EMP')),
+        'material': rng.choice(MATERIALS),
+        'type': 'igneous',
+        'composition': rng.choice(COMPOSITIONS),
+        'rock_name': rng.choice(ROCK_NAMES)
+    }
+    for key, low, high in LOCATION_COLUMNS:
+        row[key] = rng.uniform(low, high)
+    if standarditems:
+        for key, low, high in OXIDE_COLUMNS:
+            row[key] = rng.uniform(low, high)
+        for key, low, high in TRACE_COLUMNS:
+            row[key] = None if rng.random() < TRACE_MISSING_FRACTION \
+                       else rng.uniform(low, high)
+    return row
+
+class _StandInHandler(BaseHTTPRequestHandler):
+
+    "Request handler for LocalEarthChemServer"
+
+    def do_GET(self):
+        server = self.server.standin
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        server._record_request(url.path, params)
+
+        # Simulate the network
+        if server.latency:
+            time.sleep(server.latency)
+        if server._should_fail():
+            return self._respond(500, 'Simulated server error', 'text/plain')
+        if url.path.rstrip('/') != server.path:
+            return self._respond(404, 'Not found', 'text/plain')
+
+        # Work out what we've been asked for
+        searchtype = params.get('searchtype')
+        n_rows = server.count(params)
+        if searchtype == 'count':
+            return self._respond(200, json.dumps({'Count': n_rows}))
+        elif searchtype == 'rowdata':
+            try:
+                start = int(params.get('startrow', 0))
+                end = int(params.get('endrow', n_rows - 1))
+            except ValueError:
+                return self._respond(400, 'Bad row bounds', 'text/plain')
+
+            # Rows are inclusive of endrow, clipped to the dataset
+            end = min(end, n_rows - 1)
+            if n_rows == 0 or start > end:
+                return self._respond(200, NO_RESULTS, 'text/plain')
+            rows = server.page(start, end,
+                               params.get('standarditems', 'yes') == 'yes')
+            return self._respond(200, rows)
+        return self._respond(400, 'Unknown searchtype', 'text/plain')
+
+    def _respond(self, status, body, content_type='application/json'):
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        "Keep quiet unless asked"
+        if self.server.standin.verbose:
+            super().log_message(format, *args)
+
+class LocalEarthChemServer(object):
+
+    """ A local stand-in for the EarthChem REST search service
+
+        Parameters:
+            n_rows - the number of rows in the synthetic dataset. Can also be
+                a function which takes a dictionary of query parameters and
+                returns the number of rows for that query. Defaults to 1000.
+            latency - the simulated latency for each request in seconds.
+                Optional, defaults to 0.
+            error_rate - the fraction of requests which should fail with a
+                500 error. Optional, defaults to 0.
+            seed - seed for the synthetic data and simulated errors
+            host, port - where to serve from. The port defaults to 0, which
+                picks a free port.
+            verbose - whether to log requests to stderr
+    """
+
+    path = '/restsearchservice'
+
+    def __init__(self, n_rows=1000, latency=0, error_rate=0, seed=0,
+                 host='127.0.0.1', port=0, verbose=False):
+        self.n_rows = n_rows
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self.verbose = verbose
+
+        # Request statistics
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self.requests = []
+
+        self._httpd = ThreadingHTTPServer((host, port), _StandInHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.standin = self
+        self._thread = None
+
+    @property
+    def url(self):
+        "The URL to send REST search queries to"
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}{2}'.format(host, port, self.path)
+
+    def count(self, params):
+        "Get the number of rows for a query"
+        if callable(self.n_rows):
+            return int(self.n_rows(params))
+        return int(self.n_rows)
+
+    def page(self, start, end, standarditems=True):
+        """ Get rows start to end (inclusive) as a JSON string
+        """
+        return json.dumps([synthetic_row(idx, self.seed, standarditems)
+                           for idx in range(start, end + 1)])
+
+    def query(self, **kwargs):
+        """ Make an earthchem.Query which talks to this server
+
+            Parameters:
+                **kwargs - query terms, passed to Query
+        """
+        from .query import Query
+        query = Query(**kwargs)
+        query.search_url = self.url
+        return query
+
+    def reset(self):
+        "Clear the request log"
+        with self._lock:
+            self.requests = []
+
+    def _record_request(self, path, params):
+        with self._lock:
+            self.requests.append((time.time(), path, params))
+
+    def _should_fail(self):
+        if not self.error_rate:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def start(self):
+        "Start serving in a background thread"
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._httpd.serve_forever, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        "Stop serving and release the port"
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def serve_forever(self):
+        "Serve in the foreground until interrupted"
+        try:
+            self._httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description='Serve a local stand-in for the EarthChem REST service')
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='number of rows in the synthetic dataset')
+    parser.add_argument('--latency', type=float, default=0,
+                        help='simulated latency per request, in seconds')
+    parser.add_argument('--error-rate', type=float, default=0,
+                        help='fraction of requests which fail with a 500')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args(args)
+
+    server = LocalEarthChemServer(
+        n_rows=args.rows, latency=args.latency, error_rate=args.error_rate,
+        seed=args.seed, host=args.host, port=args.port, verbose=True)
+    print('Serving a stand-in EarthChem REST service at {0}'.format(
+        server.url))
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
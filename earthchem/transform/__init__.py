@@ -1 +1,25 @@
-from . import additive, barycentric, centered, isometric, utilities
\ No newline at end of file
+""" file:   __init__.py (earthchem.transform)
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Compositional transforms. Submodules are loaded on first
+        access so that scikit-learn only gets imported when it's needed.
+"""
+
+import importlib
+
+_SUBMODULES = (
+    'additive', 'barycentric', 'centered', 'distance', 'fused', 'isometric',
+    'masked', 'replacement', 'stats', 'streaming', 'utilities'
+)
+
+def __getattr__(name):
+    "Import submodules on first access"
+    if name in _SUBMODULES:
+        return importlib.import_module('.' + name, __name__)
+    raise AttributeError(
+        'module {0!r} has no attribute {1!r}'.format(__name__, name))
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_SUBMODULES))
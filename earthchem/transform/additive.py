@@ -9,9 +9,11 @@
 import re
 
 import numpy as np
+import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
-from .utilities import closure, pd_closure
+from .utilities import ChunkedTransformMixin, closure, float_dtype, \
+    parallel_rows
 
 class AdditiveLogTransformPandas(BaseEstimator, TransformerMixin):
 
@@ -29,8 +31,7 @@ class AdditiveLogTransformPandas(BaseEstimator, TransformerMixin):
 
     def __init__(self, constant=1, base_feature_pattern=".*_unmeasured"):
         self.constant = constant
-        self.patt = re.compile(base_feature_pattern)
-        self._base_key = None
+        self.base_feature_pattern = base_feature_pattern
 
     def fit(self, X, y=None):
         """
@@ -49,12 +50,23 @@ class AdditiveLogTransformPandas(BaseEstimator, TransformerMixin):
             a dataframe with transformed data, will be missing the 
             'unmeasured' column since that's been normalized out.
         """
-        # Order the existing keys
-        self._base_key = [k for k in X.keys() if self.patt.match(k)][0]
-        others = sorted([k for k in X.keys() if self.patt.match(k) is None])
+        # Order the existing keys. The pattern is compiled here rather than
+        # in __init__ so that set_params works
+        patt = re.compile(self.base_feature_pattern)
+        keys = list(X.keys())
+        try:
+            self._base_key = [k for k in keys if patt.match(k)][0]
+        except IndexError:
+            msg = 'No column matching the base feature pattern {} in {}'
+            raise ValueError(msg.format(patt.pattern, keys))
+        others = sorted([k for k in keys if patt.match(k) is None])
 
-        # Calculate and return ALR'd columns
-        return X[others].apply(lambda x: np.log(x / X[unmeasured_key]))
+        # Calculate ALR'd columns on the whole block at once
+        values = X.to_numpy(dtype=float_dtype(X))
+        ratios = values[:, [keys.index(k) for k in others]]
+        ratios /= values[:, [keys.index(self._base_key)]]
+        np.log(ratios, out=ratios)
+        return pd.DataFrame(ratios, index=X.index, columns=others, copy=False)
 
     def inverse_transform(self, X):
         """
@@ -64,35 +76,55 @@ class AdditiveLogTransformPandas(BaseEstimator, TransformerMixin):
         additive logratio transform.
         
         Parameters:
-            df - the data to transform
-            constant - the constant for calculating closure
+            X - the data to transform
         
         Returns:
             a dataframe with untransformed data, will have the closure column
-            labelled 'unmeasured'
+            labelled with the base key from the last transform (or 'closure'
+            if we haven't transformed anything yet)
         """
-        output = X.apply(np.exp)
-        output_key = (self._base_key if self._base_key is not None 
-                      else 'closure')
-        output[output_key] = np.ones((X.shape[0], 1))
-        return pd_closure(output, self.constant)
-
-
-class AdditiveLogTransform(BaseEstimator, TransformerMixin):
+        output_key = getattr(self, '_base_key', None)
+        if output_key is None:
+            output_key = 'closure'
+
+        # Base column is exp(0) = 1, then close everything in place
+        npoints, ndim = X.shape
+        dtype = float_dtype(X)
+        output = np.empty((npoints, ndim + 1), dtype=dtype)
+        np.exp(X.to_numpy(dtype=dtype), out=output[:, :-1])
+        output[:, -1] = 1
+        output *= self.constant / output.sum(axis=1, keepdims=True)
+        return pd.DataFrame(output, index=X.index,
+                            columns=list(X.keys()) + [output_key],
+                            copy=False)
+
+
+class AdditiveLogTransform(BaseEstimator, TransformerMixin,
+                           ChunkedTransformMixin):
     
     """ A custom sklearn transformer which implements an additive log ratio 
         transformation for nD compositional data
+
+        Use transform_chunked and inverse_transform_chunked for arrays
+        (e.g. np.memmaps) which are too big to transform in one go.
     """
 
-    def __init__(self, base_feature_index=1):
+    def __init__(self, base_feature_index=1, n_jobs=None, dtype=None):
         """
         Initialize the transform using the first feature to normalize
 
         Parameters:
             base_feature_index - which feature to use to normalize the ratios.
                 Optional, defaults to 0 (the first feature)
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point). Use np.float32 to halve memory use.
         """
         self.base_feature_index = base_feature_index
+        self.n_jobs = n_jobs
+        self.dtype = dtype
 
     def fit(self, X, *args, **kwargs):
         """
@@ -100,54 +132,62 @@ class AdditiveLogTransform(BaseEstimator, TransformerMixin):
         """
         return self
 
-    def transform(self, X):
+    @parallel_rows
+    def transform(self, X, out=None):
         """ 
         Returns the additive log ratio transform of the given composition vectors X
 
+        The ratios are written straight into the output on either side of
+        the base feature, so there are no full-size temporaries.
+
         Parameters:
             X - an array of composition vectors. An M x N array where M 
                 is the number of samples, and N is the number of 
                 compositional species. 
+            out - an optional M x (N - 1) array to write the result into
 
         Returns:
             the additive log ratio-transformed data L
         """
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
+        npoints, ndim = X.shape
         try:
-            X = np.asarray(X)
-            ratios = (X.T / X[:, self.base_feature_index]).T
-            ratios = np.delete(ratios, self.base_feature_index, axis=1)
-            return np.log(ratios)
+            base = X[:, [self.base_feature_index]]
         except IndexError:
             msg = ('Input data has no base feature index at {}'
                    ', probably because there are not enough features. '
                    'Maybe try setting a different base_feature_index?')
             raise ValueError(msg.format(self.base_feature_index))
+        index = self.base_feature_index % ndim
+
+        if out is None:
+            out = np.empty((npoints, ndim - 1), dtype=X.dtype)
+        np.divide(X[:, :index], base, out=out[:, :index])
+        np.divide(X[:, index + 1:], base, out=out[:, index:])
+        return np.log(out, out=out)
    
-    def inverse_transform(self, L):
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
         """ 
         Returns the inverse additive log ratio transformed data
     
         Parameters:
             Parameters:
-                L - an array of CLR-transformed composition vectors. 
+                L - an array of ALR-transformed composition vectors. 
+                out - an optional array to write the result into
         
         Returns:
             the inverted data X
         """
-        L = np.asarray(L)
+        L = np.asarray(L, dtype=float_dtype(L, self.dtype))
         npoints, ndim = L.shape
-
-        # Need to put in extra column in right place!
-        if self.base_feature_index == 0:
-            result = np.hstack([np.zeros((npoints, 1)), L])
-        elif self.base_feature_index in {-1, ndim}:
-             result = np.hstack([L, np.zeros((npoints, 1))])
-        else:
-            result = np.hstack([
-                L[:, :self.base_feature_index], 
-                np.zeros((npoints, 1)), 
-                L[:, self.base_feature_index:]
-            ])
-
-        # Return closure of result
-        return closure(np.exp(result))
+        index = self.base_feature_index % (ndim + 1)
+
+        # Put the base feature (exp(0) = 1) back in the right place, then
+        # close in place
+        if out is None:
+            out = np.empty((npoints, ndim + 1), dtype=L.dtype)
+        np.exp(L[:, :index], out=out[:, :index])
+        out[:, index] = 1
+        np.exp(L[:, index:], out=out[:, index + 1:])
+        return closure(out, out=out)
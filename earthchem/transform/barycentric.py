@@ -9,32 +9,79 @@
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 
-class BarycentricTransform(BaseEstimator, TransformerMixin):
+from .utilities import ChunkedTransformMixin, float_dtype, parallel_rows
+
+class BarycentricTransform(BaseEstimator, TransformerMixin,
+                           ChunkedTransformMixin):
     
     """ A custom sklearn transformer which implements a barycentric 
         transformation for 3D compositional data
+
+        Use transform_chunked and inverse_transform_chunked for arrays
+        (e.g. np.memmaps) which are too big to transform in one go.
+
+        Parameters:
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point). Use np.float32 to halve memory use.
     """
 
+    def __init__(self, n_jobs=None, dtype=None):
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
     def fit(self, X, y=None):
         """
         Fit does nothing
         """
         return self
         
-    def transform(self, X):
+    @parallel_rows
+    def transform(self, X, out=None):
         """ 
         Returns the barycentric transform of the given composition vectors X
 
         Parameters:
             X - a Nx3 array containing the data to transform into barycentric 
                 coordinates
+            out - an optional Nx2 array to write the result into
 
         Returns:
             the barycentric-transformed data
         """
-        X = np.asarray(X)
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
         if X.shape[-1] != 3:
             raise ValueError('X has wrong dimension for barycentric coords')
         x0, x1, x2 = X.transpose()
-        denom = np.asarray(2*(x0 + x1 + x2), dtype=np.float)
-        return np.array([(2*x1 + x2) / denom, np.sqrt(3)*x2 / denom]).T
\ No newline at end of file
+        denom = 2*(x0 + x1 + x2)
+        if out is None:
+            out = np.empty((X.shape[0], 2), dtype=X.dtype)
+        np.divide(2*x1 + x2, denom, out=out[:, 0])
+        np.divide(X.dtype.type(np.sqrt(3))*x2, denom, out=out[:, 1])
+        return out
+
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
+        """ 
+        Returns the closed compositions for the barycentric coordinates L
+
+        Parameters:
+            L - a Nx2 array of barycentric coordinates
+            out - an optional Nx3 array to write the result into
+
+        Returns:
+            the compositions, closed to sum to unity
+        """
+        L = np.asarray(L, dtype=float_dtype(L, self.dtype))
+        if L.shape[-1] != 2:
+            raise ValueError('L has wrong dimension for barycentric coords')
+        y0, y1 = L.transpose()
+        if out is None:
+            out = np.empty((L.shape[0], 3), dtype=L.dtype)
+        np.multiply(y1, L.dtype.type(2 / np.sqrt(3)), out=out[:, 2])
+        np.subtract(y0, out[:, 2] / 2, out=out[:, 1])
+        np.subtract(1, out[:, 1], out=out[:, 0])
+        out[:, 0] -= out[:, 2]
+        return out
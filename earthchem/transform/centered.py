@@ -7,14 +7,21 @@
 """
 
 import numpy as np
+import pandas as pd
 from sklearn.base import BaseEstimator, TransformerMixin
 
+from .utilities import ChunkedTransformMixin, float_dtype, parallel_rows, \
+    row_chunks, _row_reduce
+
 class CenteredLogTransformPandas(BaseEstimator, TransformerMixin):
     
     """ A custom sklearn transformer which implements centered-log scaling
         for compositional data
 
-        Works with Pandas DataFrames
+        Works with Pandas DataFrames. Transforms are done on the underlying
+        array in one go and the index and column labels are kept. Missing
+        (NaN) parts are left out of the centering so they stay NaN without
+        taking the rest of the row with them.
     """
 
     def fit(self, X, y=None):
@@ -22,45 +29,105 @@ class CenteredLogTransformPandas(BaseEstimator, TransformerMixin):
         return self
 
     def transform(self, X):
-        pass
+        """ Returns the centered log ratio of the given compositions
+
+            Parameters:
+                X - a DataFrame of compositions, one sample per row
+
+            Returns:
+                a DataFrame with the CLR-transformed data
+        """
+        values = np.log(X.to_numpy(dtype=float_dtype(X)))
+        values -= _row_reduce(values, np.mean, np.nanmean)
+        return pd.DataFrame(values, index=X.index, columns=X.columns,
+                            copy=False)
 
     def inverse_transform(self, X):
-        pass
+        """ Returns the inverse centered log ratio of the given data
+
+            Parameters:
+                X - a DataFrame of CLR-transformed compositions
+
+            Returns:
+                a DataFrame with the inverted data, where each row sums to
+                unity
+        """
+        values = X.to_numpy(dtype=float_dtype(X))
+        values = np.exp(values - _row_reduce(values, np.max, np.nanmax))
+        values /= _row_reduce(values, np.sum, np.nansum)
+        return pd.DataFrame(values, index=X.index, columns=X.columns,
+                            copy=False)
 
-class CenteredLogTransform(BaseEstimator, TransformerMixin):
+class CenteredLogTransform(BaseEstimator, TransformerMixin,
+                           ChunkedTransformMixin):
     
     """ A custom sklearn transformer which implements centered-log scaling
         for compositional data
+
+        Use transform_chunked and inverse_transform_chunked for arrays
+        (e.g. np.memmaps) which are too big to transform in one go.
+
+        Parameters:
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point). Use np.float32 to halve memory use.
     """
 
+    def __init__(self, n_jobs=None, dtype=None):
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
     def fit(self, X, y=None):
         "Fit does nothing"
         return self
             
-    def transform(self, X):
+    @parallel_rows
+    def transform(self, X, out=None):
         """ Returns the centered log ratio of the given composition vectors X
+
+            This is done in log space (log(X) minus the row mean of log(X))
+            rather than dividing by the geometric mean, so that compositions
+            with many small parts don't under- or overflow.
     
             Parameters:
                 X - an array of composition vectors. An (n, m) array where n 
                     is the number of samples, and m is the number of 
                     compositional species.
+                out - an optional (n, m) array to write the result into
 
             Returns:
                 the CLR-transformed data
         """
+        # A block of rows at a time, so that X is read once and the row
+        # means stay cache-sized
         X = np.asarray(X)
-        geometric_mean = \
-            np.product(X, axis=1)[:, np.newaxis] ** (1. / float(X.shape[1]))
-        return np.log(X / geometric_mean)
+        dtype = float_dtype(X, self.dtype)
+        if out is None:
+            out = np.empty(X.shape, dtype=dtype)
+        row_bytes = out.itemsize * X.shape[1]
+        for rows in row_chunks(X.shape[0], row_bytes=row_bytes):
+            block = np.log(X[rows], out=out[rows], dtype=dtype)
+            block -= block.mean(axis=1, keepdims=True)
+        return out
    
-    def inverse_transform(self, X):
+    @parallel_rows
+    def inverse_transform(self, X, out=None):
         """ Returns the inverse centered log ratio for the given CLR transformed vector
+
+            We subtract the row maximum before exponentiating so that large
+            log-ratios don't overflow.
     
             Parameters:
                 X - an array of CLR-transformed composition vectors. 
+                out - an optional array to write the result into
             
             Returns:
                 the inverted data
         """
-        ratio = np.exp(X)
-        return ratio / ratio.sum(axis=1)[:, np.newaxis]
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
+        out = np.subtract(X, X.max(axis=1, keepdims=True), out=out)
+        np.exp(out, out=out)
+        out /= out.sum(axis=1, keepdims=True)
+        return out
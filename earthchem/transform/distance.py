@@ -0,0 +1,196 @@
+""" file:   distance.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Aitchison distances and nearest neighbours for compositions
+
+    The Aitchison distance between two compositions is the Euclidean
+    distance between their ILR coordinates, so we map to ILR once and then
+    work with ordinary Euclidean distances - a block of rows at a time, so
+    the full n x n matrix is never built:
+
+        >>> for rows, distances in pairwise_distances_chunked(X):
+        ...     close = distances < 0.1
+
+    and AitchisonNeighbours finds analogue samples with a KD-tree (in a few
+    dimensions) or scikit-learn's blocked brute-force search (in many):
+
+        >>> neighbours = AitchisonNeighbours(n_neighbors=10).fit(X)
+        >>> distances, indices = neighbours.kneighbors(Y)
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator
+from sklearn.neighbors import NearestNeighbors
+
+from .isometric import IsometricLogTransform
+from .utilities import float_dtype, row_chunks
+
+def ilr_coordinates(X, dtype=None, n_jobs=None):
+    """ Map compositions to ILR coordinates, checking that they're finite
+
+        Parameters:
+            X - an (n, m) array of compositions
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of X (or float64 if it isn't floating point)
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one.
+
+        Returns:
+            an (n, m - 1) array of coordinates
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coords = IsometricLogTransform(n_jobs=n_jobs,
+                                       dtype=dtype).transform(X)
+    if not np.isfinite(coords).all():
+        raise ValueError('Compositions with missing, zero or negative parts '
+                         "don't have an Aitchison distance - use the "
+                         'replacement transforms first')
+    return coords
+
+def _squared_norms(coords):
+    return np.einsum('ij,ij->i', coords, coords)
+
+def _squared_distances(A, B, A_norms, B_norms):
+    "Squared Euclidean distances between the rows of A and B"
+    result = np.matmul(A, -2 * B.T)
+    result += A_norms[:, np.newaxis]
+    result += B_norms[np.newaxis, :]
+    return np.maximum(result, 0, out=result)
+
+def pairwise_distances_chunked(X, Y=None, chunk_rows=None, dtype=None):
+    """ Generate the Aitchison distances between the rows of X and Y a
+        block of rows at a time
+
+        Parameters:
+            X - an (n, m) array of compositions
+            Y - an (p, m) array of compositions. Optional, defaults to X
+            chunk_rows - the number of rows of X in each block. Optional,
+                defaults to blocks of about a megabyte
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of X (or float64 if it isn't floating point)
+
+        Returns:
+            a generator of (rows, distances) pairs, where rows is a slice of
+            X and distances is a (rows, p) array
+    """
+    A = ilr_coordinates(X, dtype)
+    B = A if Y is None else ilr_coordinates(Y, A.dtype)
+    A_norms, B_norms = _squared_norms(A), _squared_norms(B)
+    for rows in row_chunks(len(A), chunk_rows, A.itemsize * len(B)):
+        distances = _squared_distances(A[rows], B, A_norms[rows], B_norms)
+        yield rows, np.sqrt(distances, out=distances)
+
+def aitchison_distance(X, Y=None, out=None, chunk_rows=None, dtype=None):
+    """ The Aitchison distances between the rows of X and Y
+
+        This builds the whole matrix, so for lots of compositions either
+        pass a memory-mapped array as out or use pairwise_distances_chunked.
+
+        Parameters:
+            X - an (n, m) array of compositions
+            Y - an (p, m) array of compositions. Optional, defaults to X
+            out - an optional (n, p) array to write the distances into
+            chunk_rows - the number of rows of X to do at once. Optional,
+                defaults to blocks of about a megabyte
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of X (or float64 if it isn't floating point)
+
+        Returns:
+            an (n, p) array of distances
+    """
+    for rows, distances in pairwise_distances_chunked(X, Y, chunk_rows, dtype):
+        if out is None:
+            n_cols = distances.shape[1]
+            out = np.empty((len(X), n_cols), dtype=distances.dtype)
+        out[rows] = distances
+    return out
+
+class AitchisonNeighbours(BaseEstimator):
+
+    """ Nearest-neighbour search for compositions under the Aitchison
+        distance
+
+        The reference compositions are mapped to ILR coordinates once when
+        fitting and indexed with scikit-learn's NearestNeighbors - a
+        KD-tree if there are only a few parts, or a brute-force search
+        which works through the distances a block at a time if there are
+        many. The distances to the neighbours are then worked out directly,
+        which is more accurate than the expanded form used in brute-force
+        searches.
+
+        Parameters:
+            n_neighbors - the number of neighbours to find. Optional,
+                defaults to 5
+            algorithm - 'kd_tree', 'ball_tree', 'brute', or 'auto' to let
+                scikit-learn pick. Optional, defaults to 'auto'.
+            leaf_size - the tree leaf size. Optional, defaults to 40
+            chunk_rows - the number of query rows to do at once when
+                working out distances. Optional, defaults to blocks of
+                about a megabyte
+            n_jobs - the number of threads to use for the ILR transform and
+                the search. Optional, defaults to one. -1 means use all the
+                cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point).
+    """
+
+    def __init__(self, n_neighbors=5, algorithm='auto', leaf_size=40,
+                 chunk_rows=None, n_jobs=None, dtype=None):
+        self.n_neighbors = n_neighbors
+        self.algorithm = algorithm
+        self.leaf_size = leaf_size
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def fit(self, X, y=None):
+        """ Map the reference compositions to ILR coordinates and index them
+
+            Parameters:
+                X - an (n, m) array of compositions
+        """
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
+        self.coordinates_ = ilr_coordinates(X, n_jobs=self.n_jobs)
+        self.index_ = NearestNeighbors(
+            n_neighbors=self.n_neighbors, algorithm=self.algorithm,
+            leaf_size=self.leaf_size, n_jobs=self.n_jobs)
+        self.index_.fit(self.coordinates_)
+        return self
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        """ Find the nearest reference compositions to each row of X
+
+            Parameters:
+                X - an (p, m) array of compositions. Optional, if None we
+                    find the neighbours of each reference composition
+                    (not counting itself)
+                n_neighbors - the number of neighbours. Optional, defaults
+                    to the value given at construction
+                return_distance - whether to return the distances as well
+
+            Returns:
+                (p, n_neighbors) arrays of distances and indices into the
+                fitted compositions, closest first, or just the indices if
+                return_distance is False
+        """
+        if not hasattr(self, 'index_'):
+            raise ValueError('Call fit before looking for neighbours')
+        coords = self.coordinates_
+        if X is None:
+            query = coords
+        else:
+            query = ilr_coordinates(X, coords.dtype, self.n_jobs)
+        index = self.index_.kneighbors(
+            None if X is None else query, n_neighbors, return_distance=False)
+        if not return_distance:
+            return index
+
+        distance = np.empty(index.shape, dtype=coords.dtype)
+        row_bytes = coords.itemsize * coords.shape[1] * index.shape[1]
+        for rows in row_chunks(len(index), self.chunk_rows, row_bytes):
+            diffs = coords[index[rows]] - query[rows, np.newaxis, :]
+            distance[rows] = np.sqrt(np.einsum('ijk,ijk->ij', diffs, diffs))
+        return distance, index
@@ -0,0 +1,80 @@
+""" file:   fused.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Closed log-ratio transforms for pipelines
+
+    The CLR and ILR don't depend on the scale of each row, so closing raw
+    data before taking them is wasted work (and a wasted copy) - just use
+    CenteredLogTransform or IsometricLogTransform (or their
+    transform_chunked methods) on the raw data. The classes here only add a
+    `total` for the inverse, so that the round trip gives compositions
+    which sum to something other than unity (e.g. 100 for wt%).
+"""
+
+from .centered import CenteredLogTransform
+from .isometric import IsometricLogTransform
+
+class _ClosedInverseMixin(object):
+
+    "Scale the inverse transform to sum to self.total"
+
+    def inverse_transform(self, L, out=None):
+        """ Returns closed compositions for the coordinates L
+
+            Parameters:
+                L - an array of transformed data
+                out - an optional array to write the result into
+
+            Returns:
+                the compositions, summing to total
+        """
+        out = super().inverse_transform(L, out=out)
+        if self.total != 1:
+            out *= out.dtype.type(self.total)
+        return out
+
+class ClosedCenteredLogTransform(_ClosedInverseMixin, CenteredLogTransform):
+
+    """ A CenteredLogTransform whose inverse gives compositions summing to
+        `total`
+
+        The forward transform doesn't need closed data, so there's no need
+        to close it first.
+
+        Parameters:
+            total - what each row should sum to on the way back. Optional,
+                defaults to unity
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point).
+    """
+
+    def __init__(self, total=1, n_jobs=None, dtype=None):
+        super().__init__(n_jobs=n_jobs, dtype=dtype)
+        self.total = total
+
+class ClosedIsometricLogTransform(_ClosedInverseMixin, IsometricLogTransform):
+
+    """ An IsometricLogTransform whose inverse gives compositions summing
+        to `total`
+
+        The forward transform doesn't need closed data, so there's no need
+        to close it first.
+
+        Parameters:
+            total - what each row should sum to on the way back. Optional,
+                defaults to unity
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point).
+    """
+
+    def __init__(self, total=1, n_jobs=None, dtype=None):
+        super().__init__(n_jobs=n_jobs, dtype=dtype)
+        self.total = total
@@ -9,21 +9,38 @@
 import numpy as np
 from sklearn.base import BaseEstimator, TransformerMixin
 
-from .utilities import basis_matrix, closure
+from .utilities import ChunkedTransformMixin, basis_matrix, closure, \
+    float_dtype, parallel_rows, row_chunks
 
-class IsometricLogTransform(BaseEstimator, TransformerMixin):
+class IsometricLogTransform(BaseEstimator, TransformerMixin,
+                            ChunkedTransformMixin):
     
     """ A custom sklearn transformer which implements centered-log scaling
         for compositional data
+
+        Use transform_chunked and inverse_transform_chunked for arrays
+        (e.g. np.memmaps) which are too big to transform in one go.
+
+        Parameters:
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point). Use np.float32 to halve memory use.
     """
 
+    def __init__(self, n_jobs=None, dtype=None):
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
     def fit(self, X, y=None):
         """
         Fit does nothing
         """
         return self
 
-    def transform(self, X):
+    @parallel_rows
+    def transform(self, X, out=None):
         """ 
         Returns the isometric log ratio transform of the given composition vectors X
 
@@ -31,25 +48,47 @@ class IsometricLogTransform(BaseEstimator, TransformerMixin):
             X - an array of composition vectors. An M x N array where M 
                 is the number of samples, and N is the number of 
                 compositional species. 
+            out - an optional M x (N - 1) array to write the result into
 
         Returns:
             the additive log ratio-transformed data L
         """
+        # The logs go into a small buffer a block of rows at a time, and
+        # each block is projected straight into the output, so X is read
+        # once and the only full-size array is the result
         X = np.asarray(X)
-        psi = basis_matrix(X.shape[1])
-        return np.dot(np.log(X), psi.T)
+        dtype = float_dtype(X, self.dtype)
+        npoints, ndim = X.shape
+        psi = basis_matrix(ndim, dtype)
+        if out is None:
+            out = np.empty((npoints, ndim - 1), dtype=dtype)
+        buffer = None
+        for rows in row_chunks(npoints, row_bytes=out.itemsize * ndim):
+            nrows = rows.stop - rows.start
+            if buffer is None:
+                buffer = np.empty((nrows, ndim), dtype=dtype)
+            logX = np.log(X[rows], out=buffer[:nrows], dtype=dtype)
+            np.matmul(logX, psi.T, out=out[rows])
+        return out
    
-    def inverse_transform(self, L):
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
         """ 
         Returns the inverse isometric log ratio transformed data
+
+        The exponential and closure are done in place on the output, so the
+        only full-size array is the result.
     
         Parameters:
             Parameters:
                 L - an array of ILR-transformed composition vectors. 
+                out - an optional array to write the result into
         
         Returns:
             the inverted data X
         """
-        L = np.asarray(L)
-        psi = basis_matrix(L.shape[1] + 1)
-        return closure(np.exp(np.dot(L, psi)))
\ No newline at end of file
+        L = np.asarray(L, dtype=float_dtype(L, self.dtype))
+        psi = basis_matrix(L.shape[1] + 1, L.dtype)
+        out = np.matmul(L, psi, out=out)
+        np.exp(out, out=out)
+        return closure(out, out=out)
@@ -0,0 +1,291 @@
+""" file:   masked.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Missing-value aware log-ratio transforms for pipelines
+
+    EarthChem tables are sparse - most trace elements are missing for most
+    samples - and the plain transforms let a single NaN wipe out the whole
+    row. These versions work on the subcomposition of observed parts in each
+    row instead, leaving missing parts as NaN.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from .utilities import ChunkedTransformMixin, apply_chunked, \
+    apply_parallel, basis_matrix, float_dtype, missingness_groups, \
+    parallel_rows, _row_reduce
+
+def _masked_closure(X, out=None):
+    "Close each row over its observed (non-NaN) parts"
+    return np.divide(X, _row_reduce(X, np.sum, np.nansum), out=out)
+
+def _masked_ilr(X, out=None):
+    "ILR each row's observed subcomposition, a missingness pattern at a time"
+    npoints, ndim = X.shape
+    if out is None:
+        out = np.empty((npoints, ndim - 1), dtype=X.dtype)
+    out[...] = np.nan
+    for pattern, rows in missingness_groups(~np.isnan(X)):
+        nparts = pattern.sum()
+        if nparts < 2:
+            continue
+        logX = np.log(X[np.ix_(rows, pattern)])
+        out[rows, :nparts - 1] = np.dot(logX,
+                                        basis_matrix(nparts, X.dtype).T)
+    return out
+
+def _check_observed(L, observed):
+    "Check that the observed parts match the NaN padding of the coordinates"
+    if observed is None:
+        raise ValueError('I need to know which parts were observed to '
+                         'invert a masked ILR - pass observed=~np.isnan(X)')
+    observed = np.asarray(observed, dtype=bool)
+    if observed.shape != (L.shape[0], L.shape[1] + 1):
+        raise ValueError('The observed parts should be an array with shape '
+                         '{}, not {}'.format((L.shape[0], L.shape[1] + 1),
+                                             observed.shape))
+    return observed
+
+def _masked_inverse_ilr(L, out=None, observed=None):
+    "Invert masked ILR coordinates, a missingness pattern at a time"
+    ncoords = np.maximum(observed.sum(axis=1) - 1, 0)
+    padding = np.arange(L.shape[1]) >= ncoords[:, np.newaxis]
+    if (np.isnan(L) != padding).any():
+        raise ValueError("The observed parts don't match the NaN padding of "
+                         'the coordinates - pass observed=~np.isnan(X) for '
+                         'the X which was transformed')
+    if out is None:
+        out = np.empty(observed.shape, dtype=L.dtype)
+    out[...] = np.nan
+    for pattern, rows in missingness_groups(observed):
+        nparts = pattern.sum()
+        if nparts == 0:
+            continue
+        parts = np.exp(np.dot(L[rows, :nparts - 1],
+                              basis_matrix(nparts, L.dtype)))
+        out[np.ix_(rows, pattern)] = parts / parts.sum(axis=1, keepdims=True)
+    return out
+
+class MaskedCenteredLogTransform(BaseEstimator, TransformerMixin,
+                                 ChunkedTransformMixin):
+
+    """ A custom sklearn transformer which implements centered-log scaling
+        for compositional data with missing values
+
+        Each row is centered on the geometric mean of its observed parts.
+        Missing parts stay NaN.
+
+        Parameters:
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+    """
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y=None):
+        "Fit does nothing"
+        return self
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """ Returns the centered log ratio of the given composition vectors X
+
+            Parameters:
+                X - an (n, m) array of composition vectors, with NaN for
+                    missing parts
+                out - an optional (n, m) array to write the result into
+
+            Returns:
+                the CLR-transformed data
+        """
+        L = np.log(np.asarray(X, dtype=float_dtype(X)), out=out)
+        L -= _row_reduce(L, np.mean, np.nanmean)
+        return L
+
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
+        """ Returns the inverse centered log ratio for the given CLR
+            transformed vectors, closed over the observed parts
+
+            Parameters:
+                L - an array of CLR-transformed composition vectors
+                out - an optional array to write the result into
+
+            Returns:
+                the inverted data
+        """
+        L = np.asarray(L, dtype=float_dtype(L))
+        X = np.subtract(L, _row_reduce(L, np.max, np.nanmax), out=out)
+        np.exp(X, out=X)
+        return _masked_closure(X, out=X)
+
+class MaskedIsometricLogTransform(BaseEstimator, TransformerMixin,
+                                  ChunkedTransformMixin):
+
+    """ A custom sklearn transformer which implements isometric log ratios
+        for compositional data with missing values
+
+        Rows are grouped by which parts they have observed, and each group
+        is transformed in one go with the ILR basis for its subcomposition.
+        A row with k observed parts gets k - 1 coordinates, padded out to
+        m - 1 columns with NaN.
+
+        The coordinates don't say which parts they came from, so to put the
+        parts back in the right places inverse_transform needs the pattern
+        of observed parts, `observed=~np.isnan(X)`.
+
+        Parameters:
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+    """
+
+    def __init__(self, n_jobs=None):
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y=None):
+        """
+        Fit does nothing
+        """
+        return self
+
+    def transform(self, X, out=None):
+        """
+        Returns the isometric log ratio transform of the given composition
+        vectors X
+
+        Parameters:
+            X - an (n, m) array of composition vectors, with NaN for
+                missing parts
+            out - an optional (n, m - 1) array to write the result into
+
+        Returns:
+            an (n, m - 1) array of ILR coordinates for each row's observed
+            subcomposition
+        """
+        X = np.asarray(X, dtype=float_dtype(X))
+        return apply_parallel(_masked_ilr, X, out, self.n_jobs)
+
+    def inverse_transform(self, L, out=None, observed=None):
+        """
+        Returns the inverse isometric log ratio transformed data
+
+        Parameters:
+            L - an (n, m - 1) array of ILR coordinates from transform
+            out - an optional (n, m) array to write the result into
+            observed - an (n, m) boolean array of which parts were observed
+                in each row of the transformed data, i.e. ~np.isnan(X)
+
+        Returns:
+            the inverted data, with NaN for missing parts
+        """
+        L = np.asarray(L, dtype=float_dtype(L))
+        observed = _check_observed(L, observed)
+        return apply_parallel(_masked_inverse_ilr, L, out, self.n_jobs,
+                              observed=observed)
+
+    def inverse_transform_chunked(self, L, out=None, chunk_rows=None,
+                                  observed=None):
+        """
+        Inverse transform L a block of rows at a time
+
+        Parameters:
+            L - an (n, m - 1) array of ILR coordinates, can be an np.memmap
+            out - an optional (n, m) array to write the result into
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+            observed - an (n, m) boolean array of which parts were observed
+                in each row of the transformed data, i.e. ~np.isnan(X)
+
+        Returns:
+            the inverted data
+        """
+        L = np.asarray(L)
+        observed = _check_observed(L, observed)
+        return apply_chunked(_masked_inverse_ilr, L, out, chunk_rows,
+                             observed=observed)
+
+class MaskedAdditiveLogTransform(BaseEstimator, TransformerMixin,
+                                 ChunkedTransformMixin):
+
+    """ A custom sklearn transformer which implements additive log ratios
+        for compositional data with missing values
+
+        Missing parts come out as NaN without affecting the rest of the row;
+        rows where the base feature is missing are entirely NaN (and so are
+        rows with nothing but the base feature when they're inverted).
+
+        Parameters:
+            base_feature_index - which feature to use to normalize the
+                ratios. Optional, defaults to 1 (the second feature)
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+    """
+
+    def __init__(self, base_feature_index=1, n_jobs=None):
+        self.base_feature_index = base_feature_index
+        self.n_jobs = n_jobs
+
+    def fit(self, X, *args, **kwargs):
+        """
+        Fit does nothing here
+        """
+        return self
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """
+        Returns the additive log ratio transform of the given composition
+        vectors X
+
+        Parameters:
+            X - an (n, m) array of composition vectors, with NaN for
+                missing parts
+            out - an optional (n, m - 1) array to write the result into
+
+        Returns:
+            the (n, m - 1) additive log ratio-transformed data
+        """
+        X = np.asarray(X, dtype=float_dtype(X))
+        try:
+            base = X[:, [self.base_feature_index]]
+        except IndexError:
+            msg = ('Input data has no base feature index at {}'
+                   ', probably because there are not enough features. '
+                   'Maybe try setting a different base_feature_index?')
+            raise ValueError(msg.format(self.base_feature_index))
+        index = self.base_feature_index % X.shape[1]
+        if out is None:
+            out = np.empty((X.shape[0], X.shape[1] - 1), dtype=X.dtype)
+        np.divide(X[:, :index], base, out=out[:, :index])
+        np.divide(X[:, index + 1:], base, out=out[:, index:])
+        return np.log(out, out=out)
+
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
+        """
+        Returns the inverse additive log ratio transformed data, closed
+        over the observed parts
+
+        Parameters:
+            L - an array of ALR-transformed composition vectors
+            out - an optional array to write the result into
+
+        Returns:
+            the inverted data X
+        """
+        L = np.asarray(L, dtype=float_dtype(L))
+        npoints, ndim = L.shape
+        index = self.base_feature_index % (ndim + 1)
+        if out is None:
+            out = np.empty((npoints, ndim + 1), dtype=L.dtype)
+        np.exp(L[:, :index], out=out[:, :index])
+        out[:, index] = 1
+        np.exp(L[:, index:], out=out[:, index + 1:])
+
+        # Rows without any ratios are all NaN
+        out[np.isnan(L).all(axis=1)] = np.nan
+        return _masked_closure(out, out=out)
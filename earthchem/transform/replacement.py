@@ -0,0 +1,204 @@
+""" file:   replacement.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Zero and below-detection replacement for pipelines
+
+    Log-ratio transforms can't deal with zeros, and EarthChem data is full of
+    zeros and values below the detection limit. These transformers swap them
+    for small positive values using multiplicative replacement (Martín-
+    Fernández et al., 2003), which keeps the ratios between the other parts
+    and the row totals unchanged. Put one in a pipeline ahead of
+    CenteredLogTransform, IsometricLogTransform or AdditiveLogTransform:
+
+        >>> pipeline = make_pipeline(MultiplicativeReplacement(),
+        ...                          CenteredLogTransform())
+
+    Missing values (NaN) are left alone - use the masked transforms for
+    those.
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from .utilities import ChunkedTransformMixin, float_dtype, parallel_rows, \
+    row_chunks, _row_reduce
+
+def multiplicative_replacement(X, replace, delta, relative=False, out=None):
+    """ Replace values in X with delta and scale the rest of each row down so
+        that the row total doesn't change
+
+        The total is taken over the parts we keep, so replacing zeros leaves
+        the row sums exactly as they were. Rows with nothing left to keep
+        come back as NaN.
+
+        Parameters:
+            X - an (n, m) array of compositions
+            replace - an (n, m) boolean array which is True for values to
+                replace
+            delta - the replacement values, broadcastable to (n, m) - so a
+                scalar, a per-part (m,) array or a per-row (n, 1) array
+            relative - if True, delta is a fraction of each row's total
+                rather than an absolute value
+            out - an optional (n, m) float array to write the result into.
+                Can be X itself. If None, the result has the same type as
+                X (or float64 if X isn't floating point).
+
+        Returns:
+            the array with values replaced
+    """
+    X = np.asarray(X)
+    if out is None:
+        out = np.array(X, dtype=float_dtype(X))
+    elif out is not X:
+        out[...] = X
+
+    # Total of the parts we're keeping, and of the parts we're putting in
+    out[replace] = 0
+    totals = _row_reduce(out, np.sum, np.nansum)
+    empty = ~(totals > 0)
+    totals[empty] = np.nan
+    if relative:
+        delta = delta * totals
+    delta = np.asarray(delta, dtype=out.dtype)  # don't upcast float32 data
+    added = np.where(replace, delta, 0).sum(axis=1, keepdims=True)
+    if np.any(added >= totals):
+        raise ValueError('Replacement values are larger than the rest of '
+                         'the composition - try a smaller delta')
+
+    # Rescale the kept parts and drop in the replacements
+    out *= (totals - added) / totals
+    np.copyto(out, np.broadcast_to(delta, out.shape), where=replace)
+    out[empty[:, 0]] = np.nan
+    return out
+
+class MultiplicativeReplacement(BaseEstimator, TransformerMixin,
+                                ChunkedTransformMixin):
+
+    """ A custom sklearn transformer which replaces zeros in compositional
+        data with a small fraction of the row total
+
+        Parameters:
+            delta - the replacement value as a fraction of each row's
+                total. Optional, defaults to 1 / m ** 2 for m parts.
+            chunk_rows - how many rows to process at once. Optional,
+                defaults to blocks of about a megabyte.
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+    """
+
+    def __init__(self, delta=None, chunk_rows=None, n_jobs=None):
+        self.delta = delta
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y=None):
+        "Fit does nothing"
+        return self
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """ Returns X with zeros (and negative values) replaced
+
+            Parameters:
+                X - an (n, m) array of composition vectors
+                out - an optional (n, m) float array to write the result
+                    into. Can be X itself to replace in place.
+
+            Returns:
+                the data with zeros replaced
+        """
+        X = np.asarray(X)
+        if out is None:
+            out = np.empty(X.shape, dtype=float_dtype(X))
+        delta = self.delta if self.delta is not None else X.shape[1] ** -2.
+        for rows in row_chunks(X.shape[0], self.chunk_rows,
+                               X.itemsize * X.shape[1]):
+            block = X[rows]
+            multiplicative_replacement(block, block <= 0, delta,
+                                       relative=True, out=out[rows])
+        return out
+
+class DetectionLimitReplacement(BaseEstimator, TransformerMixin,
+                                ChunkedTransformMixin):
+
+    """ A custom sklearn transformer which replaces values below the
+        detection limit with a fraction of that limit
+
+        Values under the limit (including zeros) are set to
+        fraction * detection_limit for their part, and the rest of the row
+        is scaled down to keep the row total the same.
+
+        Parameters:
+            detection_limits - the detection limit for each part, either a
+                scalar or an (m,) array in the same units as the data.
+                Optional - if None, fit uses the smallest positive value in
+                each column.
+            fraction - the fraction of the detection limit to replace
+                with. Optional, defaults to 0.65.
+            chunk_rows - how many rows to process at once. Optional,
+                defaults to blocks of about a megabyte.
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+    """
+
+    def __init__(self, detection_limits=None, fraction=0.65,
+                 chunk_rows=None, n_jobs=None):
+        self.detection_limits = detection_limits
+        self.fraction = fraction
+        self.chunk_rows = chunk_rows
+        self.n_jobs = n_jobs
+
+    def fit(self, X, y=None):
+        """ Work out the detection limits
+
+            Parameters:
+                X - an (n, m) array of composition vectors
+        """
+        if self.detection_limits is not None:
+            self.detection_limits_ = np.asarray(self.detection_limits,
+                                                dtype=float)
+            return self
+
+        # Smallest positive value in each column, a chunk at a time
+        X = np.asarray(X)
+        limits = np.full(X.shape[1], np.inf)
+        for rows in row_chunks(X.shape[0], self.chunk_rows,
+                               X.itemsize * X.shape[1]):
+            block = np.asarray(X[rows], dtype=float_dtype(X))
+            np.fmin(limits, np.min(block, axis=0, initial=np.inf,
+                                   where=block > 0), out=limits)
+        limits[np.isinf(limits)] = np.nan
+        self.detection_limits_ = limits
+        return self
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """ Returns X with values below the detection limit replaced
+
+            Parameters:
+                X - an (n, m) array of composition vectors
+                out - an optional (n, m) float array to write the result
+                    into. Can be X itself to replace in place.
+
+            Returns:
+                the data with below-detection values replaced
+        """
+        limits = getattr(self, 'detection_limits_', None)
+        if limits is None:
+            if self.detection_limits is None:
+                raise ValueError('No detection limits given - pass '
+                                 'detection_limits or call fit first')
+            limits = np.asarray(self.detection_limits, dtype=float)
+
+        X = np.asarray(X)
+        if out is None:
+            out = np.empty(X.shape, dtype=float_dtype(X))
+        delta = self.fraction * limits
+        for rows in row_chunks(X.shape[0], self.chunk_rows,
+                               X.itemsize * X.shape[1]):
+            block = X[rows]
+            multiplicative_replacement(block, block < limits, delta,
+                                       out=out[rows])
+        return out
@@ -0,0 +1,122 @@
+""" file:   stats.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Summary statistics for compositional data
+
+    The variation matrix, centre and total variance all come from pairwise
+    sums of the log-composition, which we accumulate a block of rows at a
+    time with a few matrix products per block rather than looping over
+    pairs of parts. Everything here takes an array, a DataFrame, or an
+    iterable of either (like Query.pages()) for data that doesn't fit in
+    memory:
+
+        >>> variation_matrix(query.pages(), columns=['sio2', 'mgo', 'cao'])
+
+    Missing, zero or negative parts are left out pair by pair, so each
+    entry of the variation matrix uses the rows where both of its parts are
+    present - the same as var(log(df[i] / df[j])) in pandas.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .streaming import LogRatioMoments
+
+def log_ratio_moments(data, columns=None, chunk_rows=None):
+    """ Accumulate the log-ratio moments of some compositional data
+
+        Parameters:
+            data - an (n, m) array or DataFrame of compositions, or an
+                iterable of them (e.g. from Query.pages())
+            columns - which columns to use from DataFrames. Optional,
+                defaults to all of them
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            a LogRatioMoments accumulator, which can be updated with more
+            data later
+    """
+    moments = LogRatioMoments(chunk_rows=chunk_rows)
+    for batch in _batches(data):
+        if isinstance(batch, pd.DataFrame):
+            if columns is not None:
+                batch = batch[list(columns)]
+            moments.columns = list(batch.columns)
+            batch = batch.to_numpy(dtype=float)
+        moments.update(batch)
+    return moments
+
+def _batches(data):
+    "Treat arrays and DataFrames as a single batch"
+    if isinstance(data, (np.ndarray, pd.DataFrame)):
+        return [data]
+    return data
+
+def _label(result, moments, series=False):
+    "Put column labels back on results from DataFrames"
+    columns = moments.columns
+    if columns is None:
+        return result
+    if series:
+        return pd.Series(result, index=columns)
+    return pd.DataFrame(result, index=columns, columns=columns)
+
+def variation_matrix(data, columns=None, ddof=1, chunk_rows=None):
+    """ The Aitchison variation matrix, T_ij = var(log(x_i / x_j))
+
+        Parameters:
+            data - an (n, m) array or DataFrame of compositions, or an
+                iterable of them
+            columns - which columns to use from DataFrames. Optional,
+                defaults to all of them
+            ddof - delta degrees of freedom. Optional, defaults to 1
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            an (m, m) array, or a DataFrame labelled by column for
+            DataFrame input
+    """
+    moments = log_ratio_moments(data, columns, chunk_rows)
+    return _label(moments.variation_matrix(ddof), moments)
+
+def centre(data, columns=None, total=1, chunk_rows=None):
+    """ The compositional centre (the closed geometric mean of each part)
+
+        Parameters:
+            data - an (n, m) array or DataFrame of compositions, or an
+                iterable of them
+            columns - which columns to use from DataFrames. Optional,
+                defaults to all of them
+            total - what the centre should sum to. Optional, defaults to
+                unity
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            an (m,) array, or a Series labelled by column for DataFrame
+            input
+    """
+    moments = log_ratio_moments(data, columns, chunk_rows)
+    return _label(moments.centre(total), moments, series=True)
+
+def total_variance(data, columns=None, ddof=1, chunk_rows=None):
+    """ The total variance (the sum of the variation matrix over 2m, which
+        is the trace of the CLR covariance)
+
+        Parameters:
+            data - an (n, m) array or DataFrame of compositions, or an
+                iterable of them
+            columns - which columns to use from DataFrames. Optional,
+                defaults to all of them
+            ddof - delta degrees of freedom. Optional, defaults to 1
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            the total variance
+    """
+    return log_ratio_moments(data, columns, chunk_rows).total_variance(ddof)
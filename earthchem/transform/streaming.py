@@ -0,0 +1,394 @@
+""" file:   streaming.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Streaming log-ratio transforms with partial_fit
+
+    These keep running statistics of the log-composition (the geometric
+    mean centre and the covariance, which gives the variation matrix and
+    total variance) so that data can be centred and scaled over a dataset
+    that doesn't fit in memory. Feed them a page at a time:
+
+        >>> clr = StreamingCenteredLogTransform(scale=True)
+        >>> for page in query.pages():
+        ...     clr.partial_fit(page[columns].to_numpy())
+        >>> L = clr.transform(X)
+"""
+
+import numpy as np
+from sklearn.base import BaseEstimator, TransformerMixin
+
+from .utilities import ChunkedTransformMixin, basis_matrix, closure, \
+    float_dtype, parallel_rows, row_chunks
+
+class LogRatioMoments(object):
+
+    """ Running pairwise statistics of log-compositions
+
+        Missing, zero or negative parts can't be logged, so they are left
+        out pairwise: each entry of the covariance and variation matrices
+        uses the rows where both of its parts are present, and each part's
+        mean uses the rows where it is present (like pandas does for
+        sparse data). Rows with nothing usable in them are counted in
+        `n_skipped`.
+
+        Each block of rows is added with a few matrix products of the
+        zero-filled logs and the observed mask. Sums are kept in float64,
+        relative to a per-part shift taken from the first data seen for
+        that part, so they don't lose precision to the size of the logs.
+        Two accumulators (e.g. from different workers) can be merged.
+
+        Parameters:
+            chunk_rows - the number of rows to process at once in update.
+                Optional, defaults to blocks of about a megabyte
+            columns - labels for the parts, if we know them. Optional.
+    """
+
+    def __init__(self, chunk_rows=None, columns=None):
+        self.chunk_rows = chunk_rows
+        self.columns = columns
+        self.n_samples = 0
+        self.n_skipped = 0
+        self._shift = None
+        self._counts = None     # rows with both parts i and j
+        self._sums = None       # sum of log x_i over rows with i and j
+        self._squares = None    # sum of (log x_i)^2 over rows with i and j
+        self._products = None   # sum of log x_i log x_j
+
+    def update(self, X):
+        """ Add a batch of compositions
+
+            Parameters:
+                X - an (n, m) array of compositions
+
+            Returns:
+                the accumulator, for chaining
+        """
+        X = np.asarray(X)
+        for rows in row_chunks(X.shape[0], self.chunk_rows,
+                               X.itemsize * X.shape[1]):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                logX = np.log(X[rows], dtype=float)
+            observed = np.isfinite(logX)
+            empty = ~observed.any(axis=1)
+            if empty.any():
+                self.n_skipped += int(empty.sum())
+                logX, observed = logX[~empty], observed[~empty]
+            if len(logX) == 0:
+                continue
+            self._add(logX, observed)
+        return self
+
+    def _start(self, n_parts):
+        self._shift = np.zeros(n_parts)
+        self._counts = np.zeros((n_parts, n_parts))
+        self._sums = np.zeros((n_parts, n_parts))
+        self._squares = np.zeros((n_parts, n_parts))
+        self._products = np.zeros((n_parts, n_parts))
+
+    def _check_parts(self, n_parts):
+        if self._shift is None:
+            self._start(n_parts)
+        elif n_parts != len(self._shift):
+            raise ValueError('Expected {0} parts, got {1}'.format(
+                len(self._shift), n_parts))
+
+    def _add(self, logX, observed):
+        "Add the sums for a block of logs"
+        self._check_parts(logX.shape[1])
+
+        # Shift parts we haven't seen before by their mean in this block.
+        # They have no sums yet so there's nothing to correct
+        present = observed.sum(axis=0)
+        fresh = (np.diag(self._counts) == 0) & (present > 0)
+        if fresh.any():
+            totals = np.where(observed, logX, 0).sum(axis=0)
+            self._shift[fresh] = totals[fresh] / present[fresh]
+
+        mask = observed.astype(float)
+        logX = np.where(observed, logX - self._shift, 0)
+        self._counts += np.dot(mask.T, mask)
+        self._sums += np.dot(logX.T, mask)
+        self._squares += np.dot((logX * logX).T, mask)
+        self._products += np.dot(logX.T, logX)
+        self.n_samples += len(logX)
+
+    def merge(self, other):
+        """ Add the statistics from another accumulator
+
+            Parameters:
+                other - another LogRatioMoments
+
+            Returns:
+                the accumulator, for chaining
+        """
+        self.n_skipped += other.n_skipped
+        if not other.n_samples:
+            return self
+        self._check_parts(len(other._shift))
+        fresh = np.diag(self._counts) == 0
+        self._shift[fresh] = other._shift[fresh]
+
+        # Move the other sums onto our shifts
+        delta = other._shift - self._shift
+        counts, sums = other._counts, other._sums
+        self._products += other._products + sums * delta[np.newaxis, :] \
+            + sums.T * delta[:, np.newaxis] + np.outer(delta, delta) * counts
+        self._squares += other._squares + 2 * delta[:, np.newaxis] * sums \
+            + (delta ** 2)[:, np.newaxis] * counts
+        self._sums += sums + delta[:, np.newaxis] * counts
+        self._counts += counts
+        self.n_samples += other.n_samples
+        return self
+
+    def _check(self):
+        if not self.n_samples:
+            raise ValueError("I haven't seen any data yet")
+
+    def _divide(self, values, ddof):
+        "Divide by the pair counts less ddof, NaN where there's no data"
+        counts = self._counts
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result = values / np.maximum(counts - ddof, 1)
+        result[counts == 0] = np.nan
+        return result
+
+    @property
+    def mean_log(self):
+        "The mean of the log of each part, over the rows where it's present"
+        self._check()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.diag(self._sums) / np.diag(self._counts) + self._shift
+
+    @property
+    def pair_counts(self):
+        "The number of rows with both parts i and j"
+        self._check()
+        return self._counts.copy()
+
+    def covariance(self, ddof=1):
+        """ The covariance matrix of the log-compositions, using the rows
+            where both parts are present for each entry
+
+            Parameters:
+                ddof - delta degrees of freedom. Optional, defaults to 1
+        """
+        self._check()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            centred = self._products \
+                - self._sums * self._sums.T / self._counts
+        return self._divide(centred, ddof)
+
+    def centre(self, total=1):
+        """ The compositional centre (the closed geometric mean)
+
+            Parameters:
+                total - what the centre should sum to. Optional, defaults
+                    to unity
+        """
+        mean_log = self.mean_log
+        centre = np.exp(mean_log - np.nanmax(mean_log))
+        return closure(centre[np.newaxis], total=total)[0]
+
+    def clr_centre(self):
+        "The centre in CLR coordinates"
+        mean_log = self.mean_log
+        return mean_log - mean_log.mean()
+
+    def variation_matrix(self, ddof=1):
+        """ The Aitchison variation matrix, var(log(x_i / x_j)), using the
+            rows where both parts are present for each entry
+
+            Parameters:
+                ddof - delta degrees of freedom. Optional, defaults to 1
+        """
+        self._check()
+        difference = self._sums - self._sums.T
+        squares = self._squares + self._squares.T - 2 * self._products
+        with np.errstate(divide='ignore', invalid='ignore'):
+            squares -= difference ** 2 / self._counts
+        return self._divide(np.maximum(squares, 0), ddof)
+
+    def total_variance(self, ddof=1):
+        """ The total variance (the sum of the variation matrix over 2m,
+            which is the trace of the CLR covariance for complete data)
+
+            Parameters:
+                ddof - delta degrees of freedom. Optional, defaults to 1
+        """
+        variation = self.variation_matrix(ddof)
+        return variation.sum() / (2 * len(variation))
+
+class _StreamingLogTransform(BaseEstimator, TransformerMixin,
+                             ChunkedTransformMixin):
+
+    "Shared fitting for the streaming transforms"
+
+    def __init__(self, scale=False, n_jobs=None, dtype=None):
+        self.scale = scale
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+
+    def partial_fit(self, X, y=None):
+        """ Update the running statistics with a batch of compositions
+
+            Parameters:
+                X - an (n, m) array of compositions
+        """
+        if not hasattr(self, 'moments_'):
+            self.moments_ = LogRatioMoments()
+        self.moments_.update(X)
+        self._update_params()
+        return self
+
+    def fit(self, X, y=None):
+        """ Fit the statistics to X, forgetting anything seen before
+
+            Parameters:
+                X - an (n, m) array of compositions
+        """
+        self.moments_ = LogRatioMoments().update(X)
+        self._update_params()
+        return self
+
+    def _update_params(self):
+        "Work out the centre and scale from the running statistics"
+        if not self.moments_.n_samples:
+            return
+        self.centre_ = self.moments_.centre()
+        self.clr_centre_ = self.moments_.clr_centre()
+        self.total_variance_ = self.moments_.total_variance()
+        self.scale_ = np.sqrt(self.total_variance_) if self.scale else 1.
+
+    def _params(self, dtype):
+        "Centre (in this transform's coordinates) and scale as dtype"
+        if not hasattr(self, 'centre_'):
+            raise ValueError('Call fit or partial_fit before transforming')
+        centre = self._coordinates_of_centre()
+        return centre.astype(dtype), dtype.type(self.scale_)
+
+class StreamingCenteredLogTransform(_StreamingLogTransform):
+
+    """ A custom sklearn transformer which implements centered-log scaling
+        for compositional data, centred on a running geometric mean
+
+        The transform is the CLR of each composition perturbed by the
+        inverse of the centre, so the fitted data is centred on the origin.
+        With scale=True it's also divided by the square root of the total
+        variance.
+
+        Parameters:
+            scale - whether to scale to unit total variance. Optional,
+                defaults to False
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point).
+    """
+
+    def _coordinates_of_centre(self):
+        return self.clr_centre_
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """ Returns the centred (and maybe scaled) CLR of X
+
+            Parameters:
+                X - an (n, m) array of compositions
+                out - an optional (n, m) array to write the result into
+
+            Returns:
+                the transformed data
+        """
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
+        centre, scale = self._params(X.dtype)
+        out = np.log(X, out=out)
+        out -= out.mean(axis=1, keepdims=True)
+        out -= centre
+        if self.scale:
+            out /= scale
+        return out
+
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
+        """ Returns the compositions for transformed data L
+
+            Parameters:
+                L - an (n, m) array of transformed data
+                out - an optional (n, m) array to write the result into
+
+            Returns:
+                the closed compositions
+        """
+        L = np.asarray(L, dtype=float_dtype(L, self.dtype))
+        centre, scale = self._params(L.dtype)
+        out = np.multiply(L, scale, out=out)
+        out += centre
+        out -= out.max(axis=1, keepdims=True)
+        np.exp(out, out=out)
+        return closure(out, out=out)
+
+class StreamingIsometricLogTransform(_StreamingLogTransform):
+
+    """ A custom sklearn transformer which implements isometric log ratios
+        for compositional data, centred on a running geometric mean
+
+        The transform is the ILR of each composition perturbed by the
+        inverse of the centre, so the fitted data is centred on the origin.
+        With scale=True it's also divided by the square root of the total
+        variance (which is the same in ILR and CLR coordinates).
+
+        Parameters:
+            scale - whether to scale to unit total variance. Optional,
+                defaults to False
+            n_jobs - the number of threads to split big arrays over.
+                Optional, defaults to one. -1 means use all the cores.
+            dtype - the floating point type to work in. Optional, defaults
+                to the type of the input (or float64 if it isn't floating
+                point).
+    """
+
+    def _coordinates_of_centre(self):
+        psi = basis_matrix(len(self.clr_centre_))
+        return np.dot(psi, self.clr_centre_)
+
+    @parallel_rows
+    def transform(self, X, out=None):
+        """ Returns the centred (and maybe scaled) ILR of X
+
+            Parameters:
+                X - an (n, m) array of compositions
+                out - an optional (n, m - 1) array to write the result into
+
+            Returns:
+                the transformed data
+        """
+        X = np.asarray(X, dtype=float_dtype(X, self.dtype))
+        centre, scale = self._params(X.dtype)
+        psi = basis_matrix(X.shape[1], X.dtype)
+        out = np.matmul(np.log(X), psi.T, out=out)
+        out -= centre
+        if self.scale:
+            out /= scale
+        return out
+
+    @parallel_rows
+    def inverse_transform(self, L, out=None):
+        """ Returns the compositions for transformed data L
+
+            Parameters:
+                L - an (n, m - 1) array of transformed data
+                out - an optional (n, m) array to write the result into
+
+            Returns:
+                the closed compositions
+        """
+        L = np.asarray(L, dtype=float_dtype(L, self.dtype))
+        centre, scale = self._params(L.dtype)
+        psi = basis_matrix(L.shape[1] + 1, L.dtype)
+        out = np.matmul(L * scale + centre, psi, out=out)
+        out -= out.max(axis=1, keepdims=True)
+        np.exp(out, out=out)
+        return closure(out, out=out)
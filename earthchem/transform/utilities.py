@@ -5,9 +5,44 @@
 
     description: Utilities for transforms
 """
+import os
+import warnings
+
 import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial, wraps
+
+# Aim for row blocks of about this many bytes when working in chunks, so
+# that each block and its temporaries stay in cache
+CHUNK_BYTES = 2 ** 20
+
+def float_dtype(X, dtype=None):
+    """ 
+    Work out which floating point type to do a transform in
+
+    Parameters:
+        X - the input array or DataFrame
+        dtype - the type asked for. Optional, if None we keep X's type if
+            it's floating point (so float32 stays float32) and use float64
+            otherwise
+
+    Returns:
+        a numpy dtype
+    """
+    if dtype is not None:
+        return np.dtype(dtype)
+    if isinstance(X, pd.DataFrame):
+        # Work it out from the columns rather than copying the values
+        dtypes = [d if isinstance(d, np.dtype) else np.dtype(object)
+                  for d in X.dtypes]
+        dtype = np.result_type(*dtypes) if dtypes else np.dtype(float)
+    else:
+        dtype = np.asarray(X).dtype
+    return dtype if np.issubdtype(dtype, np.floating) else np.dtype(float)
 
-def closure(X, total=1):
+def closure(X, total=1, out=None, n_jobs=None, dtype=None):
     """ 
     The closure operator: scale X so that everything sums to unity.
     
@@ -15,41 +50,323 @@ def closure(X, total=1):
         X - a (n_points, n_dim) array of compositional values
         total - the total that things should sum to. Optional, defaults
             to unity
+        out - an optional (n_points, n_dim) array to write the result into.
+            Can be X itself to close in place.
+        n_jobs - the number of threads to split the rows over. Optional,
+            defaults to one. -1 means use all the cores.
+        dtype - the floating point type to use. Optional, defaults to the
+            type of X (or float64 if X isn't floating point)
     
     Returns:
         an (n_points, n_dim) array where each row sums to unity
     """
-    X = np.asarray(X)
-    return (total * X.T / (X.sum(axis=1))).T
+    X = np.asarray(X, dtype=float_dtype(X, dtype))
+    if effective_n_jobs(n_jobs) > 1:
+        return apply_parallel(partial(closure, total=total), X, out, n_jobs)
+    totals = X.sum(axis=1, keepdims=True)
+    if total != 1:
+        totals = totals / total
+    return np.divide(X, totals, out=out)
+
+def _row_reduce(values, reduce, nanreduce):
+    """ Reduce an array over rows, only paying for the NaN-aware reduction
+        on the rows which actually have NaNs in them
+
+        Parameters:
+            values - an (n, m) array
+            reduce - a numpy reduction like np.mean
+            nanreduce - the NaN-ignoring version, like np.nanmean
+
+        Returns:
+            an (n, 1) array with the reduced values. Rows which are entirely
+            NaN get whatever nanreduce gives them (NaN for np.nanmean, zero
+            for np.nansum).
+    """
+    result = reduce(values, axis=1)
+    missing = np.isnan(result)
+    if missing.any():
+        with warnings.catch_warnings():
+            # All-NaN rows are fine, they just stay NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result[missing] = nanreduce(values[missing], axis=1)
+    return result[:, np.newaxis]
 
-def pd_closure(df, constant=1):
+def pd_closure(df, constant=1, inplace=False):
     """
     Push dataframe through closure operation
+
+    Row sums are calculated once and applied with a single broadcast.
+    Missing values are skipped when summing (so the observed parts are
+    closed and NaNs stay NaN), and rows which sum to zero come back as NaN
+    rather than inf.
     
     Parameters:
         df - the data to close over
+        constant - the total that each row should sum to. Optional,
+            defaults to unity
+        inplace - if True, modify df in place (df must have float columns)
+            and return None
     
     Returns:
         a dataframe with closed data (all features sum to a constant)
     """
-    return df.apply(lambda x: constant * x / df.sum(axis=1))
+    values = df.to_numpy(dtype=float_dtype(df), copy=True)
+    totals = _row_reduce(values, np.sum, np.nansum)
+    nonzero = totals != 0
+    np.divide(constant, totals, out=totals, where=nonzero)
+    totals[~nonzero] = np.nan
+    values *= totals
+    if inplace:
+        df.iloc[:, :] = values
+        return None
+    return pd.DataFrame(values, index=df.index, columns=df.columns,
+                        copy=False)
+
+def row_chunks(n_rows, chunk_rows=None, row_bytes=8):
+    """
+    Generate slices which cover n_rows in blocks
+
+    Parameters:
+        n_rows - the number of rows to cover
+        chunk_rows - the number of rows in each block. Optional, defaults
+            to however many rows fit into CHUNK_BYTES
+        row_bytes - the size of a row in bytes, used to pick the default
+            block size
+
+    Returns:
+        a generator of slice objects
+    """
+    if chunk_rows is None:
+        chunk_rows = CHUNK_BYTES // max(int(row_bytes), 1)
+    chunk_rows = max(int(chunk_rows), 1)
+    for start in range(0, n_rows, chunk_rows):
+        yield slice(start, min(start + chunk_rows, n_rows))
+
+def apply_chunked(func, X, out=None, chunk_rows=None, **rowwise):
+    """
+    Apply a row-wise function to X a block of rows at a time
+
+    Each block is read from X (which can be an np.memmap), passed through
+    func and written straight into out, so the only full-size array is the
+    output.
+
+    Parameters:
+        func - the function to apply. Should take a block of rows and an
+            `out` keyword argument to write the result into.
+        X - an (n_points, n_dim) array
+        out - an optional array to write the result into, e.g. a
+            preallocated array or an np.memmap opened for writing. If None,
+            an array is allocated with the shape and dtype of the first
+            block's result.
+        chunk_rows - the number of rows to process at once. Optional,
+            defaults to however many rows fit into CHUNK_BYTES.
+        **rowwise - other (n_points, ...) arrays to slice up alongside X
+            and pass to func as keyword arguments
+
+    Returns:
+        the output array
+    """
+    X = np.asarray(X)  # memmaps are left on disk until we read a block
+    n_rows = X.shape[0]
+    row_bytes = X.itemsize * int(np.prod(X.shape[1:]))
+    for rows in row_chunks(n_rows, chunk_rows, row_bytes):
+        block = np.asarray(X[rows])
+        kwargs = {key: value[rows] for key, value in rowwise.items()}
+        if out is None:
+            result = func(block, **kwargs)
+            out = np.empty((n_rows,) + result.shape[1:], dtype=result.dtype)
+            out[rows] = result
+        else:
+            func(block, out=out[rows], **kwargs)
+    if out is None:
+        # No rows, so we can't work out the output shape from a block
+        return func(X, **rowwise)
+    return out
+
+def effective_n_jobs(n_jobs=None):
+    """
+    Work out how many workers to use, following the sklearn convention
+
+    Parameters:
+        n_jobs - None or 1 for one worker, a positive number for that many
+            workers, or a negative number to count back from the number of
+            cores (so -1 means all of them, -2 all but one)
+
+    Returns:
+        the number of workers
+    """
+    if n_jobs is None or n_jobs == 0:
+        return 1
+    if n_jobs < 0:
+        return max(os.cpu_count() + 1 + n_jobs, 1)
+    return int(n_jobs)
 
-def basis_matrix(n_dimensions):
+def apply_parallel(func, X, out=None, n_jobs=None, chunk_rows=None,
+                   **rowwise):
+    """
+    Apply a row-wise function to X, splitting the rows over a thread pool
+
+    The rows are split into one block per worker, and each worker works
+    through its block with apply_chunked. NumPy releases the GIL inside
+    its ufuncs and matrix products, so threads run on separate cores
+    without copying anything - every worker writes straight into its own
+    slice of the output. Small inputs just get run in this thread.
+
+    Parameters:
+        func - the function to apply. Should take a block of rows and an
+            `out` keyword argument to write the result into.
+        X - an (n_points, n_dim) array, can be an np.memmap
+        out - an optional array to write the result into. If None, one is
+            allocated with the shape and dtype of func's result.
+        n_jobs - the number of threads to use, see effective_n_jobs
+        chunk_rows - the number of rows each worker processes at once.
+            Optional, defaults to however many rows fit into CHUNK_BYTES.
+        **rowwise - other (n_points, ...) arrays to slice up alongside X
+            and pass to func as keyword arguments
+
+    Returns:
+        the output array
+    """
+    X = np.asarray(X)
+    n_rows = X.shape[0]
+    n_jobs = min(effective_n_jobs(n_jobs),
+                 max(X.nbytes // CHUNK_BYTES, 1))
+    if n_jobs == 1:
+        return func(X, out=out, **rowwise)
+
+    # Get the output shape from the first row
+    if out is None:
+        first = func(X[:1], **{key: value[:1]
+                               for key, value in rowwise.items()})
+        out = np.empty((n_rows,) + first.shape[1:], dtype=first.dtype)
+
+    block_rows = -(-n_rows // n_jobs)
+    def work(rows):
+        apply_chunked(func, X[rows], out[rows], chunk_rows,
+                      **{key: value[rows] for key, value in rowwise.items()})
+    with ThreadPoolExecutor(n_jobs) as pool:
+        # list() makes sure any exceptions get raised here
+        list(pool.map(work, row_chunks(n_rows, block_rows)))
+    return out
+
+def parallel_rows(method):
+    """
+    Decorator which splits a transformer method's rows over the
+    transformer's n_jobs threads
+
+    The method should take a block of rows and an `out` argument, and
+    mustn't store anything on self.
+    """
+    @wraps(method)
+    def wrapper(self, X, out=None):
+        n_jobs = getattr(self, 'n_jobs', None)
+        if effective_n_jobs(n_jobs) == 1:
+            return method(self, X, out=out)
+        return apply_parallel(partial(method, self), X, out, n_jobs)
+    return wrapper
+
+class ChunkedTransformMixin(object):
+
+    """
+    Mixin which adds chunked versions of transform and inverse_transform
+
+    These work a block of rows at a time so that inputs and outputs can be
+    memory-mapped arrays bigger than RAM. The transformer's own transform
+    and inverse_transform methods need to take an `out` argument.
+    """
+
+    def transform_chunked(self, X, out=None, chunk_rows=None):
+        """
+        Transform X a block of rows at a time
+
+        Parameters:
+            X - an (n_points, n_dim) array, can be an np.memmap
+            out - an optional array to write the result into (e.g. an
+                np.memmap opened for writing)
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            the transformed data
+        """
+        return apply_chunked(self.transform, X, out, chunk_rows)
+
+    def inverse_transform_chunked(self, X, out=None, chunk_rows=None):
+        """
+        Inverse transform X a block of rows at a time
+
+        Parameters:
+            X - an (n_points, n_dim) array, can be an np.memmap
+            out - an optional array to write the result into (e.g. an
+                np.memmap opened for writing)
+            chunk_rows - the number of rows to process at once. Optional,
+                defaults to blocks of about a megabyte
+
+        Returns:
+            the inverted data
+        """
+        return apply_chunked(self.inverse_transform, X, out, chunk_rows)
+
+def missingness_groups(observed):
+    """
+    Group rows by their pattern of observed values
+
+    Patterns are packed into bytes and hashed with np.unique, so this is
+    vectorized over rows however many columns there are.
+
+    Parameters:
+        observed - an (n_points, n_dim) boolean array which is True where
+            a value was observed, e.g. ~np.isnan(X)
+
+    Returns:
+        a list of (pattern, rows) tuples, where pattern is an (n_dim,)
+        boolean array and rows is an array of the indices of the rows with
+        that pattern
+    """
+    observed = np.asarray(observed, dtype=bool)
+    if observed.shape[0] == 0:
+        return []
+    packed = np.ascontiguousarray(np.packbits(observed, axis=1))
+    keys = packed.view(np.dtype((np.void, packed.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True,
+                                  return_inverse=True)
+    inverse = inverse.ravel()
+
+    # Sort rows by group so each group is a contiguous slice
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.cumsum(np.bincount(inverse, minlength=len(first)))[:-1]
+    return [(observed[idx], rows)
+            for idx, rows in zip(first, np.split(order, bounds))]
+
+def basis_matrix(n_dimensions, dtype=float):
     """
     Return the ILR basis matrix for the given number of dimensions
 
+    Matrices are cached by dimension and dtype, so the returned array is
+    read-only - take a copy if you need to modify it.
+
     Parameters:
         n_dimensions - the number of dimensions
+        dtype - the floating point type to return. Optional, defaults to
+            float64. Ask for float32 to transform float32 data without
+            upcasting it.
 
     Returns:
         the basis matrix V for the ILR
     """
+    return _basis_matrix(n_dimensions, np.dtype(dtype))
+
+@lru_cache(maxsize=128)
+def _basis_matrix(n_dimensions, dtype):
+    "Cached implementation of basis_matrix"
     D = n_dimensions
-    Psi = np.zeros((D - 1, D))
-    for i in range(1, D):
-        for j in range(1, D + 1):
-            if j <= D - i:
-                Psi[i - 1, j - 1] = np.sqrt(1 / ((D - i) * (D - i + 1)))
-            elif j == D - i + 1:
-                Psi[i - 1, j - 1] = -np.sqrt((D - i) / (D - i + 1)) 
+
+    # Row i has 1/sqrt(k(k + 1)) in the first k = D - i columns, then
+    # -sqrt(k / (k + 1)) in column k + 1 and zeros after that
+    k = np.arange(D - 1, 0, -1)
+    Psi = (np.arange(D)[np.newaxis, :] < k[:, np.newaxis]) \
+        * np.sqrt(1 / (k * (k + 1)))[:, np.newaxis]
+    Psi[np.arange(D - 1), k] = -np.sqrt(k / (k + 1))
+    Psi = Psi.astype(dtype, copy=False)
+    Psi.flags.writeable = False
     return Psi
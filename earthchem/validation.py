@@ -3,69 +3,50 @@
     date:   May 2018
 
     description: Handles validation against EarthChem's API schema
+
+    The key and type tables come from _schema.py, which is generated from the
+    SOAP search schema at build time (see codegen.py), so we don't need to
+    parse any XML here.
 """
 
-from lxml import etree, objectify
-from lxml.etree import XMLSyntaxError
-import requests
+from . import _schema
 
 import os
-import pkg_resources
 
 # We're not live updating at the moment but it's nice to have this recoded somewhere
 SOAP_SCHEMA_URL = 'http://ecp.iedadata.org/soap_search_schema.xsd'
-SOAP_SCHEMA = pkg_resources.resource_filename(
-        "earthchem.resources",
-        "soap_search_schema.xsd")
-
-# Mapping XML types to our simple types
-TYPE_MAPPING = {
-    '{http://www.w3.org/2001/XMLSchema}complexType': 'complex',
-    '{http://www.w3.org/2001/XMLSchema}simpleType': 'simple',
-    '{http://www.w3.org/2001/XMLSchema}string': 'string',
-    'xs:string': 'string'
-}
+SOAP_SCHEMA = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)),
+        "resources", "soap_search_schema.xsd")
 
 # Mapping for namespaces
 _NS = {"xs": "http://www.w3.org/2001/XMLSchema"}
 
-def get_type(elem):
-    """ Get the data type for an XML element
-    """    
-    # First check the attributes
-    attrtype = elem.get('type')
-    if attrtype is not None:
-        return TYPE_MAPPING[attrtype]
-
-    # Ok so there's probably some children to check then
-    # If we have children then we can have a complex type or a simple type
-    # If an xs:complexType we make a dict, if xs:simpleType we expect a string
-    for child in elem.getchildren():
-        try:
-            return TYPE_MAPPING[child.tag]
-        except KeyError:
-            continue
-    
-    # If we're here we will just assume that the type is 'string'
-    return TYPE_MAPPING['xs:string']
+def get_type(name):
+    """ Get the data type for a schema element
+    """
+    try:
+        return _schema.ELEMENT_TYPES[name]
+    except KeyError:
+        raise KeyError('Unknown schema element {} - valid values are {}'.format(
+            name, list(_schema.ELEMENT_TYPES.keys())))
 
 # Mapping simple types to our validator factories
 # Note we have to actually define these below once we've defined the functions
 # as part of this mapping
 VALIDATOR_MAPPING = {}
 
-def complex_validator(elem):
+def complex_validator(name):
     """ Construct a validator for an xs:complexType
     """
     # Pull together keys and validators for each key
-    attributes = elem.xpath('./xs:complexType/xs:attribute', namespaces=_NS)
+    attributes = _schema.ELEMENT_ATTRIBUTES.get(name, {})
     validators = {
-        attr.get('name'): VALIDATOR_MAPPING[get_type(attr)](attr)
-        for attr in attributes
+        attr: VALIDATOR_MAPPING[attrtype](attr)
+        for attr, attrtype in attributes.items()
     }
 
     # Construct a validator function
-    name = elem.get('name')
     def _validator(obj):
         if type(obj) != dict:
             raise ValueError('I expected a dict for parameter {} - got a {} instead ({})'.format(name, type(obj), obj))
@@ -80,12 +61,11 @@ def complex_validator(elem):
     
     return _validator
 
-def simple_validator(elem):
+def simple_validator(name):
     """ Construct a validator for an xs:simpleType - these are normally values
         with particular restrictions
     """
     # Construct a validator that checks values against known ok values
-    name = elem.get('name')
     def _validator(obj):
         if type(obj) != dict:
             raise ValueError('I expected a str for parameter {} - got a {} instead ({})'.format(name, type(obj), obj))
@@ -94,11 +74,10 @@ def simple_validator(elem):
     # Return the validation function
     return _validator
 
-def string_validator(elem):
+def string_validator(name):
     """ String validator for objects - validates any string it's passed
     """
     # Construct a validator that just checks that we have a string
-    name = elem.get('name')
     def _validator(obj):
         if type(obj) != str:
             raise ValueError('I expected a string for parameter {} - got a {} instead ({})'.format(name, type(obj), obj))
@@ -107,9 +86,23 @@ def string_validator(elem):
     # Return the validation function
     return _validator
 
+def integer_validator(name):
+    """ Integer validator for objects - validates ints or strings of ints
+    """
+    def _validator(obj):
+        try:
+            int(obj)
+        except (TypeError, ValueError):
+            raise ValueError('I expected an integer for parameter {} - got a {} instead ({})'.format(name, type(obj), obj))
+        return True
+
+    # Return the validation function
+    return _validator
+
 # Mapping simple types to our validator factories
 VALIDATOR_MAPPING = {
     'string': string_validator,
+    'integer': integer_validator,
     'complex': complex_validator,
     'simple': simple_validator
 }
@@ -136,20 +129,34 @@ class ElementValidator(dict):
         # Storage slots for caching
         self._tree = None
         
-        # Find the element for the given name
-        query = "//xs:element[@name='{}']".format(self.xmlname)
-        self.root = self.xpath(query)[0]
-        self.dtype = get_type(self.root)
-        self._validator = VALIDATOR_MAPPING[self.dtype](self.root)
-    
+        # Find the type for the given name
+        self.dtype = get_type(self.xmlname)
+        self._validator = VALIDATOR_MAPPING[self.dtype](self.xmlname)
+
+    @property
+    def attributes(self):
+        "Return the allowed attributes for this element"
+        return _schema.ELEMENT_ATTRIBUTES.get(self.xmlname, {})
+
+    @property
+    def enumeration(self):
+        "Return the allowed values for this element, or None if unrestricted"
+        return _schema.ELEMENT_ENUMERATIONS.get(self.xmlname)
+
     @property
     def tree(self):
-        "Return the XML tree for the SOAP schema"
+        """ Return the XML tree for the SOAP schema
+
+            Only needed for poking around in the raw schema - we import lxml
+            here rather than at the top of the module so that it stays out of
+            the import path.
+        """
         # Return from cache if we already have it
         if self._tree is not None:
             return self._tree
         
         # Otherwise just make a new tree
+        from lxml import etree
         with open(SOAP_SCHEMA, 'r') as src:
             self._tree = etree.parse(src)
         
@@ -7,12 +7,39 @@
     description: Setuptools installer script for earthchem.
 """
 
-from setuptools import setup, find_packages
+from setuptools import setup, find_packages, Command
 import versioneer
 
+import os
+import runpy
+
 with open('README.md', 'r') as src:
     LONG_DESCRIPTION = src.read()
 
+class BuildSchema(Command):
+
+    """ Regenerate earthchem/_schema.py from the SOAP search schema
+
+        We run codegen.py as a script so that we don't need to import
+        earthchem itself to build it.
+    """
+
+    description = 'regenerate the schema tables in earthchem/_schema.py'
+    user_options = []
+
+    def initialize_options(self):
+        pass
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        codegen = runpy.run_path(os.path.join('earthchem', 'codegen.py'))
+        codegen['main']()
+
+CMDCLASS = versioneer.get_cmdclass()
+CMDCLASS['build_schema'] = BuildSchema
+
 ## PACKAGE INFORMATION
 setup(
     name='earthchem',
@@ -35,6 +62,7 @@ setup(
         'Topic :: Scientific/Engineering',
         'Topic :: Software Development :: Libraries :: Python Modules',
     ],
+    python_requires='>=3.7',
     project_urls={
         'Test coverage': 'https://coveralls.io/github/jesserobertson/earthchem-pyclient',
         'Test status': 'https://travis-ci.org/jesserobertson/earthchem-pyclient'
@@ -67,14 +95,14 @@ setup(
     ],
 
     # Contents
-    packages=find_packages(exclude=['test*']),
+    packages=find_packages(exclude=['test*', 'benchmarks*']),
     test_suite="tests",
     package_data={
         'earthchem': ['resources/*']
     },
 
     # other stuff
-    cmdclass=versioneer.get_cmdclass(),
+    cmdclass=CMDCLASS,
 
     # Some entry points for running rosedb
     entry_points={
@@ -0,0 +1,160 @@
+""" file:   test_benchmarks.py
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Sanity checks for the benchmark harness
+"""
+
+from benchmarks import common, cold_start, download, transforms
+
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+class TestBenchmarkCommon(unittest.TestCase):
+
+    "Test shared benchmark utilities"
+
+    def test_percentiles(self):
+        "Percentiles should interpolate between ranks"
+        result = common.percentiles(list(range(101)), points=(0, 50, 90))
+        self.assertEqual(result, {'p0': 0, 'p50': 50, 'p90': 90})
+        self.assertEqual(common.percentiles([]),
+                         {'p50': None, 'p90': None, 'p99': None})
+
+    def test_compare(self):
+        "Regressions should be flagged in the right direction"
+        baseline = {'a': {'time': 1.0, 'rate': 100.}}
+        metrics = {'time': 'lower', 'rate': 'higher'}
+        self.assertEqual(
+            common.compare({'a': {'time': 1.1, 'rate': 95.}}, baseline,
+                           metrics), [])
+        self.assertEqual(
+            common.compare({'a': {'time': 1.5, 'rate': 50.}}, baseline,
+                           metrics),
+            [('a', 'rate', 100., 50.), ('a', 'time', 1.0, 1.5)])
+        self.assertEqual(
+            common.compare({'a': {'time': 1.5}}, baseline, metrics,
+                           floors={'time': 1}), [])
+
+    def test_roundtrip(self):
+        "Results should round-trip through JSON"
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'results', 'bench.json')
+            common.write_results({'a': {'time': 1.0}}, path)
+            self.assertEqual(common.read_results(path), {'a': {'time': 1.0}})
+            with open(path, 'r') as src:
+                self.assertIn('machine', json.load(src))
+
+class TestColdStart(unittest.TestCase):
+
+    "Test the cold start benchmarks"
+
+    def test_parse_import_tree(self):
+        "Only imports between the markers should be recorded"
+        stderr = '\n'.join([
+            'import time: self [us] | cumulative | imported package',
+            'import time:        10 |         10 | before',
+            cold_start.MARKER,
+            'import time:        20 |         20 |   child',
+            'import time:        30 |         50 | parent',
+            cold_start.MARKER,
+            'import time:        40 |         40 | after'
+        ])
+        tree = cold_start.parse_import_tree(stderr)
+        self.assertEqual([imp['module'] for imp in tree], ['child', 'parent'])
+        self.assertEqual([imp['depth'] for imp in tree], [1, 0])
+        self.assertAlmostEqual(tree[1]['cumulative'], 50e-6)
+
+    def test_scenario(self):
+        "Scenarios should run in a fresh interpreter without the network"
+        wall, process, tree = cold_start.run_scenario(
+            'from earthchem import Query', "Query(author='barnes')")
+        self.assertGreaterEqual(process, wall)
+
+class TestDownload(unittest.TestCase):
+
+    "Test the download throughput benchmarks"
+
+    def test_case(self):
+        "A small download case should fetch every row"
+        result = download.run_case(120, 0)
+        self.assertEqual(result['rows'], 120)
+        self.assertEqual(result['requests'], 2 + 3)  # 2 counts, 3 pages
+        self.assertGreater(result['rows_per_second'], 0)
+        self.assertGreater(result['peak_rss'], 0)
+        self.assertEqual(download.case_name(1000, 0.01),
+                         'rows=1000,latency=10ms')
+
+class TestTransformBenchmarks(unittest.TestCase):
+
+    "Test the transform benchmarks"
+
+    def test_measure(self):
+        "Measure should see numpy allocations"
+        elapsed, peak, result = common.measure(np.ones, 2 ** 20, repeat=1)
+        self.assertGreater(elapsed, 0)
+        self.assertGreaterEqual(peak, result.nbytes)
+
+    def test_clr(self):
+        "CLR benchmarks should run and be accurate"
+        results = transforms.benchmark_clr(200, 50, repeat=1)
+        self.assertEqual(sorted(results), ['clr[200x50]', 'clr_legacy[200x50]',
+                                           'clr_out[200x50]',
+                                           'clr_pandas[200x50]'])
+        self.assertLess(results['clr[200x50]']['max_error'], 1e-10)
+
+    def test_alr_pandas(self):
+        "Pandas ALR benchmarks should run and be accurate"
+        results = transforms.benchmark_alr_pandas(200, 10, repeat=1)
+        for key in ('alr_pandas[200x10]', 'alr_pandas_inverse[200x10]'):
+            self.assertLess(results[key]['max_error'], 1e-10)
+
+    def test_fused(self):
+        "Fused benchmarks should run and be accurate"
+        results = transforms.benchmark_fused(200, 10, repeat=1)
+        for key in ('closed_clr_direct[200x10]', 'closed_ilr_direct[200x10]'):
+            self.assertLess(results[key]['max_error'], 1e-10)
+
+    def test_fused_memory(self):
+        "Direct closed transforms should only allocate their output"
+        results = transforms.benchmark_fused(100000, 10, repeat=1)
+        for name, n_cols in (('closed_clr_direct', 10),
+                             ('closed_ilr_direct', 9)):
+            with self.subTest(case=name):
+                output_bytes = 100000 * n_cols * 8
+                self.assertLess(results[name + '[100000x10]']['peak_memory'],
+                                1.2 * output_bytes)
+
+    def test_stats(self):
+        "Variation matrix benchmarks should run and be accurate"
+        results = transforms.benchmark_stats(200, 5, repeat=1)
+        for key in ('variation[200x5]', 'variation_legacy[200x5]',
+                    'variation_sparse[200x5]'):
+            self.assertLess(results[key]['max_error'], 1e-8)
+
+    def test_pipeline(self):
+        "Pipeline benchmarks should round-trip every transform"
+        results = transforms.benchmark_pipeline(200, 3, repeat=1)
+        for name in ('closure', 'pd_closure', 'basis_matrix', 'clr', 'ilr',
+                     'alr', 'barycentric'):
+            self.assertLess(results[name + '_float64[200x3]']['max_error'],
+                            1e-10)
+        for name in ('clr', 'ilr', 'alr', 'barycentric'):
+            key = name + '_inverse_float64[200x3]'
+            self.assertLess(results[key]['max_error'], 1e-10)
+
+    def test_grid(self):
+        "The grid should skip cases which are too big"
+        results = transforms.benchmark_grid(
+            rows=(100, 10 ** 6), parts=(4,), dtypes=('float32',), repeat=1,
+            max_bytes=2 ** 20)
+        self.assertIn('ilr_inverse_float32[100x4]', results)
+        self.assertFalse(any('1000000' in key for key in results))
+        self.assertNotIn('barycentric_float32[100x4]', results)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,20 @@
-from earthchem import Query
+from earthchem.testing import LocalEarthChemServer
 
 import unittest
+from pandas.api.types import is_string_dtype
 
 class TestRESTClientData(unittest.TestCase):
 
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalEarthChemServer(n_rows=200).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
     def setUp(self):
-        self.query = Query(author='barnes')
+        self.query = self.server.query(author='barnes')
         self.count = self.query.count()
         self.df = self.query.dataframe(max_rows=49) # <50 for test speed
 
@@ -24,9 +33,14 @@ class TestRESTClientData(unittest.TestCase):
         for dtype, keys in expected.items():
             for key in keys:
                 try:
-                    self.assertEqual(str(self.df[key].dtype), dtype)
+                    column = self.df[key]
                 except KeyError:
-                    pass
+                    continue
+                if dtype == 'object':
+                    # pandas 3 gives strings their own dtype
+                    self.assertTrue(is_string_dtype(column), key)
+                else:
+                    self.assertEqual(str(column.dtype), dtype)
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,114 @@
+""" file:   test_distance.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for Aitchison distances and nearest neighbours
+"""
+
+import unittest
+import numpy as np
+
+from earthchem.transform.distance import aitchison_distance, \
+    pairwise_distances_chunked, AitchisonNeighbours
+from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.utilities import closure
+
+def brute_force_distances(X, Y):
+    "Aitchison distances straight from the CLR definition"
+    clr = CenteredLogTransform()
+    A, B = clr.transform(X), clr.transform(Y)
+    return np.sqrt(((A[:, np.newaxis, :] - B[np.newaxis]) ** 2).sum(axis=2))
+
+class TestAitchisonDistance(unittest.TestCase):
+
+    "Tests for pairwise Aitchison distances"
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.X = closure(rng.uniform(0.01, 1, size=(300, 6)))
+        self.Y = closure(rng.uniform(0.01, 1, size=(50, 6)))
+
+    def test_distances(self):
+        "Distances should match the CLR definition"
+        self.assertTrue(np.allclose(aitchison_distance(self.X, self.Y),
+                                    brute_force_distances(self.X, self.Y)))
+        distances = aitchison_distance(self.X)
+        self.assertTrue(np.allclose(distances, distances.T))
+        self.assertTrue(np.allclose(np.diag(distances), 0, atol=1e-6))
+
+    def test_scale_invariant(self):
+        "Closing the data shouldn't change the distances"
+        self.assertTrue(np.allclose(aitchison_distance(100 * self.X, self.Y),
+                                    aitchison_distance(self.X, self.Y)))
+
+    def test_chunks(self):
+        "Chunks should cover the matrix without changing the answer"
+        expected = aitchison_distance(self.X, self.Y)
+        covered = 0
+        for rows, distances in pairwise_distances_chunked(
+                self.X, self.Y, chunk_rows=7):
+            self.assertLessEqual(distances.shape[0], 7)
+            self.assertTrue(np.allclose(distances, expected[rows]))
+            covered += distances.shape[0]
+        self.assertEqual(covered, len(self.X))
+
+    def test_out(self):
+        "We should be able to write into an existing array"
+        out = np.empty((len(self.X), len(self.Y)))
+        result = aitchison_distance(self.X, self.Y, out=out, chunk_rows=11)
+        self.assertIs(result, out)
+        self.assertTrue(np.allclose(out, brute_force_distances(self.X,
+                                                               self.Y)))
+
+    def test_zeros(self):
+        "Zeros don't have a distance"
+        X = self.X.copy()
+        X[3, 2] = 0
+        with self.assertRaises(ValueError):
+            aitchison_distance(X)
+
+class TestAitchisonNeighbours(unittest.TestCase):
+
+    "Tests for nearest-neighbour search"
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.X = closure(rng.uniform(0.01, 1, size=(2000, 4)))
+        self.Y = closure(rng.uniform(0.01, 1, size=(100, 4)))
+        distances = brute_force_distances(self.Y, self.X)
+        self.expected_index = np.argsort(distances, axis=1)[:, :5]
+        self.expected = np.sort(distances, axis=1)[:, :5]
+
+    def test_algorithms(self):
+        "Tree and brute-force searches should find the same neighbours"
+        for algorithm in ('kd_tree', 'brute', 'auto'):
+            with self.subTest(algorithm=algorithm):
+                neighbours = AitchisonNeighbours(algorithm=algorithm)
+                distance, index = neighbours.fit(self.X).kneighbors(self.Y)
+                self.assertTrue(np.array_equal(index, self.expected_index))
+                self.assertTrue(np.allclose(distance, self.expected))
+
+    def test_self_neighbours(self):
+        "Points shouldn't be their own neighbours"
+        neighbours = AitchisonNeighbours(n_neighbors=3).fit(self.X)
+        index = neighbours.kneighbors(return_distance=False)
+        self.assertEqual(index.shape, (len(self.X), 3))
+        self.assertFalse((index == np.arange(len(self.X))[:, None]).any())
+
+    def test_many_parts(self):
+        "Brute-force search in lots of dimensions should be exact"
+        rng = np.random.RandomState(7)
+        X = closure(rng.uniform(0.01, 1, size=(500, 40)))
+        neighbours = AitchisonNeighbours(n_neighbors=2, chunk_rows=13)
+        distance, index = neighbours.fit(X).kneighbors(X[:20])
+        self.assertTrue(np.array_equal(index[:, 0], np.arange(20)))
+        self.assertTrue(np.allclose(distance[:, 0], 0))
+
+    def test_not_fitted(self):
+        "We need reference compositions first"
+        with self.assertRaises(ValueError):
+            AitchisonNeighbours().kneighbors(self.Y)
+
+if __name__ == '__main__':
+    unittest.main()
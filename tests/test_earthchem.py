@@ -1,4 +1,5 @@
 from earthchem import Query
+from earthchem.testing import LocalEarthChemServer
 
 import unittest
 
@@ -6,6 +7,17 @@ class TestRESTClientQuery(unittest.TestCase):
 
     "Tests for RESTClient"
 
+    @classmethod
+    def setUpClass(cls):
+        # Unknown authors don't have any data
+        cls.server = LocalEarthChemServer(
+            n_rows=lambda params: 0 if params.get('author') == 'aqwefgaskl'
+                                  else 200).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
     def setUp(self):
         self.query = Query()
 
@@ -21,12 +33,14 @@ class TestRESTClientQuery(unittest.TestCase):
 
     def test_author_count(self):
         "Check that we handle author counts when things are 0"
+        self.query = self.server.query()
         self.query['author'] = 'aqwefgaskl'
         self.assertEqual(self.query.count(), 0)
         self.assertEqual(self.query.dataframe(), None)
 
     def test_author_count_with_data(self):
         "Check things work with an author count that returns data"
+        self.query = self.server.query()
         self.query['author'] = 'barnes'
         self.assertTrue(self.query.count() > 5)
         self.assertTrue(self.query.dataframe(max_rows=10) is not None)
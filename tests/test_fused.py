@@ -0,0 +1,85 @@
+""" file:   test_fused.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for the closed log-ratio transforms
+"""
+
+import unittest
+import numpy as np
+
+from earthchem.transform.fused import ClosedCenteredLogTransform, \
+    ClosedIsometricLogTransform
+from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.isometric import IsometricLogTransform
+from earthchem.transform.utilities import closure
+
+class TestFusedTransforms(unittest.TestCase):
+
+    "Tests for closed log-ratio transforms"
+
+    def setUp(self):
+        # Deliberately not closed
+        rng = np.random.RandomState(42)
+        self.X = 10 ** rng.uniform(-2, 3, size=(1000, 7))
+        self.pairs = (
+            (ClosedCenteredLogTransform(), CenteredLogTransform()),
+            (ClosedIsometricLogTransform(), IsometricLogTransform())
+        )
+
+    def test_matches_chained(self):
+        "Fused transforms should match closure followed by the transform"
+        for fused, plain in self.pairs:
+            with self.subTest(transform=fused):
+                L = fused.transform(self.X)
+                self.assertTrue(np.allclose(
+                    L, plain.transform(closure(self.X))))
+                self.assertTrue(np.allclose(fused.inverse_transform(L),
+                                            closure(self.X)))
+
+    def test_total(self):
+        "Inverse transforms should close to the total"
+        for fused, _ in self.pairs:
+            with self.subTest(transform=fused):
+                fused.set_params(total=100)
+                inv = fused.inverse_transform(fused.transform(self.X))
+                self.assertTrue(np.allclose(inv, closure(self.X, total=100)))
+
+    def test_subclasses(self):
+        "Closed transforms should just be the plain ones with a total"
+        for fused, plain in self.pairs:
+            with self.subTest(transform=fused):
+                self.assertIsInstance(fused, type(plain))
+                self.assertTrue(np.allclose(fused.transform(self.X),
+                                            plain.transform(self.X)))
+
+    def test_chunks(self):
+        "Chunked inverses should close to the total too"
+        for fused, _ in self.pairs:
+            with self.subTest(transform=fused):
+                fused.set_params(total=100)
+                L = fused.transform_chunked(self.X, chunk_rows=33)
+                inv = fused.inverse_transform_chunked(L, chunk_rows=33)
+                self.assertTrue(np.allclose(inv, closure(self.X, total=100)))
+
+    def test_float32(self):
+        "Fused transforms should keep float32"
+        X = self.X.astype(np.float32)
+        for fused, _ in self.pairs:
+            with self.subTest(transform=fused):
+                L = fused.transform(X)
+                self.assertEqual(L.dtype, np.float32)
+                self.assertEqual(fused.inverse_transform(L).dtype, np.float32)
+
+    def test_parallel(self):
+        "Splitting over threads shouldn't change the answer"
+        X = np.tile(self.X, (100, 1))
+        for fused, _ in self.pairs:
+            with self.subTest(transform=fused):
+                expected = fused.transform(X)
+                fused.set_params(n_jobs=4)
+                self.assertTrue(np.allclose(fused.transform(X), expected))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,7 +3,13 @@ import pandas as pd
 import numpy as np
 import periodictable as pt
 from earthchem.geochem import to_weight, to_molecular, common_elements, \
-                              REE
+                              REE, formula_mass, molecular_weights, \
+                              element_order, order_components, \
+                              to_element, to_oxide, recalculate_iron, \
+                              total_iron, conversion_matrix, normalize, \
+                              reference_compositions, lambdas, \
+                              lambda_design_matrix, IONIC_RADII, \
+                              renormalise
 
 
 class TestWeightMolarReversal(unittest.TestCase):
@@ -38,6 +44,243 @@ class TestWeightMolarReversal(unittest.TestCase):
                                 self.df.loc[:, self.components].values)
         self.assertTrue(np.isnan(M_W.values[~M_W_close]).all())
 
+    def test_weightmolar_reversal_renormTrue(self):
+        """
+        Renormalised conversions should sum to 100 and reverse to the
+        renormalised original.
+        """
+        df = self.df.loc[:, self.components]
+        M = to_molecular(df)
+        self.assertTrue(np.allclose(M.sum(axis=1), 100))
+        self.assertTrue(np.allclose(to_weight(M).values,
+                                    100 * df.values / df.values.sum()))
+
+
+class TestMolecularWeights(unittest.TestCase):
+    """Tests the cached molecular weight lookups."""
+
+    def test_masses(self):
+        """Cached masses should match periodictable."""
+        for component in ['SiO2', 'Fe2O3', 'MgO', 'Fe', 'La', 'H2O']:
+            with self.subTest(component=component):
+                self.assertEqual(formula_mass(component),
+                                 pt.formula(component).mass)
+
+    def test_cached(self):
+        """Repeat lookups of a column set should return the same array."""
+        columns = pd.Index(['MgO', 'SiO2', 'K2O'])
+        MWs = molecular_weights(columns)
+        self.assertIs(MWs, molecular_weights(list(columns)))
+        self.assertFalse(MWs.flags.writeable)
+
+    def test_lowercase(self):
+        """EarthChem's lowercase columns should get the right masses."""
+        for column, formula in [('sio2', 'SiO2'), ('feot', 'FeO'),
+                                ('fe2o3t', 'Fe2O3'), ('la', 'La'),
+                                ('h2o', 'H2O'), ('h2o_plus', 'H2O'),
+                                ('co2', 'CO2'), ('co', 'Co')]:
+            with self.subTest(column=column):
+                self.assertEqual(formula_mass(column),
+                                 pt.formula(formula).mass)
+
+        df = pd.DataFrame({'sio2': [50., 60.], 'mgo': [10., 5.]})
+        expected = to_molecular(df.rename(columns={'sio2': 'SiO2',
+                                                   'mgo': 'MgO'}))
+        M = to_molecular(df)
+        self.assertTrue(np.allclose(M.values, expected.values))
+        self.assertTrue(np.allclose(to_weight(M).values,
+                                    renormalise(df).values))
+
+
+class TestOxideConversion(unittest.TestCase):
+    """Tests the oxide <-> element conversions."""
+
+    def setUp(self):
+        self.df = pd.DataFrame({'sio2': [50., 60.], 'al2o3': [15., np.nan],
+                                'feot': [10., 8.], 'k2o': [1., 2.]})
+
+    def test_to_element(self):
+        """Check conversions against the column-by-column calculation."""
+        elements = to_element(self.df)
+        self.assertEqual(list(elements.columns), ['si', 'al', 'fe', 'k'])
+        for column, oxide, element, n in [('sio2', 'SiO2', 'Si', 1),
+                                          ('al2o3', 'Al2O3', 'Al', 2),
+                                          ('feot', 'FeO', 'Fe', 1),
+                                          ('k2o', 'K2O', 'K', 2)]:
+            with self.subTest(oxide=oxide):
+                factor = 1e4 * n * pt.formula(element).mass \
+                    / pt.formula(oxide).mass
+                self.assertTrue(np.allclose(
+                    elements[element.lower()], self.df[column] * factor,
+                    equal_nan=True))
+
+    def test_missing(self):
+        """Missing oxides should only affect their own elements."""
+        elements = to_element(self.df)
+        self.assertTrue(np.isnan(elements.loc[1, 'al']))
+        self.assertFalse(elements.drop(columns='al').isnull().any().any())
+
+    def test_reversal(self):
+        """Converting to elements and back should be exact."""
+        self.assertTrue(np.allclose(to_oxide(to_element(self.df)).values,
+                                    self.df.values, equal_nan=True))
+
+    def test_shared_element(self):
+        """Oxides of the same element should add up."""
+        df = pd.DataFrame({'feo': [8.], 'fe2o3': [2.]})
+        fe = to_element(df)['fe']
+        expected = to_element(pd.DataFrame({'feot': total_iron(df)}))['fe']
+        self.assertTrue(np.allclose(fe, expected))
+        self.assertIs(conversion_matrix(('feo', 'fe2o3'))[1],
+                      conversion_matrix(('feo', 'fe2o3'))[1])
+
+    def test_recalculated_iron(self):
+        """Iron shouldn't be counted once per iron column."""
+        expected = to_element(self.df)['fe']
+        result = to_element(recalculate_iron(self.df, fe3_fraction=0.2))
+        self.assertTrue(np.allclose(result['fe'], expected))
+        self.assertEqual(list(result.columns), ['si', 'al', 'fe', 'k'])
+
+    def test_iron_per_row(self):
+        """Each row should use whichever iron columns it has."""
+        df = pd.DataFrame({'feot': [10., np.nan, np.nan],
+                           'fe2o3t': [np.nan, 10., np.nan],
+                           'feo': [np.nan, np.nan, 5.],
+                           'fe2o3': [np.nan, np.nan, 1.]})
+        expected = [to_element(pd.DataFrame({ox: [value]}))['fe'][0]
+                    for ox, value in (('feot', 10.), ('fe2o3t', 10.))]
+        expected.append(to_element(df.iloc[[2]], oxides=['feo', 'fe2o3'])
+                        ['fe'].iloc[0])
+        self.assertTrue(np.allclose(to_element(df)['fe'], expected))
+
+    def test_several_iron_sets(self):
+        """Check we complain about explicit lists with two iron sets."""
+        with self.assertRaises(ValueError):
+            to_element(recalculate_iron(self.df), oxides=['feot', 'feo'])
+
+    def test_not_an_oxide(self):
+        """Check we complain about things that aren't simple oxides."""
+        with self.assertRaises(ValueError):
+            to_element(self.df, oxides=['CaCO3'])
+
+    def test_recalculate_iron(self):
+        """Speciation should keep the total iron and the Fe3+ ratio."""
+        result = recalculate_iron(self.df, fe3_fraction=[0.2, 0.5])
+        self.assertTrue(np.allclose(total_iron(result.drop(
+            columns=['feot', 'fe2o3t'])), self.df['feot']))
+        fe3 = 2 * result['fe2o3'] / pt.formula('Fe2O3').mass
+        fe2 = result['feo'] / pt.formula('FeO').mass
+        self.assertTrue(np.allclose(fe3 / (fe2 + fe3), [0.2, 0.5]))
+        self.assertTrue(np.allclose(to_element(result[['fe2o3t']]),
+                                    to_element(result[['feot']])))
+
+
+class TestNormalize(unittest.TestCase):
+    """Tests normalisation to reference compositions."""
+
+    def setUp(self):
+        self.reference = reference_compositions()
+        self.df = pd.DataFrame({'sio2': [50., 60.], 'yb': [2., 3.],
+                                'la': [10., 20.], 'Ce': [20., np.nan]})
+
+    def test_normalize(self):
+        """Check values are divided by the reference."""
+        for reference in ['chondrite', 'primitive_mantle']:
+            with self.subTest(reference=reference):
+                result = normalize(self.df, reference=reference)
+                expected = self.df['la'] / self.reference.loc['la',
+                                                              reference]
+                self.assertTrue(np.allclose(result['la'], expected))
+                self.assertTrue(np.isnan(result.loc[1, 'Ce']))
+
+    def test_ordering(self):
+        """Default components should be in REE order, skipping majors."""
+        self.assertEqual(list(normalize(self.df).columns),
+                         ['la', 'Ce', 'yb'])
+        result = normalize(self.df, components=['Yb', 'La', 'Pm', 'Lu'])
+        self.assertEqual(list(result.columns), ['yb', 'la'])
+
+    def test_odd_labels(self):
+        """Labels which aren't strings or are empty should be skipped."""
+        df = pd.DataFrame([[1., 2., 3.]], columns=[0, '', 'la'])
+        result = normalize(df)
+        self.assertEqual(list(result.columns), ['la'])
+        self.assertTrue(normalize(pd.DataFrame(np.ones((2, 3)))).empty)
+
+    def test_unknown_reference(self):
+        """Check we complain about references we don't have."""
+        with self.assertRaises(KeyError):
+            normalize(self.df, reference='moon')
+
+    def test_reference_table(self):
+        """Check the bundled table covers the REE."""
+        ree = [el.lower() for el in REE(output='string') if el != 'Pm']
+        self.assertFalse(self.reference.loc[ree].isnull().any().any())
+
+
+class TestLambdas(unittest.TestCase):
+    """Tests batched REE pattern fitting."""
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.elements = tuple(el for el in REE(output='string')
+                              if el not in ('Ce', 'Eu', 'Pm'))
+        self.radii = np.array([IONIC_RADII[el] for el in self.elements])
+        logs = rng.normal(size=(200, 1)) \
+            + rng.normal(size=(200, 1)) * 10 * (self.radii - 1.05) \
+            + rng.normal(scale=0.1, size=(200, len(self.elements)))
+        reference = reference_compositions().loc[
+            [el.lower() for el in self.elements], 'chondrite'].values
+        self.df = pd.DataFrame(np.exp(logs) * reference,
+                               columns=[el.lower() for el in self.elements])
+        self.df.iloc[::3, 2] = np.nan
+        self.df.iloc[::5, 7] = 0
+
+    def test_design_matrix(self):
+        """Design matrix columns should be orthogonal and cached."""
+        design = lambda_design_matrix(self.elements, 4)
+        gram = design.T @ design
+        self.assertTrue(np.allclose(gram, np.diag(np.diag(gram))))
+        self.assertTrue(np.allclose(design[:, 0], 1))
+        self.assertIs(design, lambda_design_matrix(self.elements, 4))
+
+    def test_against_polyfit(self):
+        """Fitted patterns should match a per-row polyfit."""
+        result = lambdas(self.df)
+        design = lambda_design_matrix(self.elements, 4)
+        normalized = normalize(self.df, components=self.elements).values
+        for idx in range(20):
+            with self.subTest(row=idx):
+                with np.errstate(divide='ignore'):
+                    row = np.log(normalized[idx])
+                ok = np.isfinite(row)
+                coefs = np.polyfit(self.radii[ok], row[ok], 4)
+                self.assertTrue(np.allclose(
+                    design @ result.values[idx],
+                    np.polyval(coefs, self.radii), atol=1e-6))
+
+    def test_normalized(self):
+        """Already normalised data should give the same lambdas."""
+        normalized = normalize(self.df, components=self.elements)
+        self.assertTrue(np.allclose(lambdas(normalized, normalized=True),
+                                    lambdas(self.df)))
+
+    def test_flat_pattern(self):
+        """A flat pattern should only have lambda0."""
+        df = pd.DataFrame([10 * reference_compositions().loc[
+            [el.lower() for el in self.elements], 'chondrite'].values],
+            columns=self.elements)
+        result = lambdas(df, degree=2).values[0]
+        self.assertTrue(np.allclose(result, [np.log(10), 0, 0]))
+
+    def test_too_few(self):
+        """Rows without enough REE should be NaN."""
+        df = self.df.copy()
+        df.iloc[0, 3:] = np.nan
+        result = lambdas(df)
+        self.assertTrue(result.iloc[0].isnull().all())
+        self.assertFalse(result.iloc[1:].isnull().any().any())
+
 
 class TestCommonElements(unittest.TestCase):
     """Tests the common element generator."""
@@ -67,6 +310,34 @@ class TestCommonElements(unittest.TestCase):
             with self.subTest(el=el):
                 self.assertIs(type(el), str)
 
+    def test_cached(self):
+        """Repeat calls should return the same immutable objects."""
+        self.assertIs(common_elements(), common_elements())
+        self.assertIsInstance(common_elements(output='string'), tuple)
+        elements = common_elements(output='string', as_set=True)
+        self.assertIsInstance(elements, frozenset)
+        self.assertIn('Fe', elements)
+        self.assertNotIn('n', elements)
+
+    def test_order_components(self):
+        """Element columns should be picked out in periodic order."""
+        columns = ['Zr', 'SiO2', 'La', 'Mg', 'unmeasured', 'Ce']
+        self.assertEqual(order_components(columns),
+                         ('Mg', 'Zr', 'La', 'Ce'))
+        self.assertEqual(element_order()['H'], 0)
+
+    def test_order_lowercase(self):
+        """EarthChem's lowercase columns should be matched too."""
+        columns = ['sio2', 'zr', 'la', 'k', 'mgo', 'ce', 'Ba']
+        self.assertEqual(order_components(columns),
+                         ('k', 'zr', 'Ba', 'la', 'ce'))
+
+    def test_order_odd_labels(self):
+        """Labels which aren't strings or are empty should be skipped."""
+        self.assertEqual(order_components([0, 1, 2]), ())
+        self.assertEqual(order_components(['', 'la', 3, None, 'Ce']),
+                         ('la', 'Ce'))
+
 
 class TestREE(unittest.TestCase):
     """Tests the Rare Earth Element generator."""
@@ -101,3 +372,9 @@ class TestREE(unittest.TestCase):
         for el in REE(output='string'):
             with self.subTest(el=el):
                 self.assertIs(type(el), str)
+
+    def test_set_output(self):
+        """Check the function produces frozensets for membership tests."""
+        self.assertEqual(REE(output='string', as_set=True),
+                         frozenset(REE(output='string')))
+        self.assertIn(pt.La, REE(as_set=True))
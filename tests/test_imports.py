@@ -0,0 +1,78 @@
+""" file:   test_imports.py
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Check that importing earthchem stays cheap
+"""
+
+import subprocess
+import sys
+import unittest
+
+# Things we shouldn't pull in just by importing the package
+HEAVY_MODULES = (
+    'matplotlib', 'ternary', 'sklearn', 'scipy', 'lxml', 'bs4',
+    'periodictable', 'pandas'
+)
+
+# Generous upper bound on import time (seconds) so slow CI boxes don't flake
+MAX_IMPORT_TIME = 2.0
+
+def run_python(code):
+    "Run some code in a fresh interpreter and return its stdout"
+    return subprocess.check_output([sys.executable, '-c', code],
+                                   universal_newlines=True)
+
+class TestLazyImports(unittest.TestCase):
+
+    "Check that heavy dependencies are only imported when they're used"
+
+    def test_import_is_lazy(self):
+        "import earthchem shouldn't import any heavy dependencies"
+        output = run_python(
+            'import sys, earthchem\n'
+            'print(" ".join(sorted(m for m in sys.modules '
+            'if m.split(".")[0] in {0!r})))'.format(HEAVY_MODULES))
+        self.assertEqual(output.strip(), '')
+
+    def test_transform_is_lazy(self):
+        "Transform utilities shouldn't need scikit-learn"
+        output = run_python(
+            'import sys\n'
+            'from earthchem.transform.utilities import closure\n'
+            'print("sklearn" in sys.modules)')
+        self.assertEqual(output.strip(), 'False')
+
+    def test_query_offline(self):
+        "Importing Query shouldn't make any requests"
+        output = run_python(
+            'import requests\n'
+            'def fail(*args, **kwargs):\n'
+            '    raise AssertionError("requested " + str(args))\n'
+            'requests.get = requests.post = fail\n'
+            'from earthchem import Query\n'
+            'print(len(Query.docdict) > 0)')
+        self.assertEqual(output.strip(), 'True')
+
+    def test_attributes_load(self):
+        "Lazy attributes should resolve to the real modules"
+        import earthchem
+        from earthchem import query
+        self.assertIs(earthchem.query, query)
+        self.assertIs(earthchem.Query, query.Query)
+        self.assertIn('transform', dir(earthchem))
+        with self.assertRaises(AttributeError):
+            earthchem.not_a_module
+
+    def test_import_time(self):
+        "Benchmark the time to import earthchem in a fresh interpreter"
+        output = run_python(
+            'import time\n'
+            'start = time.perf_counter()\n'
+            'import earthchem\n'
+            'print(time.perf_counter() - start)')
+        elapsed = float(output.strip())
+        self.assertLess(elapsed, MAX_IMPORT_TIME)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,4 +1,4 @@
-from earthchem import Query
+from earthchem.testing import LocalEarthChemServer
 
 from matplotlib import pyplot as plt
 
@@ -7,8 +7,16 @@ import unittest
 class IntegrationTestRESTClientQuery(unittest.TestCase):
     "Some integration tests to check that things are working"
 
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalEarthChemServer(n_rows=200).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
     def setUp(self):
-        self.query = Query(author='barnes')
+        self.query = self.server.query(author='barnes')
         # <50 for test speed, pagination is checked elsewhere
         self.df = self.query.dataframe(max_rows=49)
 
@@ -0,0 +1,204 @@
+""" file:   test_masked.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for the missing-value aware transforms
+"""
+
+import unittest
+import numpy as np
+
+from earthchem.transform.masked import MaskedCenteredLogTransform, \
+    MaskedIsometricLogTransform, MaskedAdditiveLogTransform
+from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.isometric import IsometricLogTransform
+from earthchem.transform.additive import AdditiveLogTransform
+from earthchem.transform.utilities import closure, missingness_groups
+
+def inverse(transform, L, X, **kwargs):
+    "Invert L, passing the observed parts of X if the transform needs them"
+    if isinstance(transform, MaskedIsometricLogTransform):
+        kwargs['observed'] = ~np.isnan(X)
+    return transform.inverse_transform(L, **kwargs)
+
+def sparse_compositions(npts, ndim, missing=0.4, seed=42):
+    "Make some compositions with parts randomly missing"
+    rng = np.random.RandomState(seed)
+    X = closure(rng.uniform(0.1, 1, size=(npts, ndim)))
+    X[rng.uniform(size=X.shape) < missing] = np.nan
+    return X
+
+class TestMissingnessGroups(unittest.TestCase):
+
+    "Tests for grouping rows by missingness pattern"
+
+    def test_groups(self):
+        "Every row should end up in the group with its pattern"
+        observed = np.random.uniform(size=(500, 20)) < 0.8
+        groups = missingness_groups(observed)
+        rows = np.concatenate([rows for _, rows in groups])
+        self.assertEqual(sorted(rows), list(range(500)))
+        for pattern, rows in groups:
+            self.assertTrue((observed[rows] == pattern).all())
+        patterns = set(tuple(p) for p, _ in groups)
+        self.assertEqual(len(patterns), len(groups))
+
+    def test_empty(self):
+        "No rows means no groups"
+        self.assertEqual(missingness_groups(np.zeros((0, 3), dtype=bool)), [])
+
+class TestMaskedTransforms(unittest.TestCase):
+
+    "Tests for masked transforms"
+
+    def setUp(self):
+        self.X = sparse_compositions(1000, 10)
+        self.observed = ~np.isnan(self.X)
+
+    def check_complete(self, masked, plain):
+        "With no missing data the masked transform should match the plain one"
+        X = closure(np.random.uniform(0.1, 1, size=(100, 6)))
+        L = masked.transform(X)
+        self.assertTrue(np.allclose(L, plain.transform(X)))
+        self.assertTrue(np.allclose(inverse(masked, L, X), X))
+
+    def check_rows(self, masked, plain):
+        "Each row should match the plain transform of its subcomposition"
+        L = masked.transform(self.X)
+        for row, values in zip(L, self.X):
+            observed = ~np.isnan(values)
+            if observed.sum() < 3:
+                continue
+            expected = plain.transform(values[observed][np.newaxis, :])[0]
+            self.assertTrue(np.allclose(row[~np.isnan(row)], expected))
+        return L
+
+    def test_clr(self):
+        "Masked CLR should work on observed subcompositions"
+        t = MaskedCenteredLogTransform()
+        self.check_complete(t, CenteredLogTransform())
+        L = self.check_rows(t, CenteredLogTransform())
+        self.assertTrue((np.isnan(L) == ~self.observed).all())
+
+        # Round trip should give the closed observed parts
+        expected = self.X / np.nansum(self.X, axis=1, keepdims=True)
+        self.assertTrue(np.allclose(t.inverse_transform(L), expected,
+                                    equal_nan=True))
+
+    def test_ilr(self):
+        "Masked ILR should work on observed subcompositions"
+        t = MaskedIsometricLogTransform()
+        self.check_complete(t, IsometricLogTransform())
+        L = self.check_rows(t, IsometricLogTransform())
+        self.assertEqual(L.shape, (1000, 9))
+
+        # Round trip should give the closed observed parts
+        inv = t.inverse_transform(L, observed=self.observed)
+        expected = self.X / np.nansum(self.X, axis=1, keepdims=True)
+        expected[self.observed.sum(axis=1) < 2] = np.nan
+        inv[self.observed.sum(axis=1) < 2] = np.nan
+        self.assertTrue(np.allclose(inv, expected, equal_nan=True))
+
+    def test_ilr_needs_observed(self):
+        "Masked ILR inverse needs to know the missingness pattern"
+        t = MaskedIsometricLogTransform()
+        self.assertRaises(ValueError, t.inverse_transform, np.zeros((3, 2)))
+        X = t.inverse_transform(np.zeros((3, 2)),
+                                observed=np.ones((3, 3), dtype=bool))
+        self.assertTrue(np.allclose(X, 1 / 3))
+
+    def test_ilr_stateless(self):
+        "Masked ILR transform shouldn't remember anything between calls"
+        t = MaskedIsometricLogTransform()
+        A, B = self.X[:100], self.X[100:200]
+        L = t.transform(A)
+        expected = t.inverse_transform(L, observed=~np.isnan(A))
+        t.transform(B)
+        self.assertEqual(t.get_params(), MaskedIsometricLogTransform()
+                         .get_params())
+        self.assertFalse(hasattr(t, 'observed_'))
+        self.assertTrue(np.allclose(
+            t.inverse_transform(L, observed=~np.isnan(A)), expected,
+            equal_nan=True))
+
+        # Using the wrong pattern should complain rather than scramble parts
+        self.assertRaises(ValueError, t.inverse_transform, L,
+                          observed=~np.isnan(B))
+        self.assertRaises(ValueError, t.inverse_transform_chunked, L,
+                          chunk_rows=33, observed=~np.isnan(B))
+
+    def test_ilr_out(self):
+        "Masked ILR inverse should take out as its second argument"
+        t = MaskedIsometricLogTransform()
+        L = t.transform(self.X)
+        out = np.empty_like(self.X)
+        result = t.inverse_transform(L, out, observed=self.observed)
+        self.assertIs(result, out)
+
+    def test_alr(self):
+        "Masked ALR should only lose missing parts"
+        for index in (0, 1, 5, -1):
+            t = MaskedAdditiveLogTransform(index)
+            self.check_complete(t, AdditiveLogTransform(index))
+            L = t.transform(self.X)
+            base_missing = np.isnan(self.X[:, index])
+            self.assertTrue(np.isnan(L[base_missing]).all())
+
+            # Round trip for rows with a base part and at least one ratio
+            inv = t.inverse_transform(L)
+            keep = ~base_missing & (self.observed.sum(axis=1) > 1)
+            expected = self.X[keep] / np.nansum(self.X[keep], axis=1,
+                                                keepdims=True)
+            self.assertTrue(np.allclose(inv[keep], expected, equal_nan=True))
+
+class TestMaskedChunked(unittest.TestCase):
+
+    "Tests for chunked masked transforms"
+
+    def test_chunked(self):
+        "Chunked masked transforms should match the in-memory ones"
+        X = sparse_compositions(1000, 10)
+        for transform in (MaskedCenteredLogTransform(),
+                          MaskedIsometricLogTransform(),
+                          MaskedAdditiveLogTransform(base_feature_index=0)):
+            with self.subTest(transform=transform):
+                expected = transform.transform(X)
+                inv_expected = inverse(transform, expected, X)
+                L = transform.transform_chunked(X, chunk_rows=33)
+                self.assertTrue(np.allclose(L, expected, equal_nan=True))
+                kwargs = {'chunk_rows': 33}
+                if isinstance(transform, MaskedIsometricLogTransform):
+                    kwargs['observed'] = ~np.isnan(X)
+                inv = transform.inverse_transform_chunked(L, **kwargs)
+                self.assertTrue(np.allclose(inv, inv_expected,
+                                            equal_nan=True))
+
+    def test_parallel(self):
+        "Parallel masked transforms should match the serial ones"
+        X = sparse_compositions(100000, 10)
+        for transform_class in (MaskedCenteredLogTransform,
+                                MaskedIsometricLogTransform,
+                                MaskedAdditiveLogTransform):
+            with self.subTest(transform=transform_class):
+                serial, parallel = transform_class(), transform_class(n_jobs=4)
+                L = parallel.transform(X)
+                self.assertTrue(np.allclose(L, serial.transform(X),
+                                            equal_nan=True))
+                self.assertTrue(np.allclose(
+                    inverse(parallel, L, X), inverse(serial, L, X),
+                    equal_nan=True))
+
+    def test_float32(self):
+        "Masked transforms should keep float32"
+        X = sparse_compositions(1000, 10).astype(np.float32)
+        for transform in (MaskedCenteredLogTransform(),
+                          MaskedIsometricLogTransform(),
+                          MaskedAdditiveLogTransform(base_feature_index=0)):
+            with self.subTest(transform=transform):
+                L = transform.transform(X)
+                self.assertEqual(L.dtype, np.float32)
+                self.assertEqual(inverse(transform, L, X).dtype, np.float32)
+
+if __name__ == '__main__':
+    unittest.main()
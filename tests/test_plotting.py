@@ -3,6 +3,7 @@ import unittest
 import pandas as pd
 import numpy as np
 import ternary
+from matplotlib import pyplot as plt
 
 from earthchem.plot import ternaryplot, spiderplot
 from earthchem.geochem import common_elements, REE
@@ -23,7 +24,26 @@ class TestSpiderplot(unittest.TestCase):
     def test_irrellevant_style_options(self):
         """Test stability under additional kwargs."""
         style = {'thingwhichisnotacolor': 'notacolor', 'irrelevant': 'red'}
-        self.assertWarns(UserWarning, spiderplot(self.df, **style))
+        with self.assertWarns(UserWarning):
+            spiderplot(self.df, **style)
+
+    def test_lowercase_columns(self):
+        """Test picking components from lowercase EarthChem columns."""
+        df = self.df.rename(columns=str.lower).assign(sio2=50.)
+        ax = plt.subplots(1)[1]
+        spiderplot(df, ax=ax)
+        labels = [label.get_text() for label in ax.get_xticklabels()]
+        self.assertEqual(labels, [el.lower() for el in
+                                  REE(output='string')])
+
+    def test_odd_labels(self):
+        """Test skipping column labels which aren't element names."""
+        df = self.df.copy()
+        df[0], df[''] = 1., 2.
+        ax = plt.subplots(1)[1]
+        spiderplot(df, ax=ax)
+        labels = [label.get_text() for label in ax.get_xticklabels()]
+        self.assertEqual(labels, list(REE(output='string')))
 
     @unittest.expectedFailure
     def test_invalid_style_options(self):
@@ -0,0 +1,171 @@
+""" file:   test_replacement.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for zero and below-detection replacement
+"""
+
+import unittest
+import numpy as np
+from sklearn.pipeline import make_pipeline
+
+from earthchem.transform.replacement import MultiplicativeReplacement, \
+    DetectionLimitReplacement, multiplicative_replacement
+from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.isometric import IsometricLogTransform
+from earthchem.transform.additive import AdditiveLogTransform
+from earthchem.transform.utilities import closure
+
+def compositions_with_zeros(npts, ndim, zeros=0.2, seed=42):
+    "Make some closed compositions with parts randomly zeroed out"
+    rng = np.random.RandomState(seed)
+    X = rng.uniform(0.1, 1, size=(npts, ndim))
+    X[rng.uniform(size=X.shape) < zeros] = 0
+    X[:, 0] += 1  # make sure every row has something in it
+    return closure(X)
+
+class TestMultiplicativeReplacement(unittest.TestCase):
+
+    "Tests for multiplicative zero replacement"
+
+    def setUp(self):
+        self.X = compositions_with_zeros(1000, 8)
+        self.zero = self.X == 0
+
+    def test_replacement(self):
+        "Zeros should be replaced with delta and the totals kept"
+        result = MultiplicativeReplacement(delta=1e-3).transform(self.X)
+        self.assertTrue((result > 0).all())
+        self.assertTrue(np.allclose(result[self.zero], 1e-3))
+        self.assertTrue(np.allclose(result.sum(axis=1), 1))
+
+    def test_ratios_preserved(self):
+        "Ratios between the nonzero parts shouldn't change"
+        result = MultiplicativeReplacement().transform(self.X)
+        kept = ~self.zero
+        ratio = np.where(kept, result, 1) / np.where(kept, self.X, 1)
+        ratio[~kept] = np.nan
+        spread = np.nanmax(ratio, axis=1) - np.nanmin(ratio, axis=1)
+        self.assertTrue(np.allclose(spread, 0))
+
+    def test_scale_invariant(self):
+        "Delta is relative so unclosed data should get the same treatment"
+        transform = MultiplicativeReplacement()
+        self.assertTrue(np.allclose(
+            transform.transform(100 * self.X),
+            100 * transform.transform(self.X)))
+
+    def test_chunks(self):
+        "Chunking shouldn't change the answer"
+        expected = MultiplicativeReplacement().transform(self.X)
+        for chunk_rows in (1, 7, 999, 5000):
+            result = MultiplicativeReplacement(
+                chunk_rows=chunk_rows).transform(self.X)
+            self.assertTrue(np.allclose(result, expected))
+
+    def test_parallel(self):
+        "Splitting over threads shouldn't change the answer"
+        X = compositions_with_zeros(100000, 8)
+        self.assertTrue(np.allclose(
+            MultiplicativeReplacement(n_jobs=4).transform(X),
+            MultiplicativeReplacement().transform(X)))
+
+    def test_float32(self):
+        "Replacement should keep float32"
+        X = self.X.astype(np.float32)
+        self.assertEqual(MultiplicativeReplacement().transform(X).dtype,
+                         np.float32)
+        self.assertEqual(DetectionLimitReplacement(0.05).transform(X).dtype,
+                         np.float32)
+
+    def test_inplace(self):
+        "We should be able to replace in place"
+        expected = MultiplicativeReplacement().transform(self.X)
+        X = self.X.copy()
+        result = MultiplicativeReplacement(chunk_rows=100).transform(X, out=X)
+        self.assertIs(result, X)
+        self.assertTrue(np.allclose(X, expected))
+
+    def test_missing(self):
+        "NaNs should stay NaN without affecting the rest of the row"
+        X = self.X.copy()
+        X[::3, 1] = np.nan
+        result = MultiplicativeReplacement().transform(X)
+        self.assertTrue(np.isnan(result[::3, 1]).all())
+        self.assertTrue((result[~np.isnan(X)] > 0).all())
+        self.assertTrue(np.allclose(np.nansum(result, axis=1),
+                                    np.nansum(X, axis=1)))
+
+    def test_empty_rows(self):
+        "All-zero rows can't be replaced"
+        X = self.X.copy()
+        X[5] = 0
+        result = MultiplicativeReplacement().transform(X)
+        self.assertTrue(np.isnan(result[5]).all())
+        self.assertFalse(np.isnan(np.delete(result, 5, axis=0)).any())
+
+    def test_delta_too_big(self):
+        "We should complain if the replacements swamp the composition"
+        X = np.array([[0, 0, 0, 1.]])
+        with self.assertRaises(ValueError):
+            multiplicative_replacement(X, X == 0, 0.5)
+
+    def test_pipelines(self):
+        "Replacement should make log-ratio transforms finite"
+        for transform in (CenteredLogTransform(), IsometricLogTransform(),
+                          AdditiveLogTransform(base_feature_index=0)):
+            with self.subTest(transform=transform):
+                pipeline = make_pipeline(MultiplicativeReplacement(),
+                                         transform)
+                self.assertTrue(np.isfinite(pipeline.fit_transform(self.X))
+                                .all())
+
+class TestDetectionLimitReplacement(unittest.TestCase):
+
+    "Tests for detection-limit scaled replacement"
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.X = rng.uniform(0, 100, size=(1000, 5))
+        self.limits = np.array([1, 2, 5, 10, 20.])
+        self.below = self.X < self.limits
+
+    def test_replacement(self):
+        "Values below the limit should be a fraction of the limit"
+        transform = DetectionLimitReplacement(self.limits, fraction=0.5)
+        result = transform.fit_transform(self.X)
+        expected = np.broadcast_to(0.5 * self.limits, self.X.shape)
+        self.assertTrue(np.allclose(result[self.below], expected[self.below]))
+        self.assertTrue(np.allclose(result.sum(axis=1),
+                                    np.where(self.below, 0, self.X).sum(1)))
+
+    def test_without_fit(self):
+        "Given limits we shouldn't need to fit"
+        transform = DetectionLimitReplacement(self.limits)
+        self.assertTrue(np.allclose(transform.transform(self.X),
+                                    transform.fit_transform(self.X)))
+
+    def test_fit_limits(self):
+        "Fitting without limits should use the smallest positive values"
+        X = self.X.copy()
+        X[self.below] = 0
+        X[0, 4] = np.nan
+        transform = DetectionLimitReplacement(chunk_rows=100).fit(X)
+        expected = [np.nanmin(col[col > 0]) for col in X.T]
+        self.assertTrue(np.allclose(transform.detection_limits_, expected))
+
+    def test_no_limits(self):
+        "We need limits from somewhere"
+        with self.assertRaises(ValueError):
+            DetectionLimitReplacement().transform(self.X)
+
+    def test_chunks(self):
+        "Chunking shouldn't change the answer"
+        expected = DetectionLimitReplacement(self.limits).transform(self.X)
+        result = DetectionLimitReplacement(self.limits,
+                                           chunk_rows=13).transform(self.X)
+        self.assertTrue(np.allclose(result, expected))
+
+if __name__ == '__main__':
+    unittest.main()
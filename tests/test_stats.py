@@ -0,0 +1,99 @@
+""" file:   test_stats.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for compositional summary statistics
+"""
+
+import unittest
+import numpy as np
+import pandas as pd
+
+from earthchem.transform.stats import variation_matrix, centre, \
+    total_variance, log_ratio_moments
+from earthchem.transform.utilities import closure
+from earthchem.testing import LocalEarthChemServer, TRACE_COLUMNS
+
+class TestStats(unittest.TestCase):
+
+    "Tests for compositional summary statistics"
+
+    def setUp(self):
+        rng = np.random.RandomState(42)
+        self.X = closure(rng.uniform(0.01, 1, size=(2000, 5)))
+        self.logX = np.log(self.X)
+        self.columns = ['sio2', 'mgo', 'cao', 'feot', 'k2o']
+        self.df = pd.DataFrame(self.X, columns=self.columns)
+
+    def test_variation_matrix(self):
+        "Variation matrix should match the pairwise definition"
+        ndim = self.X.shape[1]
+        expected = np.array([[np.var(self.logX[:, i] - self.logX[:, j],
+                                     ddof=1) for j in range(ndim)]
+                             for i in range(ndim)])
+        self.assertTrue(np.allclose(variation_matrix(self.X), expected))
+        self.assertTrue(np.allclose(variation_matrix(self.X, ddof=0),
+                                    expected * 1999 / 2000))
+
+    def test_centre(self):
+        "Centre should be the closed geometric mean"
+        gmean = np.exp(self.logX.mean(axis=0))
+        self.assertTrue(np.allclose(centre(self.X), gmean / gmean.sum()))
+        self.assertTrue(np.allclose(centre(self.X, total=100),
+                                    100 * gmean / gmean.sum()))
+
+    def test_total_variance(self):
+        "Total variance should be the variation matrix sum over 2m"
+        self.assertTrue(np.isclose(total_variance(self.X),
+                                   variation_matrix(self.X).sum() / 10))
+
+    def test_dataframes(self):
+        "DataFrames should give labelled results"
+        variation = variation_matrix(self.df, columns=['mgo', 'sio2'])
+        self.assertEqual(list(variation.columns), ['mgo', 'sio2'])
+        self.assertEqual(list(variation.index), ['mgo', 'sio2'])
+        result = centre(self.df)
+        self.assertEqual(list(result.index), self.columns)
+        self.assertTrue(np.allclose(result.values, centre(self.X)))
+
+    def test_batches(self):
+        "We should be able to stream batches through"
+        pages = (self.df[i:i + 50] for i in range(0, 2000, 50))
+        self.assertTrue(np.allclose(variation_matrix(pages),
+                                    variation_matrix(self.X)))
+        moments = log_ratio_moments(np.array_split(self.X, 3), chunk_rows=7)
+        self.assertEqual(moments.n_samples, 2000)
+        self.assertTrue(np.isclose(moments.total_variance(),
+                                   total_variance(self.X)))
+
+    def test_missing(self):
+        "Missing parts should be left out pair by pair, like pandas does"
+        rng = np.random.RandomState(7)
+        df = self.df.copy()
+        df[rng.uniform(size=df.shape) < 0.4] = np.nan
+        df.iloc[:5] = np.nan
+        expected = pd.DataFrame(
+            [[np.log(df[i] / df[j]).var() for j in self.columns]
+             for i in self.columns], index=self.columns, columns=self.columns)
+        result = variation_matrix(df)
+        self.assertTrue(np.allclose(result, expected))
+        pages = (df[i:i + 64] for i in range(0, len(df), 64))
+        self.assertTrue(np.allclose(variation_matrix(pages), expected))
+        self.assertTrue(np.allclose(
+            np.log(centre(df, total=1)).diff()[1:],
+            np.log(df).mean().diff()[1:]))
+
+    def test_sparse_traces(self):
+        "Sparse trace elements from a query should still have statistics"
+        columns = [key for key, _, _ in TRACE_COLUMNS]
+        with LocalEarthChemServer(n_rows=230) as server:
+            query = server.query(author='barnes')
+            result = variation_matrix(query.pages(), columns=columns)
+            df = query.dataframe()
+        expected = [[np.log(df[i] / df[j]).var() for j in columns]
+                    for i in columns]
+        self.assertTrue(np.allclose(result.values, expected))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+""" file:   test_streaming.py
+    author: Jess Robertson
+            CSIRO Mineral Resources
+    date:   May 2018
+
+    description: Unit tests for the streaming transforms
+"""
+
+import unittest
+import numpy as np
+
+from earthchem.testing import LocalEarthChemServer, OXIDE_COLUMNS
+from earthchem.transform.streaming import LogRatioMoments, \
+    StreamingCenteredLogTransform, StreamingIsometricLogTransform
+from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.utilities import closure
+
+def compositions(npts, ndim, seed=42):
+    "Make some correlated compositions"
+    rng = np.random.RandomState(seed)
+    mixing = rng.normal(size=(ndim, ndim))
+    return closure(np.exp(np.dot(rng.normal(size=(npts, ndim)), mixing)))
+
+class TestLogRatioMoments(unittest.TestCase):
+
+    "Tests for the running log-ratio statistics"
+
+    def setUp(self):
+        self.X = compositions(5000, 6)
+        self.logX = np.log(self.X)
+
+    def test_moments(self):
+        "Running moments should match numpy on the whole array"
+        moments = LogRatioMoments(chunk_rows=77).update(self.X)
+        self.assertEqual(moments.n_samples, 5000)
+        self.assertTrue(np.allclose(moments.mean_log, self.logX.mean(axis=0)))
+        self.assertTrue(np.allclose(moments.covariance(),
+                                    np.cov(self.logX.T)))
+
+    def test_batches(self):
+        "Batches and merges should give the same answer as one update"
+        expected = LogRatioMoments().update(self.X)
+        batched = LogRatioMoments()
+        for batch in np.array_split(self.X, 13):
+            batched.update(batch)
+        merged = LogRatioMoments().update(self.X[:1234]).merge(
+            LogRatioMoments().update(self.X[1234:]))
+        for moments in (batched, merged):
+            self.assertTrue(np.allclose(moments.covariance(),
+                                        expected.covariance()))
+            self.assertTrue(np.allclose(moments.mean_log, expected.mean_log))
+
+    def test_statistics(self):
+        "Centre, variation matrix and total variance should be right"
+        moments = LogRatioMoments().update(self.X)
+        gmean = np.exp(self.logX.mean(axis=0))
+        self.assertTrue(np.allclose(moments.centre(), gmean / gmean.sum()))
+
+        ndim = self.X.shape[1]
+        variation = np.array([[np.var(self.logX[:, i] - self.logX[:, j],
+                                      ddof=1) for j in range(ndim)]
+                              for i in range(ndim)])
+        self.assertTrue(np.allclose(moments.variation_matrix(), variation))
+        clr = CenteredLogTransform().transform(self.X)
+        self.assertTrue(np.isclose(moments.total_variance(),
+                                   np.var(clr, axis=0, ddof=1).sum()))
+        self.assertTrue(np.isclose(moments.total_variance(),
+                                   variation.sum() / (2 * ndim)))
+
+    def test_skipped(self):
+        "Parts we can't log should be left out, and empty rows skipped"
+        X = self.X.copy()
+        X[:10, 0] = 0
+        X[10:20, 1] = np.nan
+        X[20:25] = np.nan
+        moments = LogRatioMoments().update(X)
+        self.assertEqual(moments.n_samples, 4995)
+        self.assertEqual(moments.n_skipped, 5)
+        logX = self.logX[25:]
+        expected = np.concatenate([self.logX[:20], logX]).mean(axis=0)
+        expected[0] = np.concatenate([self.logX[10:20, 0], logX[:, 0]]).mean()
+        expected[1] = np.concatenate([self.logX[:10, 1], logX[:, 1]]).mean()
+        self.assertTrue(np.allclose(moments.mean_log, expected))
+        self.assertEqual(moments.pair_counts[0, 1], 4975)
+
+    def test_sparse_merge(self):
+        "Merging sparse batches should match one update"
+        rng = np.random.RandomState(3)
+        X = self.X.copy()
+        X[rng.uniform(size=X.shape) < 0.3] = np.nan
+        X[:100, 2] = np.nan   # first batch never sees part 2
+        expected = LogRatioMoments().update(X)
+        merged = LogRatioMoments()
+        for batch in np.array_split(X, 9):
+            merged.merge(LogRatioMoments().update(batch))
+        for name in ('variation_matrix', 'covariance'):
+            self.assertTrue(np.allclose(getattr(merged, name)(),
+                                        getattr(expected, name)()))
+        self.assertTrue(np.allclose(merged.mean_log, expected.mean_log))
+
+    def test_no_data(self):
+        "We need some data before we have statistics"
+        with self.assertRaises(ValueError):
+            LogRatioMoments().centre()
+
+class TestStreamingTransforms(unittest.TestCase):
+
+    "Tests for the streaming transforms"
+
+    def setUp(self):
+        self.X = compositions(5000, 6)
+        self.transforms = (StreamingCenteredLogTransform,
+                           StreamingIsometricLogTransform)
+
+    def test_centred(self):
+        "Fitted data should be centred, and scaled to unit total variance"
+        for transform_class in self.transforms:
+            for scale in (False, True):
+                with self.subTest(transform=transform_class, scale=scale):
+                    transform = transform_class(scale=scale).fit(self.X)
+                    L = transform.transform(self.X)
+                    self.assertTrue(np.allclose(L.mean(axis=0), 0))
+                    if scale:
+                        self.assertTrue(np.isclose(
+                            np.var(L, axis=0, ddof=1).sum(), 1))
+                    self.assertTrue(np.allclose(
+                        transform.inverse_transform(L), self.X))
+
+    def test_partial_fit(self):
+        "Fitting in batches should match fitting in one go"
+        for transform_class in self.transforms:
+            with self.subTest(transform=transform_class):
+                expected = transform_class(scale=True).fit_transform(self.X)
+                transform = transform_class(scale=True)
+                for batch in np.array_split(self.X, 7):
+                    transform.partial_fit(batch)
+                self.assertTrue(np.allclose(transform.transform(self.X),
+                                            expected))
+
+    def test_fit_resets(self):
+        "Fit should forget what we saw before"
+        transform = StreamingCenteredLogTransform().partial_fit(self.X[:10])
+        transform.fit(self.X)
+        self.assertEqual(transform.moments_.n_samples, 5000)
+
+    def test_not_fitted(self):
+        "We need statistics before we can transform"
+        with self.assertRaises(ValueError):
+            StreamingIsometricLogTransform().transform(self.X)
+
+    def test_float32(self):
+        "Streaming transforms should keep float32"
+        X = self.X.astype(np.float32)
+        for transform_class in self.transforms:
+            with self.subTest(transform=transform_class):
+                transform = transform_class(scale=True).fit(X)
+                self.assertEqual(transform.transform(X).dtype, np.float32)
+
+    def test_query_pages(self):
+        "We should be able to fit a page at a time from a query"
+        columns = [key for key, _, _ in OXIDE_COLUMNS]
+        with LocalEarthChemServer(n_rows=230) as server:
+            query = server.query(author='barnes')
+            transform = StreamingIsometricLogTransform()
+            n_pages = 0
+            for page in query.pages():
+                transform.partial_fit(page[columns].to_numpy())
+                n_pages += 1
+            df = query.dataframe()
+        self.assertEqual(n_pages, 5)
+        self.assertEqual(transform.moments_.n_samples, 230)
+        expected = StreamingIsometricLogTransform().fit(
+            df[columns].to_numpy())
+        self.assertTrue(np.allclose(transform.centre_, expected.centre_))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+""" file:   test_testing.py
+    author: Jess Robertson, CSIRO Minerals
+    date:   May 2018
+
+    description: Tests for the local EarthChem stand-in server
+"""
+
+from earthchem.testing import LocalEarthChemServer, synthetic_row, NO_RESULTS
+
+import requests
+import time
+import unittest
+
+class TestLocalEarthChemServer(unittest.TestCase):
+
+    "Tests for the stand-in REST service"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = LocalEarthChemServer(n_rows=120).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def get(self, **params):
+        return requests.get(self.server.url, params=params)
+
+    def test_count(self):
+        "Count queries should return the dataset size"
+        self.assertEqual(self.server.query(author='barnes').count(), 120)
+
+    def test_paging(self):
+        "Row bounds are inclusive and clipped to the dataset"
+        rows = self.get(searchtype='rowdata', startrow=0, endrow=49).json()
+        self.assertEqual(len(rows), 50)
+        self.assertEqual(rows[0]['sample_id'], 'SYN-00000000')
+        rows = self.get(searchtype='rowdata', startrow=100, endrow=149).json()
+        self.assertEqual(len(rows), 20)
+        self.assertEqual(rows[-1]['sample_id'], 'SYN-00000119')
+        resp = self.get(searchtype='rowdata', startrow=200, endrow=249)
+        self.assertEqual(resp.text, NO_RESULTS)
+
+    def test_pages_are_deterministic(self):
+        "The same rows should come back whichever page they're on"
+        first = self.get(searchtype='rowdata', startrow=0, endrow=9).json()
+        second = self.get(searchtype='rowdata', startrow=5, endrow=9).json()
+        self.assertEqual(first[5:], second)
+        self.assertEqual(first[0], synthetic_row(0))
+
+    def test_standarditems(self):
+        "Turning off standard items should drop the chemistry"
+        rows = self.get(searchtype='rowdata', startrow=0, endrow=0,
+                        standarditems='no').json()
+        self.assertNotIn('sio2', rows[0])
+        self.assertIn('latitude', rows[0])
+
+    def test_dataframe(self):
+        "Query.dataframe should page through everything"
+        self.server.reset()
+        df = self.server.query(author='barnes').dataframe()
+        self.assertEqual(len(df), 120)
+        self.assertEqual(len(self.server.requests), 2 + 3)  # 2 counts, 3 pages
+
+    def test_unknown_searchtype(self):
+        "Unknown search types should be rejected"
+        self.assertEqual(self.get(searchtype='foo').status_code, 400)
+
+class TestLocalEarthChemServerOptions(unittest.TestCase):
+
+    "Tests for latency, errors and per-query sizes"
+
+    def test_latency(self):
+        "Requests should take at least the simulated latency"
+        with LocalEarthChemServer(latency=0.05) as server:
+            start = time.perf_counter()
+            server.query().count()
+            self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_errors(self):
+        "Failing requests should raise from Query"
+        with LocalEarthChemServer(error_rate=1) as server:
+            with self.assertRaises(IOError):
+                server.query().count()
+
+    def test_callable_rows(self):
+        "The dataset size can depend on the query"
+        n_rows = lambda params: 10 if params.get('author') == 'barnes' else 0
+        with LocalEarthChemServer(n_rows=n_rows) as server:
+            self.assertEqual(server.query(author='barnes').count(), 10)
+            self.assertEqual(server.query(author='smith').count(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -6,17 +6,24 @@
     description: Unit tests for our transform implementations
 """
 
+import os
+import tempfile
+import tracemalloc
 import unittest
 import numpy as np
+import pandas as pd
 from scipy import stats
 
 np.random.seed(42)  # don't forget your towel
 
 from earthchem.transform.isometric import IsometricLogTransform
-from earthchem.transform.centered import CenteredLogTransform
+from earthchem.transform.centered import CenteredLogTransform, \
+                                        CenteredLogTransformPandas
 from earthchem.transform.barycentric import BarycentricTransform
-from earthchem.transform.additive  import AdditiveLogTransform
-from earthchem.transform.utilities import basis_matrix, closure
+from earthchem.transform.additive  import AdditiveLogTransform, \
+                                        AdditiveLogTransformPandas
+from earthchem.transform.utilities import basis_matrix, closure, \
+                                        pd_closure, effective_n_jobs
 
 def ortho_group(dim, size=1):
     """
@@ -103,6 +110,71 @@ class TestTransforms(unittest.TestCase):
                 self.assertTrue(np.allclose(X, t.inverse_transform(L)))
                 self.assertTrue(np.allclose(L, t.transform(X)))
 
+    def test_centered_logratio_small_parts(self):
+        "CLR shouldn't underflow for compositions with many tiny parts"
+        t = CenteredLogTransform()
+        X = 10 ** np.random.uniform(-9, -7, size=(100, 60))
+        L = t.transform(X)
+        self.assertTrue(np.isfinite(L).all())
+        logX = np.log(X)
+        self.assertTrue(np.allclose(L, logX - logX.mean(axis=1)[:, None]))
+        self.assertTrue(np.allclose(closure(X), t.inverse_transform(L)))
+
+    def test_centered_logratio_large_ratios(self):
+        "Inverse CLR shouldn't overflow for large log-ratios"
+        t = CenteredLogTransform()
+        L = np.array([[800., -400., -400.], [0., 0., 0.]])
+        X = t.inverse_transform(L)
+        self.assertTrue(np.isfinite(X).all())
+        self.assertTrue(np.allclose(X[0], [1, 0, 0]))
+        self.assertTrue(np.allclose(X[1], np.ones(3) / 3))
+
+    def test_centered_logratio_out(self):
+        "CLR should write into an output buffer if we give it one"
+        t = CenteredLogTransform()
+        X = closure(np.random.uniform(0.1, 1, size=(50, 5)))
+        out = np.empty_like(X)
+        L = t.transform(X, out=out)
+        self.assertIs(L, out)
+        self.assertTrue(np.allclose(L, t.transform(X)))
+        inv = np.empty_like(X)
+        self.assertIs(t.inverse_transform(L, out=inv), inv)
+        self.assertTrue(np.allclose(inv, X))
+
+    def test_centered_logratio_pandas(self):
+        "Pandas CLR should match numpy CLR and keep labels"
+        t, tpd = CenteredLogTransform(), CenteredLogTransformPandas()
+        X = closure(np.random.uniform(0.1, 1, size=(100, 6)))
+        df = pd.DataFrame(X, columns=list('abcdef'),
+                          index=np.arange(100, 200))
+        L = tpd.transform(df)
+        self.assertTrue(L.index.equals(df.index))
+        self.assertTrue(L.columns.equals(df.columns))
+        self.assertTrue(np.allclose(L.values, t.transform(X)))
+
+        # Check round trip
+        inv = tpd.inverse_transform(L)
+        self.assertTrue(inv.index.equals(df.index))
+        self.assertTrue(np.allclose(inv.values, X))
+
+    def test_centered_logratio_pandas_missing(self):
+        "Pandas CLR should leave missing parts out of the centering"
+        tpd = CenteredLogTransformPandas()
+        df = pd.DataFrame({'a': [0.2, 0.5, np.nan],
+                           'b': [0.3, np.nan, np.nan],
+                           'c': [0.5, 0.5, np.nan]})
+        L = tpd.transform(df)
+        self.assertTrue(np.isfinite(L.values[0]).all())
+        self.assertTrue(np.allclose(L.values[1], [0, np.nan, 0],
+                                    equal_nan=True))
+        self.assertTrue(np.isnan(L.values[2]).all())
+
+        # Observed parts should be closed on the way back
+        inv = tpd.inverse_transform(L)
+        self.assertTrue(np.allclose(inv.values[:2], [[0.2, 0.3, 0.5],
+                                                     [0.5, np.nan, 0.5]],
+                                    equal_nan=True))
+
     def test_barycentric_isometry(self):
         "Centered logratio should be isomorphic under closure"
         t = BarycentricTransform()
@@ -121,6 +193,16 @@ class TestTransforms(unittest.TestCase):
             self.assertEqual(X.shape, (npts, 3))
             self.assertEqual(L.shape, (npts, 2))
 
+    def test_barycentric_inverse(self):
+        "Barycentric coordinates should map back to closed compositions"
+        t = BarycentricTransform()
+        X = np.random.uniform(0.01, 1, size=(1000, 3))
+        self.assertTrue(np.allclose(t.inverse_transform(t.transform(X)),
+                                    closure(X)))
+        self.assertTrue(np.allclose(t.inverse_transform([[0, 0], [1, 0]]),
+                                    [[1, 0, 0], [0, 1, 0]]))
+        self.assertRaises(ValueError, t.inverse_transform, X)
+
     def test_barycentric_error(self):
         "Passing data with ndims != 3 should raise a ValueError"
         t = BarycentricTransform()
@@ -148,6 +230,28 @@ class TestTransforms(unittest.TestCase):
             self.assertTrue(np.allclose(np.dot(psi.T, psi),
                                         expected))
 
+    def test_isometric_basis_matrix_closed_form(self):
+        "Vectorized basis matrix should match the element-wise definition"
+        for D in range(2, 50):
+            expected = np.zeros((D - 1, D))
+            for i in range(1, D):
+                for j in range(1, D + 1):
+                    if j <= D - i:
+                        expected[i - 1, j - 1] = \
+                            np.sqrt(1 / ((D - i) * (D - i + 1)))
+                    elif j == D - i + 1:
+                        expected[i - 1, j - 1] = \
+                            -np.sqrt((D - i) / (D - i + 1))
+            self.assertTrue(np.allclose(basis_matrix(D), expected))
+
+    def test_isometric_basis_matrix_cached(self):
+        "Basis matrices should be cached and read-only"
+        psi = basis_matrix(40)
+        self.assertIs(psi, basis_matrix(40))
+        self.assertFalse(psi.flags.writeable)
+        with self.assertRaises(ValueError):
+            psi[0, 0] = 1
+
     def test_closure(self):
         "Closure operator should work ok"
         for ndim in range(2, 20):
@@ -157,6 +261,30 @@ class TestTransforms(unittest.TestCase):
                 X = closure(mvn.rvs(npts))
                 self.assertTrue(np.allclose(X.sum(axis=1), np.ones(npts)))
 
+    def test_pd_closure(self):
+        "Pandas closure should match closure and keep labels"
+        X = np.random.uniform(0.1, 1, size=(100, 5))
+        df = pd.DataFrame(X, columns=list('abcde'), index=np.arange(100, 200))
+        closed = pd_closure(df, constant=100)
+        self.assertTrue(closed.index.equals(df.index))
+        self.assertTrue(closed.columns.equals(df.columns))
+        self.assertTrue(np.allclose(closed.values, closure(X, 100)))
+
+        # Check that we can do it in place too
+        self.assertIsNone(pd_closure(df, inplace=True))
+        self.assertTrue(np.allclose(df.values, closure(X)))
+
+    def test_pd_closure_missing_and_zero(self):
+        "Pandas closure should skip NaNs and not produce infs"
+        df = pd.DataFrame({'a': [1., 0., np.nan, 1.],
+                           'b': [np.nan, 0., np.nan, 3.]})
+        closed = pd_closure(df)
+        self.assertFalse(np.isinf(closed.values).any())
+        self.assertTrue(np.allclose(
+            closed.values,
+            [[1, np.nan], [np.nan, np.nan], [np.nan, np.nan], [0.25, 0.75]],
+            equal_nan=True))
+
     def test_isometric_logratio_isometry(self):
         "Isometric logratio should be isomorphic under closure"
         t = IsometricLogTransform()
@@ -232,6 +360,51 @@ class TestTransforms(unittest.TestCase):
                 self.assertTrue(np.allclose(X, t.inverse_transform(L)))
                 self.assertTrue(np.allclose(L, t.transform(X)))
 
+    def test_additive_logratio_pandas(self):
+        "Pandas ALR should round trip and match numpy ALR"
+        t = AdditiveLogTransformPandas()
+        X = closure(np.random.uniform(0.1, 1, size=(100, 4)))
+        df = pd.DataFrame(X, columns=['sio2', 'rock_unmeasured', 'mgo', 'cao'],
+                          index=np.arange(100, 200))
+        L = t.transform(df)
+        self.assertEqual(list(L.columns), ['cao', 'mgo', 'sio2'])
+        self.assertTrue(L.index.equals(df.index))
+        expected = np.log(df[['cao', 'mgo', 'sio2']].values
+                          / df[['rock_unmeasured']].values)
+        self.assertTrue(np.allclose(L.values, expected))
+
+        # Check the round trip
+        inv = t.inverse_transform(L)
+        self.assertEqual(list(inv.columns),
+                         ['cao', 'mgo', 'sio2', 'rock_unmeasured'])
+        self.assertTrue(np.allclose(inv[df.columns].values, X))
+
+    def test_additive_logratio_pandas_constant(self):
+        "Pandas inverse ALR should close to the constant"
+        t = AdditiveLogTransformPandas(constant=100)
+        L = pd.DataFrame(np.random.normal(size=(10, 3)))
+        inv = t.inverse_transform(L)
+        self.assertEqual(inv.columns[-1], 'closure')
+        self.assertTrue(np.allclose(inv.sum(axis=1), 100))
+
+    def test_additive_logratio_pandas_no_base(self):
+        "Pandas ALR should complain if there's no base column"
+        t = AdditiveLogTransformPandas()
+        df = pd.DataFrame(np.ones((3, 3)), columns=['a', 'b', 'c'])
+        self.assertRaises(ValueError, t.transform, df)
+
+    def test_additive_logratio_pandas_set_params(self):
+        "Pandas ALR should use a base pattern set after construction"
+        df = pd.DataFrame(np.random.uniform(0.1, 1, size=(10, 3)),
+                          columns=['a', 'base', 'c'])
+        t = AdditiveLogTransformPandas().set_params(base_feature_pattern='base')
+        L = t.transform(df)
+        self.assertEqual(list(L.columns), ['a', 'c'])
+        self.assertTrue(np.allclose(L.values, np.log(
+            df[['a', 'c']].values / df[['base']].values)))
+        self.assertEqual(list(t.inverse_transform(L).columns),
+                         ['a', 'c', 'base'])
+
     def test_additive_index_error(self):
         "Additive logratio should raise value error if base index > len"
         ndim = 4
@@ -243,5 +416,209 @@ class TestTransforms(unittest.TestCase):
         X = clr.inverse_transform(mvn.rvs(1000))
         self.assertRaises(ValueError, alr.transform, X)
 
+class TestChunkedTransforms(unittest.TestCase):
+
+    "Tests for chunked transforms over memory-mapped arrays"
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.X = closure(np.random.uniform(0.01, 1, size=(1000, 6)))
+        self.transforms = (CenteredLogTransform(), IsometricLogTransform(),
+                           AdditiveLogTransform(),
+                           AdditiveLogTransform(base_feature_index=-1))
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def memmap(self, name, shape, mode='w+'):
+        "Make a memory-mapped array in the temporary directory"
+        return np.memmap(os.path.join(self.tempdir.name, name),
+                         dtype=float, mode=mode, shape=shape)
+
+    def test_matches_transform(self):
+        "Chunked transforms should match the in-memory ones"
+        for transform in self.transforms:
+            expected = transform.transform(self.X)
+            for chunk_rows in (None, 1, 7, 5000):
+                with self.subTest(transform=transform, chunk_rows=chunk_rows):
+                    L = transform.transform_chunked(self.X,
+                                                    chunk_rows=chunk_rows)
+                    self.assertTrue(np.allclose(L, expected))
+                    self.assertTrue(np.allclose(
+                        transform.inverse_transform_chunked(
+                            L, chunk_rows=chunk_rows),
+                        self.X))
+
+    def test_memmaps(self):
+        "We should be able to go from memmap to memmap"
+        X = self.memmap('X.dat', self.X.shape)
+        X[:] = self.X
+        X.flush()
+        X = self.memmap('X.dat', self.X.shape, mode='r')
+        for transform in self.transforms:
+            with self.subTest(transform=transform):
+                expected = transform.transform(self.X)
+                L = self.memmap('L.dat', expected.shape)
+                result = transform.transform_chunked(X, out=L, chunk_rows=64)
+                self.assertIs(result, L)
+                self.assertTrue(np.allclose(L, expected))
+
+                inv = self.memmap('inv.dat', self.X.shape)
+                transform.inverse_transform_chunked(L, out=inv, chunk_rows=64)
+                self.assertTrue(np.allclose(inv, self.X))
+                del L, inv
+
+    def test_empty(self):
+        "Chunking no rows should give no rows"
+        L = CenteredLogTransform().transform_chunked(np.zeros((0, 3)))
+        self.assertEqual(L.shape, (0, 3))
+
+    def test_closure_out(self):
+        "Closure should work in place"
+        X = self.X * 7
+        result = closure(X, out=X)
+        self.assertIs(result, X)
+        self.assertTrue(np.allclose(X, self.X))
+        self.assertTrue(np.allclose(closure(self.X, total=100), 100 * self.X))
+
+class TestParallelTransforms(unittest.TestCase):
+
+    "Tests for splitting transforms over threads"
+
+    def setUp(self):
+        # Big enough to get split up
+        self.X = closure(np.random.uniform(0.01, 1, size=(100000, 6)))
+
+    def test_effective_n_jobs(self):
+        "We should follow the sklearn convention for n_jobs"
+        self.assertEqual(effective_n_jobs(None), 1)
+        self.assertEqual(effective_n_jobs(3), 3)
+        self.assertEqual(effective_n_jobs(-1), os.cpu_count())
+        self.assertEqual(effective_n_jobs(-1000), 1)
+
+    def test_matches_serial(self):
+        "Parallel transforms should match the serial ones"
+        for transform_class in (CenteredLogTransform, IsometricLogTransform,
+                                AdditiveLogTransform):
+            serial, parallel = transform_class(), transform_class(n_jobs=4)
+            with self.subTest(transform=transform_class):
+                L = parallel.transform(self.X)
+                self.assertTrue(np.allclose(L, serial.transform(self.X)))
+                self.assertTrue(np.allclose(parallel.inverse_transform(L),
+                                            self.X))
+
+    def test_out(self):
+        "Parallel transforms should write into out"
+        out = np.empty_like(self.X)
+        result = CenteredLogTransform(n_jobs=-1).transform(self.X, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(np.allclose(
+            out, CenteredLogTransform().transform(self.X)))
+
+    def test_closure(self):
+        "Closure should split over threads too"
+        self.assertTrue(np.allclose(closure(7 * self.X, n_jobs=4), self.X))
+
+    def test_small(self):
+        "Small inputs should still work"
+        X = self.X[:3]
+        self.assertTrue(np.allclose(
+            IsometricLogTransform(n_jobs=4).transform(X),
+            IsometricLogTransform().transform(X)))
+
+class TestTransformDtypes(unittest.TestCase):
+
+    "Tests for keeping the input dtype"
+
+    def setUp(self):
+        self.X = closure(np.random.uniform(0.01, 1, size=(1000, 3)))
+        self.transforms = (CenteredLogTransform(), IsometricLogTransform(),
+                           AdditiveLogTransform(), BarycentricTransform())
+
+    def test_float32(self):
+        "Float32 in should mean float32 out, and about the same answer"
+        X32 = self.X.astype(np.float32)
+        for transform in self.transforms:
+            with self.subTest(transform=transform):
+                L = transform.transform(X32)
+                self.assertEqual(L.dtype, np.float32)
+                self.assertTrue(np.allclose(L, transform.transform(self.X),
+                                            rtol=1e-4, atol=1e-5))
+                if hasattr(transform, 'inverse_transform'):
+                    inv = transform.inverse_transform(L)
+                    self.assertEqual(inv.dtype, np.float32)
+                    self.assertTrue(np.allclose(inv, self.X, rtol=1e-4))
+
+    def test_dtype_option(self):
+        "We should be able to ask for a dtype"
+        for transform in self.transforms:
+            with self.subTest(transform=transform):
+                transform.set_params(dtype=np.float32)
+                self.assertEqual(transform.transform(self.X).dtype,
+                                 np.float32)
+
+    def test_integers(self):
+        "Integers should get transformed as float64"
+        X = np.random.randint(1, 100, size=(100, 3))
+        for transform in self.transforms:
+            with self.subTest(transform=transform):
+                self.assertEqual(transform.transform(X).dtype, np.float64)
+        self.assertEqual(closure(X).dtype, np.float64)
+        self.assertTrue(np.allclose(closure(X).sum(axis=1), 1))
+
+    def test_closure(self):
+        "Closure should keep float32"
+        self.assertEqual(closure(self.X.astype(np.float32)).dtype,
+                         np.float32)
+        self.assertEqual(closure(self.X, dtype=np.float32).dtype, np.float32)
+
+    def test_pandas_float32(self):
+        "Float32 frames should stay float32 through the pandas transforms"
+        df = pd.DataFrame(self.X, columns=['a', 'b', 'rock_unmeasured'])
+        df32 = df.astype(np.float32)
+        for transform in (CenteredLogTransformPandas(),
+                          AdditiveLogTransformPandas()):
+            with self.subTest(transform=transform):
+                L = transform.transform(df32)
+                self.assertTrue((L.dtypes == np.float32).all())
+                self.assertTrue(np.allclose(L, transform.transform(df),
+                                            rtol=1e-4, atol=1e-5))
+                inv = transform.inverse_transform(L)
+                self.assertTrue((inv.dtypes == np.float32).all())
+                self.assertTrue(np.allclose(inv[df.columns], self.X,
+                                            rtol=1e-4))
+        self.assertTrue((pd_closure(df32).dtypes == np.float32).all())
+
+    def test_pandas_integers(self):
+        "Integer frames should get transformed as float64"
+        df = pd.DataFrame(np.random.randint(1, 100, size=(100, 3)),
+                          columns=['a', 'b', 'rock_unmeasured'])
+        for transform in (CenteredLogTransformPandas(),
+                          AdditiveLogTransformPandas()):
+            with self.subTest(transform=transform):
+                L = transform.transform(df)
+                self.assertTrue((L.dtypes == np.float64).all())
+        self.assertTrue((pd_closure(df).dtypes == np.float64).all())
+
+    def test_basis_matrix(self):
+        "We should be able to get cached float32 basis matrices"
+        psi = basis_matrix(10, np.float32)
+        self.assertEqual(psi.dtype, np.float32)
+        self.assertIs(psi, basis_matrix(10, 'float32'))
+        self.assertTrue(np.allclose(psi, basis_matrix(10)))
+
+    def test_no_upcasting(self):
+        "Float32 transforms shouldn't allocate float64 temporaries"
+        X = closure(np.random.uniform(0.01, 1, size=(200000, 10)),
+                    dtype=np.float32)
+        for transform in (CenteredLogTransform(), IsometricLogTransform()):
+            with self.subTest(transform=transform):
+                transform.transform(X[:10])
+                tracemalloc.start()
+                transform.transform(X)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                self.assertLess(peak, 2.2 * X.nbytes)
+
 if __name__ == '__main__':
     unittest.main()
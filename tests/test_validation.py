@@ -1,4 +1,5 @@
 from earthchem.validation import *
+from earthchem import codegen, _schema
 
 import unittest
 
@@ -10,7 +11,8 @@ ELEMENTS_IN_SCHEMA = (
     'CruiseID',
     'Location',
     'Age',
-    'Material'
+    'Material',
+    'OutputRows'
 )
 
 TEST_EXAMPLES = {
@@ -66,6 +68,25 @@ class TestValidators(unittest.TestCase):
                 with self.assertRaises(errtype):
                     v.validate(case)
 
+class TestSchemaCodegen(unittest.TestCase):
+
+    "Test the generated schema tables"
+
+    def test_schema_module_in_sync(self):
+        "Generated _schema.py should match the SOAP schema"
+        with open(codegen.SCHEMA_MODULE, 'r') as src:
+            self.assertEqual(src.read(), codegen.render_schema_module())
+
+    def test_enumerations(self):
+        "Enumerated values should be picked up for attributes and elements"
+        self.assertIn('archean', _schema.QUERY_ENUMERATIONS['geologicalage'])
+        self.assertIn('igneous',
+                      _schema.ATTRIBUTE_ENUMERATIONS[('SampleType', 'level1')])
+        self.assertEqual(_schema.ELEMENT_ENUMERATIONS['OutputLevel'],
+                         ('sample', 'method'))
+        self.assertEqual(_schema.ELEMENT_ATTRIBUTES['OutputRows'],
+                         {'start': 'integer', 'end': 'integer'})
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file